@@ -0,0 +1,388 @@
+import time
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import aiohttp
+import requests
+
+from okcoin import Account, Spot, Earn, Fiat, GET, POST
+from okcoin.Clock import SERVER_TIME_PATH
+from okcoin.RateLimiter import RateLimiter
+from okcoin.Retry import found, new_client_id
+from okcoin.History import download_history_async
+
+# Transport errors after which the request may or may not have reached okcoin.
+TRANSIENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+# The responses fetched so far for the method currently being replayed.
+_replay = contextvars.ContextVar('_replay', default=None)
+
+
+class _Deferred(BaseException):
+    r"""Raised by a replaying client when a method needs the result of a step that has not been
+    run yet. The step names the coroutine of the async client that runs it and its arguments.
+    It derives from BaseException so that it passes through `except Exception` blocks."""
+
+    def __init__(self, name, args):
+        super().__init__(name, *args[:2])
+        self.step = (name, args)
+
+
+class _AsyncResponse:
+    r"""A fully read aiohttp response that mirrors the parts of requests.Response that
+    _Resp and its subclasses use."""
+
+    def __init__(self, status_code, content, headers, url):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.url = url
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def __repr__(self):
+        return '<Response [%d]>' % self.status_code
+
+
+class _Failure:
+    r"""Stands in for a response when the request failed with a transport error."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class _ReplayQuery:
+    r"""Replaces query so that a synchronous client method returns the responses fetched
+    by the async client, in order, and raises _Deferred for the first one that is missing.
+    Transport errors are raised as the requests.ConnectionError the synchronous client
+    would have seen, so that its error handling runs unchanged. Writes and the lookup of
+    failed batches are single steps, so that their backoff runs on the event loop and is
+    not repeated by later replays."""
+
+    @staticmethod
+    def _replayed(name, *args):
+        responses = _replay.get()
+        response = next(responses, None) if responses is not None else None
+        if response is None:
+            raise _Deferred(name, args)
+        if isinstance(response, _Failure):
+            raise requests.ConnectionError(str(response.error)) from response.error
+        return response
+
+    def query(self, type, request_path, body='', tokens=1):
+        return self._replayed('_request', type, request_path, body, tokens)
+
+    def _write(self, request_path, body, lookup_path):
+        return self._replayed('_write', request_path, body, lookup_path)
+
+    def _resolve_chunk(self, chunk, error):
+        return self._replayed('_resolve_chunk', chunk, error)
+
+
+class _AsyncSignature:
+    r"""
+    Base class of the asyncio clients. Each public method of the wrapped synchronous client
+    is exposed as a coroutine. Requests are signed by the same _Signature logic and wrapped
+    in the same _Resp objects as the synchronous client.
+
+
+    Parameters
+    ----------
+    config_file : A file containing the api_key, secret_key, and pass_phrase
+
+    pass_phrase : If a pass_phrase is not specified in the config_file, it can be entered as a separate parameter
+    or you will be prompted to enter it through your Python IDE.
+
+    max_concurrency : The maximum number of requests in flight at once for this client.
+
+    timeout : The (connect, read) timeout in seconds.
+
+    session : An aiohttp.ClientSession to share between clients. If it is not specified, the
+    client creates and owns its own.
+
+    rate_limiter : A RateLimiter to share between clients. A new RateLimiter is created if it
+    is not specified. Set to False to send requests without rate limiting.
+
+    retry : The RetryPolicy for GET requests and writes. A default RetryPolicy is created if it
+    is not specified. Set to False to send every request once.
+
+    Attributes
+    ----------
+    """
+    _client = None
+
+    def __init__(self,
+                 config_file=r'auth.config',
+                 pass_phrase=None,
+                 max_concurrency=100,
+                 timeout=(3.05, 10),
+                 session=None,
+                 rate_limiter=None,
+                 retry=None):
+
+        replaying = type('_Replaying' + self._client.__name__, (_ReplayQuery, self._client), {})
+        self._signer = replaying(config_file, pass_phrase, warm_up=0, rate_limiter=False, retry=retry)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._owns_session = session is None
+        self._http = session
+        self._semaphore = None
+        self._clock_sync = None
+        self.rate_limiter = RateLimiter() if rate_limiter is None else rate_limiter
+        self.retry = self._signer.session.retry
+
+    def _get_http(self):
+        if self._http is None:
+            connect, read = self.timeout
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read))
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._http
+
+    async def _sync_clock(self):
+        r"""Anchors the signer's clock to the okcoin server time. Failures are ignored and
+        the local clock is used until the background re-sync succeeds."""
+        clock = self._signer.session.clock
+        try:
+            sent = time.monotonic()
+            async with self._get_http().get(self._signer.REST_API_URL + SERVER_TIME_PATH) as r:
+                result = json.loads(await r.read())
+            clock.update(result['data'][0]['ts'], sent, time.monotonic())
+        except (*TRANSIENT_ERRORS, ValueError, KeyError, IndexError):
+            return False
+        clock.start()
+        return True
+
+    async def _request(self, type, request_path, body='', tokens=1):
+        http = self._get_http()
+        if self._clock_sync is None:
+            self._clock_sync = asyncio.ensure_future(self._sync_clock())
+        await asyncio.shield(self._clock_sync)
+        retry = self.retry
+        attempt = 0
+        resynced = False
+        while True:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async(request_path, tokens=tokens)
+            # Only GETs are retried here; writes are resubmitted by _write once their outcome is known.
+            can_retry = type == 'GET' and retry and attempt < retry.retries
+            try:
+                async with self._semaphore:
+                    url, data, header = self._signer._prepare(type, request_path, body)
+                    async with http.request(type, url, data=data, headers=header) as r:
+                        response = _AsyncResponse(r.status, await r.read(), r.headers, str(r.url))
+            except TRANSIENT_ERRORS:
+                if not can_retry:
+                    raise
+            else:
+                # A rejected timestamp means the request was not accepted, so it is safe to resend.
+                if not resynced and self._signer.session.clock.rejected(response):
+                    resynced = True
+                    if await self._sync_clock():
+                        continue
+                if not can_retry or not retry.is_retryable(response.status_code, response.content):
+                    return response
+            await asyncio.sleep(retry.delay(attempt))
+            attempt += 1
+
+    async def _write(self, request_path, body, lookup_path):
+        r"""The asyncio version of _Signature._write. A write whose outcome is unknown is looked
+        up by its client-assigned ID and only resubmitted if okcoin has no record of it."""
+        retry = self.retry
+        attempts = retry.retries + 1 if retry else 1
+        for attempt in range(attempts):
+            try:
+                response = await self._request(POST, request_path, body)
+            except TRANSIENT_ERRORS:
+                if attempt == attempts - 1:
+                    raise
+            else:
+                if not retry or attempt == attempts - 1 or \
+                        not retry.is_retryable(response.status_code, response.content):
+                    return response
+            await asyncio.sleep(retry.delay(attempt))
+            lookup = await self._request(GET, lookup_path)
+            if found(lookup):
+                return lookup
+
+    async def _resolve_chunk(self, chunk, error):
+        r"""The asyncio version of Spot._resolve_chunk. The orders of the chunk are looked up
+        concurrently."""
+        if self.retry:
+            await asyncio.sleep(self.retry.delay(0))
+
+        async def lookup(order):
+            try:
+                return await self._request(GET, self._signer._order_path(order))
+            except TRANSIENT_ERRORS:
+                return None
+
+        lookups = await asyncio.gather(*[lookup(order) for order in chunk])
+        return self._signer._resolved_chunk(chunk, lookups, error)
+
+    async def _call(self, name, args, kwargs):
+        results = []
+        while True:
+            token = _replay.set(iter(results))
+            try:
+                return getattr(self._signer, name)(*args, **kwargs)
+            except _Deferred as deferred:
+                step, step_args = deferred.step
+            finally:
+                _replay.reset(token)
+            try:
+                results.append(await getattr(self, step)(*step_args))
+            except TRANSIENT_ERRORS as error:
+                results.append(_Failure(error))
+
+    async def query(self, type, request_path, body='', tokens=1):
+        r"""Sends a signed request and returns the raw response."""
+        return await self._request(type, request_path, body, tokens)
+
+    async def close(self):
+        r"""Closes the aiohttp session if it is owned by this client and the pool of the
+        signer."""
+        if self._owns_session and self._http is not None:
+            await self._http.close()
+        self._signer.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+def _assign_client_ids(method, args, kwargs):
+    r"""Fills in the client-assigned IDs that a method marked with assigns_client_ids would
+    generate, so that they are generated once rather than on every replay."""
+    bound = inspect.signature(method).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    parameter = method._client_ids
+    value = bound.arguments[parameter]
+    if parameter == 'orders':
+        bound.arguments[parameter] = [order if order.get('clOrdId') else dict(order, clOrdId=new_client_id())
+                                      for order in value]
+    elif not value:
+        bound.arguments[parameter] = new_client_id()
+    return bound.args[1:], bound.kwargs
+
+
+def _async_method(name, method):
+    @functools.wraps(method)
+    async def call(self, *args, **kwargs):
+        if getattr(method, '_client_ids', None) is not None:
+            args, kwargs = _assign_client_ids(method, args, kwargs)
+        return await self._call(name, args, kwargs)
+    return call
+
+
+def _paginated_method(name, method):
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        paginator = getattr(self._signer, name)(*args, **kwargs)
+        paginator.client = self
+        return paginator
+    return call
+
+
+def _history_method(name, method):
+    @functools.wraps(method)
+    async def call(self, start_date, end_date=None, currency='', max_workers=8):
+        return await download_history_async(self, method._history_kind, start_date, end_date, currency,
+                                            max_workers=max_workers)
+    return call
+
+
+def _async_client(cls):
+    r"""Adds a coroutine to cls for every public method of the wrapped synchronous client.
+    Methods returning a Paginator return it bound to the async client, for use with `async for`.
+    Methods that download history in worker threads are run on the event loop instead, since
+    the worker threads cannot replay responses fetched by the async client."""
+    for name in dir(cls._client):
+        if name.startswith('_') or name in ('query', 'close') or hasattr(cls, name):
+            continue
+        method = getattr(cls._client, name)
+        if getattr(method, '_paginated', False):
+            setattr(cls, name, _paginated_method(name, method))
+        elif getattr(method, '_history_kind', None) is not None:
+            setattr(cls, name, _history_method(name, method))
+        elif callable(method):
+            setattr(cls, name, _async_method(name, method))
+    return cls
+
+
+@_async_client
+class AsyncAccount(_AsyncSignature):
+    """
+    The asyncio version of Account. Every method is a coroutine that returns the same
+    value as its Account counterpart.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> from okcoin.AsyncClient import AsyncAccount
+    >>> async def main():
+    ...     async with AsyncAccount('auth.config', max_concurrency=200) as acc:
+    ...         return await asyncio.gather(*[acc.get_balance(c) for c in ['BTC', 'STX', 'USD']])
+    >>> balances = asyncio.run(main())
+    """
+    _client = Account
+
+
+@_async_client
+class AsyncSpot(_AsyncSignature):
+    """
+    The asyncio version of Spot. Every method is a coroutine that returns the same
+    value as its Spot counterpart.
+
+    Examples
+    --------
+    >>> from okcoin.AsyncClient import AsyncSpot
+    >>> async with AsyncSpot('auth.config') as spot:
+    ...     fees = await spot.get_trade_fee()
+    """
+    _client = Spot
+
+
+@_async_client
+class AsyncEarn(_AsyncSignature):
+    """
+    The asyncio version of Earn. Every method is a coroutine that returns the same
+    value as its Earn counterpart.
+
+    Examples
+    --------
+    >>> from okcoin.AsyncClient import AsyncEarn
+    >>> async with AsyncEarn('auth.config') as earn:
+    ...     offers = await earn.get_offers("STX", "stacks")
+    """
+    _client = Earn
+
+
+@_async_client
+class AsyncFiat(_AsyncSignature):
+    """
+    The asyncio version of Fiat. Every method is a coroutine that returns the same
+    value as its Fiat counterpart.
+
+    Examples
+    --------
+    >>> from okcoin.AsyncClient import AsyncFiat
+    >>> async with AsyncFiat('auth.config') as fiat:
+    ...     deposits = await fiat.get_deposit_history()
+    """
+    _client = Fiat
@@ -0,0 +1,136 @@
+import time
+import hmac
+import base64
+import random
+import datetime
+import pandas as pd
+
+from okcoin import _Signature, Session
+from okcoin.OrderBook import OrderBook
+
+
+def _timeit(func, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def benchmark_signing(n=100000, request_path='/api/v5/account/balance', body=''):
+    r""" Measures the cost of signing one request with _Signature, against the
+    original approach of re-keying the HMAC, formatting the timestamp with
+    strftime and building the header from scratch.
+
+    Parameters
+    ----------
+    n : int
+        The number of requests to sign.
+
+    request_path : str
+        The request path that is signed.
+
+    body : dict or str
+        The query parameters that are signed.
+
+    Returns
+    -------
+    timings : dict
+        Microseconds per request for the current signer ('signer') and the
+        original implementation ('baseline').
+
+    Examples
+    --------
+    >>> from okcoin.Benchmarks import benchmark_signing
+    >>> benchmark_signing()
+    {'signer': 3.1, 'baseline': 6.4}
+    """
+    signer = object.__new__(_Signature)
+    signer.api_key = 'api-key'
+    signer.secret_key = 'secret-key'
+    signer.pass_phrase = 'pass-phrase'
+    signer.REST_API_URL = 'https://www.okcoin.com'
+    signer.session = Session(warm_up=0)
+    signer._init_signing()
+
+    def baseline():
+        t = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + "Z"
+        message = str(t) + str.upper('GET') + request_path + str(body)
+        mac = hmac.new(bytes(signer.secret_key, encoding='utf8'), bytes(message, encoding='utf-8'),
+                       digestmod='sha256')
+        header = dict()
+        header['Content-Type'] = 'application/json'
+        header['OK-ACCESS-KEY'] = signer.api_key
+        header['OK-ACCESS-SIGN'] = base64.b64encode(mac.digest())
+        header['OK-ACCESS-TIMESTAMP'] = t
+        header['OK-ACCESS-PASSPHRASE'] = signer.pass_phrase
+        return header
+
+    return {'signer': round(_timeit(lambda: signer._prepare('GET', request_path, body), n), 2),
+            'baseline': round(_timeit(baseline, n), 2)}
+
+
+def benchmark_order_book(n=20000, levels=400, changes=5, pairs=1, seed=0):
+    r""" Measures the update throughput of OrderBook on books of `levels` levels per side,
+    against rebuilding the asks and bids dataframes from the full book the way
+    ticker.get_order_book does for every snapshot.
+
+    Parameters
+    ----------
+    n : int
+        The number of updates applied.
+
+    levels : int
+        The number of levels on each side of the snapshot.
+
+    changes : int
+        The number of levels changed, added or removed by each update.
+
+    pairs : int
+        The number of books the updates are spread over.
+
+    seed : int
+        The seed of the generated updates.
+
+    Returns
+    -------
+    timings : dict
+        Updates per second for OrderBook ('order_book') and for rebuilding the dataframes
+        ('baseline'), and the bytes held by the books ('nbytes').
+
+    Examples
+    --------
+    >>> from okcoin.Benchmarks import benchmark_order_book
+    >>> benchmark_order_book(pairs=30)
+    """
+    rng = random.Random(seed)
+    bids = [['%.2f' % (10000 - i * 0.5), '%.4f' % rng.uniform(0, 2), '0', '1'] for i in range(levels)]
+    asks = [['%.2f' % (10001 + i * 0.5), '%.4f' % rng.uniform(0, 2), '0', '1'] for i in range(levels)]
+    books = [OrderBook(str(i), levels) for i in range(pairs)]
+    for book in books:
+        book.snapshot(bids, asks)
+
+    updates = []
+    for _ in range(n):
+        update = {'bids': [], 'asks': []}
+        for _ in range(changes):
+            side = rng.choice(('bids', 'asks'))
+            offset = rng.randrange(levels * 2) * 0.5
+            price = 10000 - offset if side == 'bids' else 10001 + offset
+            size = '0' if rng.random() < 0.3 else '%.4f' % rng.uniform(0, 2)
+            update[side].append(['%.2f' % price, size, '0', '1'])
+        updates.append(update)
+
+    start = time.perf_counter()
+    for i, update in enumerate(updates):
+        books[i % pairs].update(update['bids'], update['asks'])
+    order_book = n / (time.perf_counter() - start)
+
+    m = max(1, n // 50)
+    start = time.perf_counter()
+    for _ in range(m):
+        pd.DataFrame(asks, columns=['ask price', 'ask size', 'liquidated orders', 'orders'])
+        pd.DataFrame(bids, columns=['bid price', 'bid size', 'liquidated orders', 'orders'])
+    baseline = m / (time.perf_counter() - start)
+
+    return {'order_book': round(order_book), 'baseline': round(baseline),
+            'nbytes': sum(book.nbytes for book in books)}
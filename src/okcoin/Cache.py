@@ -0,0 +1,113 @@
+import os
+import hashlib
+import configparser
+import threading
+
+MAX_BYTES = 1024 * 1024 * 1024
+EXTENSION = '.arrow'
+
+
+class BlobCache:
+    r"""
+    A local cache of decoded blobs. Each entry is keyed by the blob name and etag, so a blob
+    that changes is fetched again while an unchanged blob never is. Entries are stored as
+    uncompressed Arrow (Feather) files that are memory-mapped when read, and the least
+    recently used entries are removed once the cache grows past max_bytes. Requires pyarrow.
+
+
+    Parameters
+    ----------
+    directory : The directory holding the cache. It is created if it does not exist.
+
+    max_bytes : The largest total size of the cached files, 1 GiB by default.
+
+    Attributes
+    ----------
+    hits : The number of lookups answered from the cache.
+
+    misses : The number of lookups that were not.
+
+    Examples
+    --------
+    >>> import okcoin.DataMangement as dm
+    >>> from okcoin.Cache import BlobCache
+    >>> cache = BlobCache(r"C:\okcoin-cache", max_bytes=512 * 1024 * 1024)
+    >>> df = dm.dataframe_from_azure_storage(r"C:\azure.config", cache=cache)
+    >>> cache.hits, cache.misses
+    """
+
+    def __init__(self, directory, max_bytes=MAX_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, name, etag):
+        key = hashlib.sha256((name + '\0' + str(etag)).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + EXTENSION)
+
+    def get(self, name, etag):
+        r"""Returns the cached dataframe of a blob version, or None."""
+        from pyarrow import feather
+        path = self.path(name, etag)
+        try:
+            table = feather.read_table(path, memory_map=True)
+            os.utime(path)  # the modification time orders the entries for eviction
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return table.to_pandas(split_blocks=True)
+
+    def put(self, name, etag, df):
+        r"""Caches the dataframe of a blob version. Frames that Arrow cannot store,
+        such as object columns of mixed types, are not cached."""
+        from pyarrow import feather
+        path = self.path(name, etag)
+        temp = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+        try:
+            feather.write_feather(df.reset_index(drop=True), temp, compression='uncompressed')
+        except (TypeError, ValueError):
+            if os.path.exists(temp):
+                os.remove(temp)
+            return
+        os.replace(temp, path)
+        self.evict()
+
+    def evict(self):
+        r"""Removes the least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            for file in os.listdir(self.directory):
+                if file.endswith(EXTENSION):
+                    stat = os.stat(os.path.join(self.directory, file))
+                    entries.append((stat.st_mtime_ns, stat.st_size, file))
+            total = sum(size for _, size, _ in entries)
+            for _, size, file in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, file))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def clear(self):
+        for file in os.listdir(self.directory):
+            if file.endswith(EXTENSION):
+                os.remove(os.path.join(self.directory, file))
+
+
+def open_cache(config_file="azure.config"):
+    r""" Returns the BlobCache described by the 'cache_path' and 'cache_size_mb' entries of the
+    [DEFAULT] section of an azure config file, or None if 'cache_path' is not set."""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    if 'cache_path' not in config['DEFAULT']:
+        return None
+    max_bytes = int(float(config['DEFAULT'].get('cache_size_mb', MAX_BYTES / 1024 / 1024)) * 1024 * 1024)
+    return BlobCache(config['DEFAULT']['cache_path'], max_bytes)
@@ -0,0 +1,384 @@
+import os
+import datetime
+import threading
+import configparser
+import numpy as np
+import pandas as pd
+
+from okcoin import ticker
+
+EXTENSION = '.candles'
+# One fixed-width record per bar. Files are raw arrays of these records, so they can be
+# appended to and memory-mapped without any decoding.
+CANDLE_DTYPE = np.dtype([('time', 'M8[ms]'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                         ('close', '<f8'), ('volume', '<f8')])
+FIELDS = CANDLE_DTYPE.names
+# Weekly bars start on Monday 00:00 UTC; the epoch fell on a Thursday.
+WEEK_OFFSET = 4 * 86400 * 1000
+
+
+def bar_start(ms, granularity):
+    r"""Returns the start of the UTC aligned bar holding each time in milliseconds since the epoch."""
+    step = granularity * 1000
+    offset = WEEK_OFFSET if granularity == 604800 else 0
+    return (np.asarray(ms, dtype=np.int64) - offset) // step * step + offset
+
+
+def _ms(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return int(ts.value // 1_000_000)
+
+
+def _empty():
+    return np.empty(0, dtype=CANDLE_DTYPE)
+
+
+def to_records(df):
+    r"""Converts a dataframe with the columns time, open, high, low, close and volume to candle records."""
+    records = np.empty(len(df), dtype=CANDLE_DTYPE)
+    records['time'] = pd.to_datetime(df['time'], utc=True).dt.tz_convert(None).to_numpy().astype('M8[ms]')
+    for field in FIELDS[1:]:
+        records[field] = df[field].to_numpy(dtype=float)
+    return records
+
+
+def resample(candles, granularity, source_granularity=60, drop_partial=False):
+    r""" Aggregates candles into a coarser granularity of get_granularity(). Bars are aligned
+    to UTC, weekly bars to Monday 00:00 UTC. Each bar opens at the open of its first source
+    candle, closes at the close of its last, and takes the highest high, the lowest low and
+    the total volume.
+
+    Parameters
+    ----------
+    candles : ndarray or DataFrame
+        Candles sorted by time as CANDLE_DTYPE records, for example, from CandleStore.range(),
+        or as a dataframe with the columns time, open, high, low, close and volume.
+
+    granularity : int
+        The granularity to build, in seconds. It must be a multiple of source_granularity.
+
+    source_granularity : int
+        The granularity of candles, in seconds.
+
+    drop_partial : bool
+        If True, the last bar is dropped unless candles reach its end.
+
+    Returns
+    -------
+    candles : ndarray
+        CANDLE_DTYPE records, one per bar that holds at least one source candle.
+
+    Examples
+    --------
+    >>> from okcoin.Candles import CandleStore, resample
+    >>> minutes = CandleStore(r"C:\okcoin-candles").range('BTC-USD', 60, '2021-01-01', '2021-02-01')
+    >>> hours = resample(minutes, 3600)
+    >>> weeks = resample(minutes, 604800)
+    """
+    if granularity % source_granularity or granularity < source_granularity:
+        raise ValueError("A granularity of %d cannot be built from candles of %d"
+                         % (granularity, source_granularity))
+    records = candles if isinstance(candles, np.ndarray) else to_records(candles)
+    if len(records) == 0:
+        return _empty()
+    times = records['time'].astype(np.int64)
+    starts = bar_start(times, granularity)
+    # Candles are sorted, so the candles of a bar are adjacent.
+    first = np.concatenate(([0], np.flatnonzero(starts[1:] != starts[:-1]) + 1))
+    last = np.concatenate((first[1:], [len(records)])) - 1
+    bars = np.empty(len(first), dtype=CANDLE_DTYPE)
+    bars['time'] = starts[first].astype('M8[ms]')
+    bars['open'] = records['open'][first]
+    bars['high'] = np.fmax.reduceat(records['high'], first)
+    bars['low'] = np.fmin.reduceat(records['low'], first)
+    bars['close'] = records['close'][last]
+    bars['volume'] = np.add.reduceat(np.nan_to_num(records['volume']), first)
+    if drop_partial and times[-1] + source_granularity * 1000 < starts[-1] + granularity * 1000:
+        bars = bars[:-1]
+    return bars
+
+
+def resample_all(candles, source_granularity=60, drop_partial=False):
+    r"""Returns a dictionary of every coarser granularity of get_granularity() that can be built
+    from candles, to its resampled candles. Each granularity is built from the coarsest one
+    already built that divides it, so the source candles are only read once."""
+    records = candles if isinstance(candles, np.ndarray) else to_records(candles)
+    built = {source_granularity: records}
+    for granularity in sorted(ticker.get_granularity()):
+        if granularity > source_granularity and granularity % source_granularity == 0:
+            source = max(g for g in built if granularity % g == 0)
+            built[granularity] = resample(built[source], granularity, source)
+    del built[source_granularity]
+    if drop_partial and len(records):
+        end = records['time'][-1].astype(np.int64) + source_granularity * 1000
+        for granularity, bars in built.items():
+            if end < bars['time'][-1].astype(np.int64) + granularity * 1000:
+                built[granularity] = bars[:-1]
+    return built
+
+
+class BarBuilder:
+    r"""
+    Builds the bars of one granularity from a stream of trades or finer candles, such as the
+    'trades' or 'candle1m' channels of a MarketStream. The bar in progress is extended with
+    every update and is returned, closed, once an update falls in a later bar.
+
+
+    Parameters
+    ----------
+    granularity : The granularity of the bars, in seconds.
+
+    on_bar : Called with each closed bar, as a CANDLE_DTYPE record.
+
+    Attributes
+    ----------
+    current : The bar in progress, as a CANDLE_DTYPE record, or None.
+
+    last_update : The time of the last trade or candle added, in milliseconds since the epoch.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> from okcoin.WebSocket import MarketStream
+    >>> from okcoin.Candles import BarBuilder
+    >>> hours = BarBuilder(3600, on_bar=print)
+    >>> async def main():
+    ...     async with MarketStream() as stream:
+    ...         await stream.subscribe('trades', 'BTC-USD', callback=hours.on_message)
+    ...         await asyncio.sleep(7200)
+    ...         print(hours.current)
+    >>> asyncio.run(main())
+    """
+
+    def __init__(self, granularity, on_bar=None):
+        self.granularity = granularity
+        self.on_bar = on_bar
+        self.current = None
+        self.last_update = None
+
+    def _extend(self, time, open, high, low, close, volume):
+        self.last_update = time
+        start = int(bar_start(time, self.granularity))
+        closed = None
+        bar = self.current
+        if bar is not None and start < bar['time'].astype(np.int64):
+            return None  # the bar has already been closed
+        if bar is None or start > bar['time'].astype(np.int64):
+            closed = bar
+            bar = self.current = np.zeros((), dtype=CANDLE_DTYPE)
+            bar['time'] = np.datetime64(start, 'ms')
+            bar['open'], bar['high'], bar['low'] = open, high, low
+        else:
+            bar['high'] = max(bar['high'], high)
+            bar['low'] = min(bar['low'], low)
+        bar['close'] = close
+        bar['volume'] += volume
+        if closed is not None and self.on_bar is not None:
+            self.on_bar(closed)
+        return closed
+
+    def add_trade(self, time, price, size):
+        r"""Adds a trade at a time in milliseconds since the epoch. Returns the bar it closed, or None."""
+        return self._extend(time, price, price, price, price, size)
+
+    def add_candle(self, time, open, high, low, close, volume):
+        r"""Adds a closed candle of a finer granularity. Returns the bar it closed, or None."""
+        return self._extend(time, open, high, low, close, volume)
+
+    def on_message(self, message):
+        r"""Adds the trades or closed candles of a MarketStream message. Of the records fetched
+        to catch up after a reconnect, only those newer than the last update are added."""
+        channel = message.get('arg', {}).get('channel', '')
+        candles = channel.startswith('candle')
+        records = message.get('data', ())
+        if message.get('resync'):
+            # REST returns the newest records first.
+            records = sorted(records, key=lambda data: int(data[0] if candles else data['ts']))
+        for data in records:
+            time = int(data[0] if candles else data['ts'])
+            if message.get('resync') and self.last_update is not None and time <= self.last_update:
+                continue
+            if candles:
+                # Candles are resent as they change; only closed ones are added.
+                if data[8] == '1':
+                    self.add_candle(time, *map(float, data[1:6]))
+            else:
+                self.add_trade(time, float(data['px']), float(data['sz']))
+
+
+class CandleStore:
+    r"""
+    An on-disk store of closed candles, one file per trading pair and granularity. Each file
+    is an array of fixed-width (time, open, high, low, close, volume) records sorted by time.
+    Files are memory-mapped when read, so reads return views of the page cache without copying
+    or going to the network, and refresh() only downloads the bars newer than the last one
+    stored and appends them. Bars still open are never stored, so stored bars never change.
+
+
+    Parameters
+    ----------
+    directory : The directory holding the store. It is created if it does not exist.
+
+    session : The Session used by refresh(). A new one is created for each refresh if it is
+    not specified.
+
+    Examples
+    --------
+    >>> from okcoin.Candles import CandleStore
+    >>> store = CandleStore(r"C:\okcoin-candles")
+    >>> store.refresh('BTC-USD', 60, start='2021-01-01')
+    525600
+    >>> candles = store.range('BTC-USD', 60, '2021-05-01', '2021-06-01')
+    >>> candles['close'].mean()
+    >>> store.frame('BTC-USD', 60).tail()
+    """
+
+    def __init__(self, directory, session=None):
+        self.directory = os.path.abspath(directory)
+        self.session = session
+        self._maps = {}   # path -> (size, memmap)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, trading_pair, granularity):
+        return os.path.join(self.directory, trading_pair, ticker.BARS[granularity] + EXTENSION)
+
+    def contents(self):
+        r"""Returns the (trading pair, granularity) of every file in the store."""
+        granularities = {bar: granularity for granularity, bar in ticker.BARS.items()}
+        found = []
+        for trading_pair in sorted(os.listdir(self.directory)):
+            folder = os.path.join(self.directory, trading_pair)
+            if os.path.isdir(folder):
+                for file in sorted(os.listdir(folder)):
+                    bar = file[:-len(EXTENSION)]
+                    if file.endswith(EXTENSION) and bar in granularities:
+                        found.append((trading_pair, granularities[bar]))
+        return found
+
+    def load(self, trading_pair, granularity):
+        r""" Returns every stored candle of a trading pair as a read-only memory-mapped record
+        array sorted by time. Fields are views, for example, load('BTC-USD', 60)['close'].
+        The file is mapped again only when it has grown.
+        """
+        path = self.path(trading_pair, granularity)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return _empty()
+        # A record cut short by an interrupted append is ignored.
+        size -= size % CANDLE_DTYPE.itemsize
+        cached = self._maps.get(path)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        if size == 0:
+            return _empty()
+        records = np.memmap(path, dtype=CANDLE_DTYPE, mode='r', shape=(size // CANDLE_DTYPE.itemsize,))
+        self._maps[path] = (size, records)
+        return records
+
+    def range(self, trading_pair, granularity, start=None, end=None):
+        r"""Returns the candles from start (inclusive) to end (exclusive) as a view. Naive times are in UTC."""
+        records = self.load(trading_pair, granularity)
+        times = records['time']
+        lo = 0 if start is None else np.searchsorted(times, np.datetime64(_ms(start), 'ms'), 'left')
+        hi = len(times) if end is None else np.searchsorted(times, np.datetime64(_ms(end), 'ms'), 'left')
+        return records[lo:hi]
+
+    def frame(self, trading_pair, granularity, start=None, end=None):
+        r"""Returns the candles from start to end as a dataframe with the columns of get_candlestick_chart."""
+        return pd.DataFrame(self.range(trading_pair, granularity, start, end))
+
+    def resampled(self, trading_pair, granularity, source_granularity=60, start=None, end=None):
+        r"""Returns the candles of a granularity from start to end, built from the stored candles
+        of source_granularity instead of being downloaded."""
+        if start is not None:
+            start = pd.Timestamp(int(bar_start(_ms(start), granularity)), unit='ms')
+        return resample(self.range(trading_pair, source_granularity, start, end), granularity,
+                        source_granularity)
+
+    def last_time(self, trading_pair, granularity):
+        r"""Returns the start of the last stored bar, or None if nothing is stored."""
+        records = self.load(trading_pair, granularity)
+        return records['time'][-1] if len(records) else None
+
+    def append(self, trading_pair, granularity, candles):
+        r""" Appends the candles that start after the last stored bar.
+
+        Parameters
+        ----------
+        candles : ndarray or DataFrame
+            Closed candles as CANDLE_DTYPE records or as a dataframe with the columns time, open,
+            high, low, close and volume.
+
+        Returns
+        -------
+        appended : int
+            The number of bars appended.
+        """
+        records = candles if isinstance(candles, np.ndarray) else to_records(candles)
+        records = np.sort(records.astype(CANDLE_DTYPE, copy=False), order='time', kind='stable')
+        if len(records):
+            keep = np.concatenate(([True], records['time'][1:] != records['time'][:-1]))
+            records = records[keep]
+        path = self.path(trading_pair, granularity)
+        with self._lock:
+            last = self.last_time(trading_pair, granularity)
+            if last is not None:
+                records = records[records['time'] > last]
+            if len(records):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'ab') as f:
+                    size = f.tell()
+                    # Drop a record cut short by an earlier interrupted append.
+                    if size % CANDLE_DTYPE.itemsize:
+                        f.truncate(size - size % CANDLE_DTYPE.itemsize)
+                    f.write(records.tobytes())
+        return len(records)
+
+    def refresh(self, trading_pair, granularity, start=None, end=None, **kwargs):
+        r""" Downloads the bars closed since the last stored one with ticker.backfill_candles
+        and appends them.
+
+        Parameters
+        ----------
+        start : str or datetime
+            Where to start when nothing is stored yet. Ignored otherwise.
+
+        end : str or datetime
+            Download the bars closed by this time. Set to now by default.
+
+        Returns
+        -------
+        appended : int
+            The number of bars appended.
+        """
+        last = self.last_time(trading_pair, granularity)
+        if last is not None:
+            start = last.astype(np.int64) + granularity * 1000
+        elif start is None:
+            raise ValueError("start is required when no candles of %s are stored" % trading_pair)
+        else:
+            start = _ms(start)
+        if end is None:
+            end = datetime.datetime.now(datetime.timezone.utc)
+        # Only bars that have closed by end are requested.
+        end = int(bar_start(_ms(end), granularity))
+        if start >= end:
+            return 0
+        candles = ticker.backfill_candles(trading_pair, pd.Timestamp(start, unit='ms'),
+                                          pd.Timestamp(end, unit='ms'), granularity,
+                                          session=self.session, **kwargs)
+        return self.append(trading_pair, granularity, candles.df)
+
+
+def open_candle_store(config_file="azure.config", session=None):
+    r""" Returns the CandleStore in the 'candle_path' entry of the [DEFAULT] section of an azure
+    config file, or None if it is not set."""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    if 'candle_path' not in config['DEFAULT']:
+        return None
+    return CandleStore(config['DEFAULT']['candle_path'], session=session)
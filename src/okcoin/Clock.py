@@ -0,0 +1,125 @@
+import time
+import threading
+import requests
+
+SERVER_TIME_PATH = '/api/v5/public/time'
+# okcoin error code for a request whose OK-ACCESS-TIMESTAMP is outside the accepted window.
+TIMESTAMP_EXPIRED = b'50102'
+
+# (second, 'YYYY-MM-DDTHH:MM:SS') of the most recent timestamp, so strftime runs once a second
+_timestamp_prefix = (None, '')
+
+
+def _timestamp(t=None):
+    r"""Formats a unix time as the ISO 8601 millisecond timestamp okcoin expects,
+    e.g. '2021-05-13T02:21:30.061Z'. Defaults to the current time."""
+    global _timestamp_prefix
+    if t is None:
+        t = time.time()
+    second = int(t)
+    cached_second, prefix = _timestamp_prefix
+    if second != cached_second:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+        _timestamp_prefix = (second, prefix)
+    return '%s.%03dZ' % (prefix, int((t - second) * 1000))
+
+
+class Clock:
+    r"""
+    The Clock class tracks okcoin server time against the local monotonic clock. It syncs
+    with /api/v5/public/time and then derives every timestamp from the monotonic clock, so
+    that drift or steps in the host clock do not cause "timestamp expired" rejections.
+    Until the first sync the local wall clock is used.
+
+
+    Parameters
+    ----------
+    session : The Session used to query the server time.
+
+    resync_interval : The number of seconds between background re-syncs. Set to None to only
+    sync on demand.
+
+    Attributes
+    ----------
+    offset : The number of seconds the server clock is ahead of the local wall clock.
+
+    synced : True once the Clock has synced with okcoin.
+
+    Examples
+    --------
+    >>> from okcoin import Session
+    >>> session = Session()
+    >>> session.clock.offset
+    0.012
+    >>> session.clock.timestamp()
+    '2021-05-13T02:21:30.061Z'
+    """
+
+    def __init__(self, session=None, resync_interval=300):
+        self.session = session
+        self.resync_interval = resync_interval
+        self.synced = False
+        # server time = time.monotonic() + self._anchor
+        self._anchor = time.time() - time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def offset(self):
+        return self._anchor + time.monotonic() - time.time()
+
+    def time(self):
+        r"""Returns the current okcoin server time as a unix time in seconds."""
+        return time.monotonic() + self._anchor
+
+    def timestamp(self):
+        r"""Returns the current okcoin server time formatted for OK-ACCESS-TIMESTAMP."""
+        return _timestamp(time.monotonic() + self._anchor)
+
+    def update(self, server_ms, sent, received):
+        r"""Anchors the Clock to a server time reading. The reading is assumed to have been
+        taken halfway between the monotonic times the request was sent and received."""
+        self._anchor = int(server_ms) / 1000 - (sent + received) / 2
+        self.synced = True
+
+    def sync(self):
+        r"""Queries the okcoin server time and re-anchors the Clock, then starts the
+        background re-sync if it is not already running.
+
+        Returns
+        -------
+        synced : bool
+            False if the server time could not be retrieved.
+        """
+        with self._lock:
+            try:
+                sent = time.monotonic()
+                r = self.session.get(self.session.base_url + SERVER_TIME_PATH)
+                received = time.monotonic()
+                self.update(r.json()['data'][0]['ts'], sent, received)
+            except (requests.RequestException, ValueError, KeyError, IndexError):
+                return False
+        self.start()
+        return True
+
+    def rejected(self, response):
+        r"""Returns True if okcoin rejected a response because of its timestamp."""
+        return response.status_code >= 400 and TIMESTAMP_EXPIRED in response.content
+
+    def start(self):
+        r"""Starts re-syncing every resync_interval seconds in a daemon thread."""
+        if self.resync_interval is None or self.session is None or \
+                (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='okcoin-clock', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        r"""Stops the background re-sync."""
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.resync_interval):
+            self.sync()
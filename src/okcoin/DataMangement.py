@@ -1,11 +1,32 @@
-import os
+import json
+import hashlib
 import datetime
 import time
+import warnings
 import configparser
 import pandas as pd
-from io import  StringIO
+from concurrent.futures import ThreadPoolExecutor
 import plotly.graph_objects as go
-from azure.storage.blob import BlobServiceClient
+
+from okcoin.Pagination import ColumnAccumulator
+from okcoin.Formats import format_for, partition, TIME_COLUMNS, CURRENCY_COLUMNS, _first_column
+from okcoin.Storage import Manifest, open_backend, MANIFEST_BLOB
+from okcoin.Cache import open_cache
+from okcoin.Ledger import Ledger
+
+# V5 bill fields renamed to the ledger columns used by the stored history and the reports.
+LEDGER_COLUMNS = {'billId': 'ledger_id',
+                  'balChg': 'amount',
+                  'bal': 'balance',
+                  'ccy': 'currency',
+                  'ts': 'timestamp'}
+CHECKPOINT_BLOB = "checkpoints.json"
+# The bills archive only reaches this far back.
+ARCHIVE_WINDOW = datetime.timedelta(days=90)
+# The 'source' of the records uploaded by sync_ledger. Snapshots of Account.get_ledger have no
+# source column and number their records independently of the V5 bill IDs.
+BILLS_SOURCE = 'bills'
+LEDGER_SOURCE = 'ledger'
 
 
 def upload_to_azure_storage(df,
@@ -13,9 +34,16 @@ def upload_to_azure_storage(df,
                             record_type="ledger",
                             connection_string=None,
                             data_path=None,
-                            container_name=None):
+                            container_name=None,
+                            storage_format=None,
+                            backend=None,
+                            max_workers=4):
     r""" uploads a ledger dataframe as a CSV into a Azure Blob Storage container.
     This is meant to be run daily so that we can track any staking reqards that are deposited daily.
+    With the 'parquet' format the dataframe is instead uploaded as zstd compressed Parquet files,
+    one per date and currency, under '<record_type>/date=<YYYY-MM-DD>/currency=<currency>/'.
+    Each uploaded blob is added to the manifest used by dataframe_from_azure_storage.
+    Dataframes are serialized in memory and uploaded in blocks; no local files are written.
 
     Parameters
     ----------
@@ -30,16 +58,26 @@ def upload_to_azure_storage(df,
         Azure connection string. Must be specified is a config file is not used.
 
     data_path : str
-        Local file path for CSV to be created before uploading to Azure
+        No longer used. CSVs were written to this path before being uploaded.
 
     container_name : str
         The name of the Azure storage container to uplaod the CSV to.
 
+    storage_format : str
+        'csv' or 'parquet'. Set to the 'format' entry of the config file, or 'csv', by default.
+
+    backend : AzureBlobBackend or LocalBackend
+        The storage to upload to. Set to the backend described by the config file by default.
+
+    max_workers : int
+        The number of Parquet partitions uploaded at once.
+
 
     Returns
     -------
     blob_client.account_name, blob_client.container_name, blob_client.blob_name : tuple
-        returns a tuple of the Azure account name, container name, and CSV file name
+        returns a tuple of the Azure account name, container name, and CSV file name. With the
+        'parquet' format the last item is the list of uploaded blob names.
 
     Examples
     --------
@@ -48,44 +86,64 @@ def upload_to_azure_storage(df,
     >>> acc = Account(r"C:\auth.config")
     >>> ledger = acc.get_ledger()
     >>> dm.upload_to_azure_storage(ledger.df,  r"C:\azure.config")
+    >>> dm.upload_to_azure_storage(ledger.df,  r"C:\azure.config", storage_format='parquet')
     """
 
     config = configparser.ConfigParser()
     config.read(config_file)
 
-    # Create a local directory to hold blob data
-    connection_string = config['DEFAULT']['connection_string']  # secret_key
-    data_path = config['DEFAULT']['data_path']
-    container_name = config['DEFAULT']['container_name']
+    if storage_format is None:
+        storage_format = config['DEFAULT'].get('format', 'csv')
+    if backend is None:
+        backend = open_backend(config_file)
 
-    # Create a file in the local data directory to upload and download
     ts = time.time()
     st = datetime.datetime.fromtimestamp(ts).strftime('%Y%m%d_%H%M%S')
-    local_file_name = record_type+"_" + st + ".csv"
-    upload_file_path = os.path.join(data_path, local_file_name)
 
-    # Write text to the file
-    csv = df.to_csv(upload_file_path)
+    fmt = format_for(storage_format)
+    parts = [('', df)] if fmt.name == 'csv' else partition(df, record_type)
 
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+    def put(item):
+        prefix, part = item
+        blob_name = prefix + record_type + "_" + st + fmt.extension
+        return blob_name, part, backend.write(blob_name, fmt.serialize(part))
 
-    blob_client = blob_service_client.get_blob_client(container=container_name, blob=local_file_name)
-    print(blob_client.account_name)
-    print(blob_client.blob_name)
-    print(blob_client.container_name)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        uploaded = list(pool.map(put, parts))
 
-    with open(upload_file_path, "rb") as data:
-        blob_client.upload_blob(data)
+    manifest = Manifest.load(backend)
+    for blob_name, part, etag in uploaded:
+        manifest.add(blob_name, part, etag, record_type)
+    manifest.save(backend)
 
-    return blob_client.account_name, blob_client.container_name, blob_client.blob_name
+    blob_names = [blob_name for blob_name, _, _ in uploaded]
+    if fmt.name != 'csv':
+        return backend.account_name, backend.container_name, blob_names
+
+    print(backend.account_name)
+    print(blob_names[0])
+    print(backend.container_name)
+
+    return backend.account_name, backend.container_name, blob_names[0]
 
 
 def dataframe_from_azure_storage(config_file="azure.config",
                             filter="ledger",
                             connection_string=None,
                             data_path=None,
-                            container_name=None):
-    r""" Retrieves all of the ledger data stored in Azure blob storage.
+                            container_name=None,
+                            max_workers=8,
+                            progress=None,
+                            start=None,
+                            end=None,
+                            currency=None,
+                            backend=None,
+                            cache=None,
+                            blob_names=None):
+    r""" Retrieves all of the ledger data stored in Azure blob storage. CSV and Parquet blobs
+    are both read; Parquet blobs keep their column types. The blobs are downloaded and parsed
+    concurrently and concatenated once at the end. When start, end or currency are given, the
+    manifest is used to download only the blobs that may hold matching records.
 
     Parameters
     ----------
@@ -102,6 +160,30 @@ def dataframe_from_azure_storage(config_file="azure.config",
     container_name : str
         The name of the Azure storage container to uplaod the CSV to.
 
+    max_workers : int
+        The number of blobs downloaded at once.
+
+    progress : callable
+        Called as progress(done, total, nbytes) each time a blob is parsed, where nbytes is
+        the total size of the blobs downloaded so far.
+
+    start, end : str or datetime
+        Only return records between these times (inclusive). Naive times are in UTC.
+
+    currency : str
+        Only return records of this currency, for example, 'STX'.
+
+    backend : AzureBlobBackend or LocalBackend
+        The storage to read from. Set to the backend described by the config file by default.
+
+    cache : BlobCache
+        A local cache of decoded blobs, keyed by blob name and etag, so that unchanged blobs
+        are downloaded only once. Set from the 'cache_path' entry of the config file by default;
+        no cache is used if it is not set.
+
+    blob_names : list
+        Read only these blobs instead of the blobs matching filter, start, end and currency.
+
 
     Returns
     -------
@@ -114,64 +196,123 @@ def dataframe_from_azure_storage(config_file="azure.config",
     >>> import okcoin.DataMangement as dm
     >>> df = dm.dataframe_from_azure_storage(r"C:\azure.config")
     >>> print(df)
+    >>> df = dm.dataframe_from_azure_storage(r"C:\azure.config", progress=lambda d, t, n: print(d, t, n))
+    >>> stx = dm.dataframe_from_azure_storage(r"C:\azure.config", start='2021-05-01', currency='STX')
     """
 
-    config = configparser.ConfigParser()
-    config.read(config_file)
-
-    # Create a local directory to hold blob data
-    connection_string = config['DEFAULT']['connection_string']  # secret_key
-    data_path = config['DEFAULT']['data_path']
-    container_name = config['DEFAULT']['container_name']
-
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-
-    container_client = blob_service_client.get_container_client(container_name)
+    if backend is None:
+        backend = open_backend(config_file)
 
     print("\nListing blobs...")
 
+    if cache is None:
+        cache = open_cache(config_file)
+
     # List the blobs in the container
-    blob_list = container_client.list_blobs()
-    #for bl in blob_list:
-    #    if filter in bl.name:
-    #        print(bl.name)
-
-    start = True
-    for idx, blob in enumerate(blob_list):
-        if filter in blob.name:
-            print("\t" + blob.name)
-            blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob.name)
-            data = blob_client.download_blob().readall()
-
-            if start: #idx == 0:
-                start = False
-                df = pd.read_csv(StringIO(data.decode("utf-8")))
-            else:
-                t_df = pd.read_csv(StringIO(data.decode("utf-8")))
-                df = pd.concat([df, t_df])
-                del t_df
+    blobs = backend.list()
+    etags = {blob.name: blob.etag for blob in blobs}
+    if blob_names is None:
+        blob_names = Manifest.load(backend).select(blobs, filter, start, end, currency)
+    for name in blob_names:
+        print("\t" + name)
+
+    def fetch(name):
+        if cache is not None:
+            df = cache.get(name, etags[name])
+            if df is not None:
+                return df, 0
+        data = backend.read(name)
+        df = format_for(name).deserialize(data)
+        if cache is not None:
+            cache.put(name, etags[name], df)
+        return df, len(data)
+
+    frames = []
+    nbytes = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # map keeps the listing order, so the first copy of a duplicated record is kept as before.
+        for done, (frame, size) in enumerate(pool.map(fetch, blob_names), 1):
+            frames.append(frame)
+            nbytes += size
+            if progress is not None:
+                progress(done, len(blob_names), nbytes)
+
+    if not frames:
+        return pd.DataFrame()
+    df = _select_rows(pd.concat(frames, ignore_index=True), start, end, currency)
+
+    # Only snapshots uploaded before sync_ledger overlap; synced deltas never do.
+    return drop_duplicate_records(df)
+
+
+def drop_duplicate_records(df):
+    r"""Drops repeated ledger records, keeping the first copy. Snapshots of Account.get_ledger
+    and the bills uploaded by sync_ledger number their records independently, so IDs are only
+    compared within a source."""
+    if 'ledger_id' not in df.columns:
+        return df
+    if 'source' not in df.columns:
+        return df.drop_duplicates(keep='first', subset=['ledger_id'])
+    keys = pd.DataFrame({'source': df['source'].fillna(LEDGER_SOURCE), 'ledger_id': df['ledger_id']})
+    return df[~keys.duplicated(keep='first')]
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+def _select_rows(df, start=None, end=None, currency=None):
+    mask = pd.Series(True, index=df.index)
+    time_column = _first_column(df, TIME_COLUMNS)
+    if time_column is not None and (start is not None or end is not None):
+        times = pd.to_datetime(df[time_column], utc=True, format='ISO8601', errors='coerce')
+        if start is not None:
+            mask &= times >= _utc(start)
+        if end is not None:
+            mask &= times <= _utc(end)
+    currency_column = _first_column(df, CURRENCY_COLUMNS)
+    if currency_column is not None and currency is not None:
+        mask &= df[currency_column] == currency
+    return df[mask].reset_index(drop=True) if not mask.all() else df
+
+
+def build_manifest(config_file="azure.config", backend=None):
+    r""" Adds the blobs uploaded before the manifest existed, or changed since they were
+    indexed, to the manifest. Each of them is downloaded once.
 
-    df.reset_index(inplace=True)
-    try:
-        df.drop(['Unnamed: 0'], axis=1, inplace=True)
-    except:
-        print("No column to drop.")
-    try:
-        df.drop(['index'], axis=1, inplace=True)
-    except:
-        print("No column to drop.")
+    Returns
+    -------
+    manifest : Manifest
 
-    df.drop_duplicates(keep='first', subset=['ledger_id'], inplace=True)
+    Examples
+    --------
+    >>> import okcoin.DataMangement as dm
+    >>> manifest = dm.build_manifest(r"C:\azure.config")
+    """
+    if backend is None:
+        backend = open_backend(config_file)
+    manifest = Manifest.load(backend)
+    for blob in backend.list():
+        entry = manifest.entries.get(blob.name)
+        if blob.name in (MANIFEST_BLOB, CHECKPOINT_BLOB) or (entry and entry['etag'] == blob.etag):
+            continue
+        try:
+            fmt = format_for(blob.name)
+        except ValueError:
+            continue
+        manifest.add(blob.name, fmt.deserialize(backend.read(blob.name)), blob.etag)
+    manifest.save(backend)
+    return manifest
 
-    return df
 
 def plot_staking_history(df, currency='BTC'):
     r""" Creates a Plotly chart of the asset that you want to plot.
 
     Parameters
     ----------
-    df : DataFrame
-        A dataframe consisting of the ledger information that you want to plot.
+    df : DataFrame or Ledger
+        A dataframe consisting of the ledger information that you want to plot, or a Ledger
+        built from it. The dataframe is not modified.
 
     currency : str
         The currency you want to plot, for example, 'BTC'.
@@ -189,11 +330,8 @@ def plot_staking_history(df, currency='BTC'):
     >>> chart = dm.plot_staking_history(df, 'BTC')
     """
 
-    df['timestamp'] = pd.to_datetime(df['timestamp']).dt.date
-    cur = df[df['currency'] == currency]
-    cur_balance = cur.groupby('timestamp')['balance'].max()
-    balance = cur_balance.to_frame()
-    balance.reset_index(inplace=True)
+    ledger = df if isinstance(df, Ledger) else Ledger(df)
+    balance = ledger.balance_history(currency, freq='D')
 
     fig = go.Figure(data=go.Scatter(
         x=balance.timestamp.tolist(),
@@ -209,13 +347,122 @@ def plot_staking_history(df, currency='BTC'):
     return fig
 
 
+def load_checkpoints(config_file="azure.config", checkpoint_blob=CHECKPOINT_BLOB):
+    r""" Retrieves the ledger sync checkpoints stored next to the ledger history.
+
+    Parameters
+    ----------
+    config_file : str
+        The name of the azure config file that holds the connection string and container name.
+
+    checkpoint_blob : str
+        The name of the blob holding the checkpoints.
+
+    Returns
+    -------
+    checkpoints : dict
+        A dictionary of account to {'ledger_id': last bill ID, 'timestamp': its time in ms}.
+        Empty if nothing has been synced yet.
+    """
+    try:
+        return json.loads(open_backend(config_file).read(checkpoint_blob))
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoints(checkpoints, config_file="azure.config", checkpoint_blob=CHECKPOINT_BLOB):
+    r""" Stores the ledger sync checkpoints next to the ledger history, replacing the previous ones."""
+    open_backend(config_file).write(checkpoint_blob, json.dumps(checkpoints, indent=1).encode('utf-8'),
+                                    overwrite=True)
+
+
+def sync_ledger(spot, config_file="azure.config", account=None, record_type="ledger"):
+    r""" Uploads the bills that are newer than the account's checkpoint as a delta, then
+    advances the checkpoint to the newest bill. The first run uploads the 3 month bills
+    archive, less the bills older than the newest record already stored under record_type.
+    Runs with no new bills upload nothing.
+
+    The stored history used to be snapshots of Account.get_ledger (/api/account/v5/ledger).
+    sync_ledger reads the V5 bills archive (/api/v5/account/bills-archive) instead, renamed to
+    the ledger columns and with a 'source' column of BILLS_SOURCE, since bill IDs and ledger
+    IDs are not comparable. The archive only keeps 3 months of bills, so a run more than
+    ARCHIVE_WINDOW after the previous one warns that older bills could not be retrieved.
+
+    Parameters
+    ----------
+    spot : Spot
+        The client used to retrieve the bills.
+
+    config_file : str
+        The name of the azure config file that holds the connection string, account name, and
+        temporary local filesystem location for storing the CSV.
+
+    account : str
+        The name the checkpoint is stored under. Set to a hash of the API key by default.
+
+    record_type : str
+        The prefix of the uploaded blobs.
+
+    Returns
+    -------
+    delta : DataFrame
+        The bills that were uploaded, using the ledger column names.
+
+    Examples
+    --------
+    >>> from okcoin import Spot
+    >>> import okcoin.DataMangement as dm
+    >>> spot = Spot(r"C:\auth.config")
+    >>> delta = dm.sync_ledger(spot, r"C:\azure.config")
+    """
+    if account is None:
+        account = hashlib.sha256(spot.api_key.encode('utf-8')).hexdigest()[:16]
+
+    checkpoints = load_checkpoints(config_file)
+    checkpoint = checkpoints.get(account)
+    stored_until = None
+    if checkpoint:
+        archive_start = datetime.datetime.now(datetime.timezone.utc) - ARCHIVE_WINDOW
+        if checkpoint['timestamp'] < archive_start.timestamp() * 1000:
+            warnings.warn("The last ledger sync of %s was on %s, before the %d days kept by the bills "
+                          "archive. Bills until %s are missing from the stored history."
+                          % (account, pd.Timestamp(checkpoint['timestamp'], unit='ms', tz='UTC'),
+                             ARCHIVE_WINDOW.days, archive_start), RuntimeWarning)
+        pages = spot.iter_bills_archive(before=checkpoint['ledger_id'])
+    else:
+        # Continue from the snapshots uploaded before the first sync rather than store bills twice.
+        ends = [entry['end'] for entry in Manifest.load(open_backend(config_file)).entries.values()
+                if entry['record_type'] == record_type and entry['end'] is not None]
+        stored_until = max(ends, default=None)
+        pages = spot.iter_bills_archive()
+
+    accumulator = ColumnAccumulator()
+    for page in pages:
+        accumulator.add(page)
+    delta = accumulator.to_frame().rename(columns=LEDGER_COLUMNS)
+    if stored_until is not None and len(delta):
+        times = pd.to_datetime(delta['timestamp'], utc=True)
+        delta = delta[times > pd.Timestamp(stored_until, unit='ms', tz='UTC')]
+    if len(delta) == 0:
+        return delta
+
+    delta = delta.sort_values('ledger_id', ascending=False).reset_index(drop=True)
+    delta['source'] = BILLS_SOURCE
+    upload_to_azure_storage(delta, config_file, record_type)
+
+    newest = delta.iloc[0]
+    checkpoints[account] = {'ledger_id': str(newest['ledger_id']),
+                            'timestamp': int(pd.Timestamp(newest['timestamp']).value // 1_000_000)}
+    save_checkpoints(checkpoints, config_file)
+    return delta
+
+
 def upload_ledger_history():
-    from okcoin import Account
-    acc = Account(r"C:\Users\gbrunner\Documents\GitHub\python-api-for-okcoin\src\auth.config")
-    ledger = acc.get_ledger()
-    df = upload_to_azure_storage(ledger.df,
-                                 r"C:\Users\gbrunner\Documents\GitHub\python-api-for-okcoin\src\azure.config",
-                                 "ledger")
+    from okcoin import Spot
+    spot = Spot(r"C:\Users\gbrunner\Documents\GitHub\python-api-for-okcoin\src\auth.config")
+    df = sync_ledger(spot,
+                     r"C:\Users\gbrunner\Documents\GitHub\python-api-for-okcoin\src\azure.config",
+                     record_type="ledger")
     return df
 
 
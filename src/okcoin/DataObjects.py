@@ -1,19 +1,113 @@
+import json
 import pandas as pd
 import plotly.graph_objects as go
+from urllib.parse import urlsplit
+
+from okcoin.Errors import OkcoinAPIError
+from okcoin.Schemas import schema_for, unwrap, decode
+
+# orjson decodes several times faster than json when it is installed.
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Set to True to make every _Resp drop its requests.Response once the body has been read.
+SLIM = False
+
+_UNSET = object()
 
 
 class _Resp:
-    def __init__(self, r, trading_pair=None):
+    r"""Wraps a query response. The body is kept as raw bytes and decoded at most once, when
+    json or df is first read, and the dataframe is only built if df is read.
+
+    When the endpoint has a registered Schema, the V5 envelope is unwrapped: columns holds the
+    records of 'data' as typed NumPy arrays, df is built from those columns, and a non-zero
+    code is raised as a typed OkcoinAPIError instead.
+
+    Parameters
+    ----------
+    r : requests.Response
+        The response to wrap.
+
+    trading_pair : str
+        The trading pair the response is for, if any.
+
+    slim : bool
+        If True, r is dropped as soon as its body has been read and only the raw bytes and
+        status code are kept. Defaults to the module-level SLIM setting.
+    """
+
+    def __init__(self, r, trading_pair=None, slim=None):
+        self.r = r
+        self.raw = r.content
+        self.status_code = r.status_code
+        self.trading_pair = trading_pair
+        self.request_path = urlsplit(getattr(r, 'url', '') or '').path
+        self._json = _UNSET
+        self._df = _UNSET
+        self._columns = _UNSET
+        if SLIM if slim is None else slim:
+            self.r = None
+
+    @property
+    def json(self):
+        if self._json is _UNSET:
+            self._json = _loads(self.raw)
+        return self._json
+
+    @json.setter
+    def json(self, value):
+        self._json = value
+
+    @property
+    def df(self):
+        if self._df is _UNSET:
+            self._df = self._build_df()
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+
+    @property
+    def error(self):
+        r"""The OkcoinAPIError for a non-zero code, or None. No dataframe is built."""
         try:
-            if type(r.json())==dict:
-                self.df = pd.Series(r.json()).to_frame()
+            unwrap(self.json, self.request_path)
+        except OkcoinAPIError as e:
+            return e
+        return None
+
+    def raise_for_code(self):
+        r"""Raises the typed OkcoinAPIError if okcoin answered with a non-zero code."""
+        error = self.error
+        if error is not None:
+            raise error
+
+    @property
+    def columns(self):
+        r"""The records as a dictionary of column name to typed NumPy array. Only available
+        for endpoints with a registered Schema."""
+        if self._columns is _UNSET:
+            schema = schema_for(self.request_path)
+            if schema is None:
+                raise KeyError('No schema is registered for ' + self.request_path)
+            self._columns = decode(self.json, schema, self.request_path)
+        return self._columns
+
+    def _build_df(self):
+        if schema_for(self.request_path) is not None:
+            return pd.DataFrame(self.columns)
+        try:
+            if type(self.json)==dict:
+                return pd.Series(self.json).to_frame()
             else:
-                self.df = pd.DataFrame(r.json())
+                return pd.DataFrame(self.json)
         except:
-            self.df = None
-        self.r = r
-        self.json = r.json()
-        self.trading_pair = trading_pair
+            return None
 
     def as_df(self):
         return self.df
@@ -30,6 +124,51 @@ class _Resp:
         return fig
 
 
+class _BatchResp(_Resp):
+    r"""Combines the responses of a batch request that was split into several HTTP requests.
+    json holds the per-order results of every chunk in one 'data' list, in the order the
+    orders were submitted, and df holds one row per order. If a whole chunk was rejected,
+    each of its orders gets a row carrying the chunk's code and message. A chunk whose
+    request failed is given as its already decoded result instead of a response."""
+
+    def __init__(self, responses, chunks, request_path=''):
+        self.responses = responses
+        received = [r for r in responses if not isinstance(r, dict)]
+        self.r = received[-1] if received else None
+        self.raw = None
+        self.status_code = self.r.status_code if self.r is not None else None
+        self.trading_pair = None
+        self.request_path = request_path
+        self._df = _UNSET
+        self._columns = _UNSET
+        data = []
+        code = '0'
+        for r, chunk in zip(responses, chunks):
+            if isinstance(r, dict):
+                result = r
+            else:
+                try:
+                    result = r.json()
+                except ValueError:
+                    result = {'code': str(r.status_code), 'msg': r.text, 'data': []}
+            if str(result.get('code')) != '0':
+                code = str(result.get('code'))
+            results = result.get('data') or []
+            if len(results) == len(chunk):
+                data.extend(results)
+            else:
+                for order in chunk:
+                    data.append({'instId': order.get('instId', ''),
+                                 'ordId': order.get('ordId', ''),
+                                 'clOrdId': order.get('clOrdId', ''),
+                                 'sCode': str(result.get('code')),
+                                 'sMsg': result.get('msg', '')})
+        self._json = {'code': code, 'msg': '', 'data': data}
+
+    def _build_df(self):
+        return pd.DataFrame(self.json['data'])
+
+
 class _Candlestick(_Resp):
     #def __init__(self, trading_pair):
     #    self.trading_pair = trading_pair
@@ -0,0 +1,110 @@
+class OkcoinAPIError(Exception):
+    r"""
+    Raised when okcoin answers a request with a non-zero code.
+
+
+    Parameters
+    ----------
+    code : The okcoin error code, for example, '50011'.
+
+    msg : The error message returned by okcoin.
+
+    request_path : The request path that failed.
+
+    Attributes
+    ----------
+    code : str
+
+    msg : str
+
+    request_path : str
+    """
+
+    def __init__(self, code, msg='', request_path=''):
+        self.code = str(code)
+        self.msg = msg
+        self.request_path = request_path
+        super().__init__('%s %s: %s' % (request_path, self.code, msg) if request_path else
+                         '%s: %s' % (self.code, msg))
+
+
+class ServiceUnavailableError(OkcoinAPIError):
+    r"""okcoin is busy or unavailable. The request can be sent again."""
+
+
+class RateLimitError(OkcoinAPIError):
+    r"""The request exceeded an okcoin rate limit."""
+
+
+class AuthenticationError(OkcoinAPIError):
+    r"""The API key, signature, pass phrase or permissions were rejected."""
+
+
+class TimestampError(AuthenticationError):
+    r"""The OK-ACCESS-TIMESTAMP of the request was outside the accepted window."""
+
+
+class InvalidParameterError(OkcoinAPIError):
+    r"""A request parameter was missing or invalid."""
+
+
+class InsufficientBalanceError(OkcoinAPIError):
+    r"""The account balance is too low for the order, transfer or withdrawal."""
+
+
+class NotFoundError(OkcoinAPIError):
+    r"""The order, transfer or withdrawal that was queried does not exist."""
+
+
+ERRORS = {
+    '50001': ServiceUnavailableError,
+    '50004': ServiceUnavailableError,
+    '50013': ServiceUnavailableError,
+    '50026': ServiceUnavailableError,
+    '50011': RateLimitError,
+    '50061': RateLimitError,
+    '50102': TimestampError,
+    '50000': InvalidParameterError,
+    '50014': InvalidParameterError,
+    '51000': InvalidParameterError,
+    '51008': InsufficientBalanceError,
+    '51603': NotFoundError,
+    '58350': InsufficientBalanceError,
+}
+
+
+def error_for(code, msg='', request_path=''):
+    r"""Returns the OkcoinAPIError subclass instance matching an okcoin error code.
+
+    Parameters
+    ----------
+    code : str
+        The okcoin error code.
+
+    msg : str
+        The error message returned by okcoin.
+
+    request_path : str
+        The request path that failed.
+
+    Returns
+    -------
+    error : OkcoinAPIError
+
+    Examples
+    --------
+    >>> from okcoin.Errors import error_for
+    >>> error_for('50011', 'Too Many Requests')
+    RateLimitError('50011: Too Many Requests')
+    """
+    code = str(code)
+    cls = ERRORS.get(code)
+    if cls is None:
+        # 501xx codes are authentication failures.
+        cls = AuthenticationError if code.startswith('501') else OkcoinAPIError
+    return cls(code, msg, request_path)
+
+
+class ChecksumError(Exception):
+    r"""A local order book no longer matches the checksum sent by okcoin. Subscribe to the
+    book again to receive a new snapshot."""
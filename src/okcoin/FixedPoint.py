@@ -0,0 +1,124 @@
+import numpy as np
+
+# okcoin reports balances and ledger amounts with up to 8 decimal places, for example,
+# '793.99043577' STX, whatever the precision the currency is transferred with.
+DEFAULT_DECIMALS = 8
+# Decimal places kept for currencies reported with another precision. Amounts with more
+# non-zero decimals are rejected.
+DECIMALS = {}
+
+
+MAX_DIGITS = 18  # every amount of up to 18 digits, counting its decimals, fits in an int64
+_POWERS = 10 ** np.arange(MAX_DIGITS, dtype=np.int64)
+_LIMIT = 10 ** MAX_DIGITS
+
+
+def decimals_for(currency):
+    r"""Returns the number of decimal places kept for a currency."""
+    return DECIMALS.get(currency, DEFAULT_DECIMALS)
+
+
+def parse(values, decimals=DEFAULT_DECIMALS):
+    r""" Converts decimal strings, such as '0.00071305', to int64 counts of 10**-decimals
+    units without going through float. Empty strings are zero. Raises ValueError for strings
+    that are not made of digits, at most one '.' and a leading '-', such as '1e-5', and for
+    amounts that do not fit in MAX_DIGITS digits once scaled.
+
+    Parameters
+    ----------
+    values : list or ndarray
+        The decimal strings.
+
+    decimals : int
+        The number of decimal places kept, for example, decimals_for('BTC').
+
+    Returns
+    -------
+    units : ndarray
+        An int64 array of scaled amounts.
+
+    Examples
+    --------
+    >>> from okcoin import FixedPoint
+    >>> units = FixedPoint.parse(['0.00071305', '-1.5', ''], FixedPoint.decimals_for('BTC'))
+    >>> units
+    array([     71305, -150000000,          0])
+    >>> FixedPoint.format(units.sum(), 8)
+    '-1.49928695'
+    """
+    values = np.asarray(values, dtype='S').reshape(-1)
+    if values.itemsize == 0 or len(values) == 0:
+        return np.zeros(len(values), dtype=np.int64)
+    # One row of ASCII codes per amount, padded with zero bytes.
+    chars = values.view(np.uint8).reshape(len(values), values.itemsize)
+    is_digit = (chars >= 48) & (chars <= 57)
+    is_dot = chars == 46
+    column = np.arange(chars.shape[1])
+    valid = is_digit | is_dot | (chars == 0) | ((chars == 45) & (column == 0))
+    malformed = ~valid.all(axis=1) | (is_dot.sum(axis=1) > 1) | ((chars[:, 0] != 0) & ~is_digit.any(axis=1))
+    if malformed.any():
+        raise ValueError("%r is not a decimal amount" % values[malformed.argmax()].decode('ascii', 'replace'))
+    dot = np.where(is_dot.any(axis=1), is_dot.argmax(axis=1), (chars != 0).sum(axis=1))[:, None]
+    # The power of ten, in units, of each digit: the digit just left of the point is 10**decimals.
+    exponent = decimals + dot - column - (column < dot)
+    digits = np.where(is_digit, chars - 48, 0).astype(np.int64)
+    if (digits[exponent < 0] != 0).any():
+        raise ValueError("Amounts have more than %d decimal places" % decimals)
+    if (digits[exponent >= MAX_DIGITS] != 0).any():
+        raise ValueError("Amounts have more than %d digits with %d decimal places" % (MAX_DIGITS, decimals))
+    units = (digits * _POWERS[np.clip(exponent, 0, MAX_DIGITS - 1)]).sum(axis=1)
+    return np.where(chars[:, 0] == 45, -units, units)
+
+
+def format(units, decimals=DEFAULT_DECIMALS):
+    r""" Converts scaled int64 amounts back to decimal strings with all their decimal places.
+    A single amount is returned as a str, an array as an array of str.
+    """
+    scalar = np.ndim(units) == 0
+    units = np.asarray(units, dtype=np.int64).reshape(-1)
+    if len(units) == 0:
+        return np.array([], dtype=str)
+    whole, frac = np.divmod(np.abs(units), 10 ** decimals)
+    text = whole.astype(str)
+    if decimals:
+        text = np.char.add(np.char.add(text, '.'), np.char.zfill(frac.astype(str), decimals))
+    text = np.where(units < 0, np.char.add('-', text), text)
+    return str(text[0]) if scalar else text
+
+
+def to_float(units, decimals=DEFAULT_DECIMALS):
+    r"""Converts scaled int64 amounts to float64, rounding once instead of once per addition."""
+    return np.asarray(units, dtype=np.int64) / 10 ** decimals
+
+
+def _running_totals(units):
+    r"""Returns the running totals of scaled amounts. Raises ValueError if one of them does not
+    fit in MAX_DIGITS digits. Each amount is below 10**MAX_DIGITS, so the first total out of
+    range is found before the int64 sum can wrap around."""
+    totals = np.cumsum(units)
+    if (np.abs(totals) >= _LIMIT).any():
+        raise ValueError("Totals have more than %d digits" % MAX_DIGITS)
+    return totals
+
+
+def total(values, currency=None, decimals=None):
+    r""" Adds decimal strings exactly. Raises ValueError if a running total has more than
+    MAX_DIGITS digits, counting its decimals.
+
+    Returns
+    -------
+    total : str
+        The exact sum, for example, '400.00000000'.
+    """
+    decimals = decimals_for(currency) if decimals is None else decimals
+    totals = _running_totals(parse(values, decimals))
+    return format(totals[-1] if len(totals) else 0, decimals)
+
+
+def cumulative(values, currency=None, decimals=None):
+    r""" Returns the exact running totals of decimal strings as scaled int64 amounts, for
+    example, to rebuild balances from ledger amounts. Raises ValueError if a total has more
+    than MAX_DIGITS digits, counting its decimals.
+    """
+    decimals = decimals_for(currency) if decimals is None else decimals
+    return _running_totals(parse(values, decimals))
@@ -0,0 +1,116 @@
+import io
+import pandas as pd
+
+# Columns tried, in order, when partitioning records by time and by currency.
+TIME_COLUMNS = ('timestamp', 'ts', 'cTime', 'created_at')
+CURRENCY_COLUMNS = ('currency', 'ccy', 'instrument_id', 'instId')
+
+
+class CsvFormat:
+    r"""
+    Stores dataframes as CSV, the format of the history uploaded before Parquet support.
+    Column types are not kept.
+    """
+    name = 'csv'
+    extension = '.csv'
+
+    def serialize(self, df):
+        buffer = io.BytesIO()
+        df.to_csv(buffer, encoding='utf-8')
+        return buffer.getvalue()
+
+    def deserialize(self, data):
+        df = pd.read_csv(io.BytesIO(data))
+        return df.drop(columns=[c for c in ('Unnamed: 0', 'index') if c in df.columns])
+
+
+class ParquetFormat:
+    r"""
+    Stores dataframes as Parquet files so that column types, such as the float amounts
+    and datetime timestamps of the ledger, are kept. Requires pyarrow.
+
+
+    Parameters
+    ----------
+    compression : The Parquet compression codec, 'zstd' by default.
+    """
+    name = 'parquet'
+    extension = '.parquet'
+
+    def __init__(self, compression='zstd'):
+        self.compression = compression
+
+    def serialize(self, df):
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, engine='pyarrow', compression=self.compression, index=False)
+        return buffer.getvalue()
+
+    def deserialize(self, data):
+        return pd.read_parquet(io.BytesIO(data), engine='pyarrow')
+
+
+FORMATS = {'csv': CsvFormat(), 'parquet': ParquetFormat()}
+
+
+def format_for(name):
+    r"""Returns the format registered under a name, or the format of a blob name by its extension.
+
+    Examples
+    --------
+    >>> from okcoin.Formats import format_for
+    >>> format_for('ledger/date=2021-05-16/currency=STX/ledger_20210516_054127.parquet').name
+    'parquet'
+    """
+    if name in FORMATS:
+        return FORMATS[name]
+    for fmt in FORMATS.values():
+        if name.endswith(fmt.extension):
+            return fmt
+    raise ValueError("Unknown storage format: %s" % name)
+
+
+def _first_column(df, candidates):
+    return next((c for c in candidates if c in df.columns), None)
+
+
+def partition(df, record_type):
+    r""" Splits a dataframe into partitions by UTC date and currency, for storage under
+    '<record_type>/date=<YYYY-MM-DD>/currency=<currency>/'. Records without a time or
+    currency column are stored under 'date=unknown' or without a currency level.
+
+    Parameters
+    ----------
+    df : DataFrame
+        The records to split.
+
+    record_type : str
+        The first level of the partition, for example, 'ledger' or 'filled_orders'.
+
+    Returns
+    -------
+    partitions : list
+        A list of (prefix, DataFrame) tuples.
+
+    Examples
+    --------
+    >>> from okcoin.Formats import partition
+    >>> [prefix for prefix, _ in partition(ledger, 'ledger')]
+    ['ledger/date=2021-05-16/currency=STX/', 'ledger/date=2021-05-17/currency=STX/']
+    """
+    time_column = _first_column(df, TIME_COLUMNS)
+    currency_column = _first_column(df, CURRENCY_COLUMNS)
+    keys = {}
+    if time_column is not None:
+        times = pd.to_datetime(df[time_column], utc=True, format='ISO8601', errors='coerce')
+        keys['date'] = times.dt.strftime('%Y-%m-%d').fillna('unknown')
+    else:
+        keys['date'] = pd.Series('unknown', index=df.index)
+    if currency_column is not None:
+        keys['currency'] = df[currency_column].fillna('unknown').astype(str)
+
+    partitions = []
+    for values, part in df.groupby([keys[k] for k in keys], sort=True):
+        values = values if isinstance(values, tuple) else (values,)
+        prefix = record_type + '/' + ''.join('%s=%s/' % (k, v) for k, v in zip(keys, values))
+        partitions.append((prefix, part.reset_index(drop=True)))
+    return partitions
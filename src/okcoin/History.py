@@ -0,0 +1,181 @@
+import asyncio
+import datetime
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from okcoin.Pagination import Paginator, ColumnAccumulator
+
+# kind: (request path, ID field, True if the endpoint takes begin/end, else it is paged by 'ts')
+HISTORY_KINDS = {
+    'bills': ('/api/v5/account/bills-archive', 'billId', True),
+    'deposits': ('/api/v5/asset/deposit-history', 'depId', False),
+    'withdrawals': ('/api/v5/asset/withdrawal-history', 'wdId', False),
+}
+
+
+def _to_ms(date):
+    ts = pd.Timestamp(date)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return int(ts.value // 1_000_000)
+
+
+def time_windows(start, end, window=datetime.timedelta(days=7)):
+    r""" Splits [start, end) into consecutive windows of at most `window`.
+
+    Returns
+    -------
+    windows : list
+        A list of (begin, end) tuples in milliseconds since the epoch.
+    """
+    begin, end = _to_ms(start), _to_ms(end)
+    step = int(pd.Timedelta(window).total_seconds() * 1000)
+    return [(b, min(b + step, end)) for b in range(begin, end, step)]
+
+
+def _fetch_window(client, kind, currency, begin, end):
+    request_path, id_field, by_range = HISTORY_KINDS[kind]
+    accumulator = ColumnAccumulator()
+    if by_range:
+        params = {'ccy': currency, 'begin': begin, 'end': end}
+        for page in Paginator(client, request_path, params, id_field):
+            accumulator.add(page)
+    else:
+        # Records are newest first, so stop once a page reaches back past the window.
+        for page in Paginator(client, request_path, {'ccy': currency}, 'ts', after=end):
+            accumulator.add(page)
+            if int(page.json['data'][-1]['ts']) < begin:
+                break
+    return accumulator.to_frame()
+
+
+async def _fetch_window_async(client, kind, currency, begin, end):
+    request_path, id_field, by_range = HISTORY_KINDS[kind]
+    accumulator = ColumnAccumulator()
+    if by_range:
+        params = {'ccy': currency, 'begin': begin, 'end': end}
+        async for page in Paginator(client, request_path, params, id_field):
+            accumulator.add(page)
+    else:
+        async for page in Paginator(client, request_path, {'ccy': currency}, 'ts', after=end):
+            accumulator.add(page)
+            if int(page.json['data'][-1]['ts']) < begin:
+                break
+    return accumulator.to_frame()
+
+
+def _merge(frames, id_field, start, end):
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates(subset=[id_field])
+    ts = df['ts']
+    df = df[(ts >= pd.Timestamp(_to_ms(start), unit='ms')) & (ts < pd.Timestamp(_to_ms(end), unit='ms'))]
+    return df.sort_values('ts', kind='stable').reset_index(drop=True)
+
+
+def windowed(kind):
+    r"""Marks a client method that downloads a kind of HISTORY_KINDS with download_history, so
+    that the asyncio clients run it with download_history_async instead of worker threads."""
+    def mark(method):
+        method._history_kind = kind
+        return method
+    return mark
+
+
+def download_history(client, kind, start, end=None, currency='',
+                     window=datetime.timedelta(days=7), max_workers=8, progress=None):
+    r""" Downloads the bills, deposits or withdrawals between two dates by splitting the
+    range into time windows and paging through the windows concurrently. Requests still
+    pass through the client's rate limiter. The windows are merged into one frame,
+    de-duplicated by bill or transaction ID and sorted by time.
+
+    Parameters
+    ----------
+    client : Account or Spot
+        The client used to send requests. Give it a Session whose pool_size is at least
+        max_workers so that each worker keeps its own connection.
+
+    kind : str
+        'bills', 'deposits' or 'withdrawals'.
+
+    start : str or datetime
+        Start of the range, for example, '2021-01-01'. Naive dates are in UTC.
+
+    end : str or datetime
+        End of the range (exclusive). Set to now by default.
+
+    currency : str
+        Only download records of this currency.
+
+    window : timedelta
+        The length of each time window.
+
+    max_workers : int
+        The number of windows downloaded at once.
+
+    progress : callable
+        Called as progress(done, total) each time a window completes.
+
+    Returns
+    -------
+    history : DataFrame
+        One row per record, sorted by 'ts'.
+
+    Examples
+    --------
+    >>> from okcoin import Spot, Session
+    >>> from okcoin.History import download_history
+    >>> spot = Spot('auth.config', session=Session(pool_size=8))
+    >>> bills = download_history(spot, 'bills', '2021-01-01', '2021-04-01', currency='BTC')
+    """
+    if end is None:
+        end = datetime.datetime.now(datetime.timezone.utc)
+    _, id_field, _ = HISTORY_KINDS[kind]
+    windows = time_windows(start, end, window)
+    frames = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_fetch_window, client, kind, currency, b, e) for b, e in windows]
+        for done, future in enumerate(futures, 1):
+            frames.append(future.result())
+            if progress is not None:
+                progress(done, len(futures))
+
+    return _merge(frames, id_field, start, end)
+
+
+async def download_history_async(client, kind, start, end=None, currency='',
+                                 window=datetime.timedelta(days=7), max_workers=8, progress=None):
+    r""" The asyncio version of download_history for the asyncio clients. The windows are
+    paged through concurrently on the event loop with asyncio.gather, at most max_workers at
+    a time, and merged in the same way.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> from okcoin.AsyncClient import AsyncSpot
+    >>> from okcoin.History import download_history_async
+    >>> async def main():
+    ...     async with AsyncSpot('auth.config') as spot:
+    ...         return await download_history_async(spot, 'bills', '2021-01-01', '2021-04-01')
+    >>> bills = asyncio.run(main())
+    """
+    if end is None:
+        end = datetime.datetime.now(datetime.timezone.utc)
+    _, id_field, _ = HISTORY_KINDS[kind]
+    windows = time_windows(start, end, window)
+    semaphore = asyncio.Semaphore(max_workers)
+    done = 0
+
+    async def fetch(b, e):
+        nonlocal done
+        async with semaphore:
+            frame = await _fetch_window_async(client, kind, currency, b, e)
+        done += 1
+        if progress is not None:
+            progress(done, len(windows))
+        return frame
+
+    frames = await asyncio.gather(*[fetch(b, e) for b, e in windows])
+    return _merge(frames, id_field, start, end)
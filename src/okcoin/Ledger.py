@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+TYPE_COLUMNS = ('typename', 'type', 'subType')
+
+
+def _naive_utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_convert('UTC').tz_localize(None) if ts.tzinfo is not None else ts
+
+
+class Ledger:
+    r"""
+    A ledger indexed for repeated queries. The entries are sorted by time into a
+    DatetimeIndex, the currency and type columns are stored as categoricals, and the
+    positions of each currency's entries are computed once, so range and balance lookups
+    use binary searches instead of scanning the whole ledger.
+
+
+    Parameters
+    ----------
+    df : A ledger dataframe, for example, from Account.get_ledger() or
+    DataMangement.dataframe_from_azure_storage(). It is not modified.
+
+    time_column : The column holding the time of each entry.
+
+    currency_column : The column holding the currency of each entry.
+
+    Attributes
+    ----------
+    frame : The entries sorted by time, indexed by their time in UTC.
+
+    currencies : The currencies in the ledger.
+
+    Examples
+    --------
+    >>> import okcoin.DataMangement as dm
+    >>> from okcoin.Ledger import Ledger
+    >>> ledger = Ledger(dm.dataframe_from_azure_storage(r"C:\azure.config"))
+    >>> ledger.balance_at('2021-05-16', 'BTC')
+    0.00076409
+    >>> may = ledger.range('2021-05-01', '2021-06-01', 'STX')
+    """
+
+    def __init__(self, df, time_column='timestamp', currency_column='currency'):
+        frame = df.copy()
+        times = pd.to_datetime(frame[time_column], utc=True, format='ISO8601').dt.tz_convert(None)
+        frame[currency_column] = frame[currency_column].astype('category')
+        for column in TYPE_COLUMNS:
+            if column in frame.columns:
+                frame[column] = frame[column].astype('category')
+        frame.index = pd.DatetimeIndex(times, name=time_column)
+        frame = frame.drop(columns=[time_column]).sort_index(kind='stable')
+
+        self.frame = frame
+        self.time_column = time_column
+        self.currency_column = currency_column
+        self.currencies = list(frame[currency_column].cat.categories)
+        self._times = frame.index.values
+        self._balances = frame['balance'].to_numpy(dtype=float) if 'balance' in frame.columns else None
+
+        # The positions of each currency's entries, still in time order.
+        codes = frame[currency_column].cat.codes.to_numpy()
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(self.currencies) + 1))
+        self._positions = {currency: order[bounds[i]:bounds[i + 1]] for i, currency in enumerate(self.currencies)}
+        self._slices = {}
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _index(self, currency):
+        if currency is None:
+            return None, self._times
+        positions = self._positions.get(currency, np.array([], dtype=np.intp))
+        return positions, self._times[positions]
+
+    def currency(self, currency):
+        r"""Returns the entries of one currency, sorted by time. The slice is built once and shared."""
+        if currency not in self._slices:
+            positions, _ = self._index(currency)
+            self._slices[currency] = self.frame.iloc[positions]
+        return self._slices[currency]
+
+    def range(self, start=None, end=None, currency=None):
+        r""" Returns the entries from start (inclusive) to end (exclusive), of one currency
+        or of all of them. Naive times are in UTC.
+        """
+        positions, times = self._index(currency)
+        lo = 0 if start is None else np.searchsorted(times, _naive_utc(start).to_datetime64(), 'left')
+        hi = len(times) if end is None else np.searchsorted(times, _naive_utc(end).to_datetime64(), 'left')
+        if currency is None:
+            return self.frame.iloc[lo:hi]
+        return self.currency(currency).iloc[lo:hi]
+
+    def balance_at(self, time, currency):
+        r""" Returns the balance of a currency after the last entry at or before a time, or NaN if
+        there is none. Of several entries at that same time, the largest balance is returned.
+        """
+        positions, times = self._index(currency)
+        t = _naive_utc(time).to_datetime64()
+        hi = np.searchsorted(times, t, 'right')
+        if hi == 0:
+            return np.nan
+        lo = np.searchsorted(times, times[hi - 1], 'left')
+        rows = np.arange(lo, hi) if positions is None else positions[lo:hi]
+        return self._balances[rows].max()
+
+    def balance_history(self, currency, freq=None):
+        r""" Returns the largest balance of a currency at each entry time or, with freq='D', on
+        each day.
+
+        Returns
+        -------
+        balance : DataFrame
+            A dataframe with the columns 'timestamp' and 'balance', sorted by time.
+        """
+        positions, times = self._index(currency)
+        if freq is not None:
+            times = times.astype('datetime64[%s]' % freq)
+        balances = self._balances if positions is None else self._balances[positions]
+        if len(times) == 0:
+            return pd.DataFrame({self.time_column: times, 'balance': balances})
+        # Times are sorted, so equal times are adjacent.
+        starts = np.concatenate(([0], np.flatnonzero(times[1:] != times[:-1]) + 1))
+        return pd.DataFrame({self.time_column: times[starts],
+                             'balance': np.maximum.reduceat(balances, starts)})
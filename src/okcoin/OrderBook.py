@@ -0,0 +1,278 @@
+import zlib
+import numpy as np
+import pandas as pd
+
+from okcoin.Errors import ChecksumError
+
+MAX_LEVELS = 400      # the depth of the V5 'books' channel
+CHECKSUM_LEVELS = 25  # the levels of each side covered by the checksum
+
+
+class _Side:
+    r"""The price levels of one side of a book, sorted best first, in arrays of a fixed
+    capacity that are updated in place. Prices and sizes are kept as float64 for lookups
+    and as the original strings for the checksum."""
+
+    def __init__(self, sign, capacity):
+        self.sign = sign  # 1 for asks, -1 for bids, so that keys are sorted ascending
+        self._keys = np.empty(capacity)
+        self._sizes = np.empty(capacity)
+        self._price_text = np.empty(capacity, dtype=object)
+        self._size_text = np.empty(capacity, dtype=object)
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def keys(self):
+        return self._keys[:self.n]
+
+    @property
+    def sizes(self):
+        return self._sizes[:self.n]
+
+    @property
+    def price_text(self):
+        return self._price_text[:self.n]
+
+    @property
+    def size_text(self):
+        return self._size_text[:self.n]
+
+    @property
+    def prices(self):
+        return self.keys * self.sign
+
+    @property
+    def nbytes(self):
+        return self._keys.nbytes + self._sizes.nbytes + self._price_text.nbytes + self._size_text.nbytes
+
+    def set(self, levels):
+        levels = [level for level in levels if float(level[1]) != 0]
+        keys = np.array([float(level[0]) for level in levels]) * self.sign
+        order = np.argsort(keys, kind='stable')[:len(self._keys)]
+        n = self.n = len(order)
+        self._keys[:n] = keys[order]
+        self._sizes[:n] = [float(levels[i][1]) for i in order]
+        self._price_text[:n] = [levels[i][0] for i in order]
+        self._size_text[:n] = [levels[i][1] for i in order]
+
+    def update(self, levels):
+        keys, sizes, price_text, size_text = self._keys, self._sizes, self._price_text, self._size_text
+        capacity = len(keys)
+        for level in levels:
+            key = float(level[0]) * self.sign
+            size = float(level[1])
+            n = self.n
+            i = keys[:n].searchsorted(key)
+            if i < n and keys[i] == key:
+                if size == 0:
+                    for array in (keys, sizes, price_text, size_text):
+                        array[i:n - 1] = array[i + 1:n]
+                    self.n = n - 1
+                else:
+                    sizes[i] = size
+                    size_text[i] = level[1]
+            elif size != 0 and i < capacity:
+                # Shift the worse levels down one place, dropping the last one if the side is full.
+                m = min(n, capacity - 1)
+                for array in (keys, sizes, price_text, size_text):
+                    array[i + 1:m + 1] = array[i:m]
+                keys[i], sizes[i], price_text[i], size_text[i] = key, size, level[0], level[1]
+                self.n = m + 1
+
+
+class OrderBook:
+    r"""
+    A local L2 order book of one trading pair, built from a snapshot and kept up to date
+    with incremental updates, such as the messages of the V5 'books' channel. The price
+    levels of each side are kept sorted in preallocated NumPy arrays and every update is
+    checked against the CRC32 checksum sent by okcoin.
+
+
+    Parameters
+    ----------
+    trading_pair : The trading pair of the book, for example, 'BTC-USD'.
+
+    max_levels : The largest number of levels kept on each side.
+
+    Attributes
+    ----------
+    seq : The sequence number of the last message applied, if okcoin sent one.
+
+    updates : The number of updates applied since the last snapshot.
+
+    Examples
+    --------
+    >>> from okcoin.OrderBook import OrderBook
+    >>> book = OrderBook('BTC-USD')
+    >>> book.snapshot(bids=[['36410.06', '0.83', '0', '1']], asks=[['36417.66', '0.0467', '0', '1']])
+    >>> book.update(bids=[['36412.5', '0.1', '0', '1']], asks=[['36417.66', '0', '0', '0']])
+    >>> book.best_bid()
+    (36412.5, 0.1)
+    >>> book.depth(5)
+    """
+
+    def __init__(self, trading_pair='', max_levels=MAX_LEVELS):
+        self.trading_pair = trading_pair
+        self.max_levels = max_levels
+        self.bids = _Side(-1, max_levels)
+        self.asks = _Side(1, max_levels)
+        self.seq = None
+        self.updates = 0
+
+    def snapshot(self, bids, asks, checksum=None):
+        r"""Replaces the book with a snapshot of [price, size, ...] levels."""
+        self.bids.set(bids)
+        self.asks.set(asks)
+        self.updates = 0
+        self._verify(checksum)
+
+    def update(self, bids=(), asks=(), checksum=None):
+        r"""Applies changed levels. A level with a size of '0' is removed. Raises ChecksumError
+        if checksum is given and does not match the updated book."""
+        self.bids.update(bids)
+        self.asks.update(asks)
+        self.updates += 1
+        self._verify(checksum)
+
+    def apply(self, message):
+        r"""Applies a 'books' channel message, as delivered by MarketStream."""
+        for data in message.get('data', ()):
+            if message.get('action', 'snapshot') == 'snapshot':
+                self.snapshot(data.get('bids', ()), data.get('asks', ()), data.get('checksum'))
+            else:
+                self.update(data.get('bids', ()), data.get('asks', ()), data.get('checksum'))
+            self.seq = data.get('seqId', self.seq)
+
+    def _verify(self, checksum):
+        if checksum is not None and int(checksum) != self.checksum():
+            raise ChecksumError('%s order book checksum %s does not match %d'
+                                % (self.trading_pair, checksum, self.checksum()))
+
+    def checksum(self):
+        r"""Returns the CRC32 checksum of the best 25 levels of each side, computed the way
+        okcoin does: alternating 'bid price:bid size' and 'ask price:ask size', joined by ':',
+        as a signed 32 bit integer."""
+        n = CHECKSUM_LEVELS
+        bids = ['%s:%s' % level for level in zip(self.bids.price_text[:n], self.bids.size_text[:n])]
+        asks = ['%s:%s' % level for level in zip(self.asks.price_text[:n], self.asks.size_text[:n])]
+        parts = []
+        for i in range(max(len(bids), len(asks))):
+            if i < len(bids):
+                parts.append(bids[i])
+            if i < len(asks):
+                parts.append(asks[i])
+        crc = zlib.crc32(':'.join(parts).encode('utf-8'))
+        return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+    def best_bid(self):
+        r"""Returns the best bid as (price, size), or None if there are no bids."""
+        return (float(-self.bids.keys[0]), float(self.bids.sizes[0])) if len(self.bids) else None
+
+    def best_ask(self):
+        r"""Returns the best ask as (price, size), or None if there are no asks."""
+        return (float(self.asks.keys[0]), float(self.asks.sizes[0])) if len(self.asks) else None
+
+    def spread(self):
+        return self.asks.keys[0] + self.bids.keys[0] if len(self.bids) and len(self.asks) else np.nan
+
+    def mid(self):
+        return (self.asks.keys[0] - self.bids.keys[0]) / 2 if len(self.bids) and len(self.asks) else np.nan
+
+    def depth(self, n=10):
+        r""" Returns the best n levels of each side.
+
+        Returns
+        -------
+        bids, asks : tuple
+            Two arrays of shape (levels, 2) holding price and size, best first.
+        """
+        return (np.column_stack((self.bids.prices[:n], self.bids.sizes[:n])),
+                np.column_stack((self.asks.prices[:n], self.asks.sizes[:n])))
+
+    def cumulative_size(self, n=None, side='bids'):
+        r"""Returns the running total of the sizes of the best n levels of 'bids' or 'asks'."""
+        return np.cumsum(getattr(self, side).sizes[:n])
+
+    def size_within(self, price, side='bids'):
+        r"""Returns the total size of the levels priced at or better than price."""
+        levels = getattr(self, side)
+        return levels.sizes[:np.searchsorted(levels.keys, price * levels.sign, 'right')].sum()
+
+    def as_frames(self, n=None):
+        r"""Returns the book as the asks and bids dataframes of ticker.get_order_book."""
+        asks = pd.DataFrame({'ask price': self.asks.prices[:n], 'ask size': self.asks.sizes[:n]})
+        bids = pd.DataFrame({'bid price': self.bids.prices[:n], 'bid size': self.bids.sizes[:n]})
+        return asks, bids
+
+    @property
+    def nbytes(self):
+        return self.bids.nbytes + self.asks.nbytes
+
+
+class OrderBooks:
+    r"""
+    The order books of many trading pairs in one process. Each book holds at most
+    max_levels levels per side, so memory grows only with the number of pairs.
+
+
+    Parameters
+    ----------
+    max_levels : The largest number of levels kept on each side of each book.
+
+    Attributes
+    ----------
+    checksum_errors : The number of books that failed their checksum and were resubscribed.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> from okcoin.WebSocket import MarketStream
+    >>> from okcoin.OrderBook import OrderBooks
+    >>> books = OrderBooks()
+    >>> async def main():
+    ...     async with MarketStream() as stream:
+    ...         await books.attach(stream, ['BTC-USD', 'ETH-USD', 'STX-USD'])
+    ...         await asyncio.sleep(60)
+    ...         print(books['BTC-USD'].best_bid(), books.nbytes)
+    >>> asyncio.run(main())
+    """
+
+    def __init__(self, max_levels=MAX_LEVELS):
+        self.max_levels = max_levels
+        self.books = {}
+        self.checksum_errors = 0
+
+    def __getitem__(self, trading_pair):
+        if trading_pair not in self.books:
+            self.books[trading_pair] = OrderBook(trading_pair, self.max_levels)
+        return self.books[trading_pair]
+
+    def __contains__(self, trading_pair):
+        return trading_pair in self.books
+
+    def __len__(self):
+        return len(self.books)
+
+    def apply(self, message):
+        r"""Applies a 'books' channel message to the book of its trading pair."""
+        self[message['arg']['instId']].apply(message)
+
+    async def attach(self, stream, trading_pairs, channel='books'):
+        r"""Subscribes a MarketStream to the books of trading pairs and keeps them up to date.
+        A book that fails its checksum is subscribed to again to receive a new snapshot."""
+        async def on_message(message):
+            try:
+                self.apply(message)
+            except ChecksumError:
+                self.checksum_errors += 1
+                await stream.resubscribe(channel, message['arg']['instId'])
+
+        for trading_pair in trading_pairs:
+            await stream.subscribe(channel, trading_pair, callback=on_message)
+
+    @property
+    def nbytes(self):
+        return sum(book.nbytes for book in self.books.values())
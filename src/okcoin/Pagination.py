@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from okcoin.DataObjects import _Resp
+from okcoin.Schemas import schema_for
+
+GET = 'GET'
+MAX_LIMIT = 100  # the largest page okcoin V5 returns
+
+
+class Paginator:
+    r"""
+    Streams the pages of a V5 history endpoint by following its after/before cursors.
+    Only one page is held at a time. Iterate with `for` on a synchronous client or with
+    `async for` on an asyncio client.
+
+
+    Parameters
+    ----------
+    client : The client that sends the requests.
+
+    request_path : The endpoint to page through.
+
+    params : Additional query parameters. Parameters with empty values are left out.
+
+    cursor : The record field used as the cursor, for example, 'billId' or 'ordId'.
+
+    limit : The number of records per page, at most 100.
+
+    after : Start with the records older than this cursor. By default paging starts with the
+    most recent records and moves back in time.
+
+    before : Page forward in time through the records newer than this cursor instead.
+
+    max_pages : Stop after this many pages.
+
+    Attributes
+    ----------
+    pages : The number of pages retrieved so far.
+
+    Examples
+    --------
+    >>> for page in spot.iter_bills('BTC'):
+    ...     print(page.df)
+    """
+
+    def __init__(self, client, request_path, params=None, cursor='billId', limit=MAX_LIMIT,
+                 after=None, before=None, max_pages=None):
+        self.client = client
+        self.request_path = request_path
+        self.params = {k: str(v) for k, v in (params or {}).items() if v not in ('', None)}
+        self.cursor = cursor
+        self.limit = min(int(limit), MAX_LIMIT)
+        self.after = after
+        self.before = before
+        self.max_pages = max_pages
+        self.pages = 0
+
+    def _next_params(self):
+        if self.max_pages is not None and self.pages >= self.max_pages:
+            return None
+        params = dict(self.params, limit=str(self.limit))
+        if self.before is not None:
+            params['before'] = str(self.before)
+        elif self.after is not None:
+            params['after'] = str(self.after)
+        return params
+
+    def _advance(self, response):
+        r"""Wraps a page and moves the cursor past it. Returns None once there are no more records."""
+        page = _Resp(response)
+        page.raise_for_code()
+        records = page.json['data'] if isinstance(page.json, dict) else page.json
+        if not records:
+            self.max_pages = self.pages
+            return None
+        self.pages += 1
+        # Records are sorted newest first in both directions.
+        if self.before is not None:
+            self.before = records[0][self.cursor]
+        else:
+            self.after = records[-1][self.cursor]
+        if len(records) < self.limit:
+            self.max_pages = self.pages
+        return page
+
+    def __iter__(self):
+        while True:
+            params = self._next_params()
+            if params is None:
+                return
+            page = self._advance(self.client.query(GET, self.request_path, body=params))
+            if page is None:
+                return
+            yield page
+
+    async def __aiter__(self):
+        while True:
+            params = self._next_params()
+            if params is None:
+                return
+            page = self._advance(await self.client.query(GET, self.request_path, body=params))
+            if page is None:
+                return
+            yield page
+
+    def collect(self):
+        r"""Retrieves every page into a single dataframe through a ColumnAccumulator."""
+        accumulator = ColumnAccumulator()
+        for page in self:
+            accumulator.add(page)
+        return accumulator.to_frame()
+
+
+def paginated(method):
+    r"""Marks a client method that returns a Paginator, so that the asyncio clients expose it
+    as a method returning an async iterable instead of a coroutine."""
+    method._paginated = True
+    return method
+
+
+class ColumnAccumulator:
+    r"""
+    Collects the pages of a Paginator as typed NumPy columns and concatenates them once at
+    the end. Pages of endpoints with a registered Schema keep their types; other pages are
+    kept as object columns.
+
+    Examples
+    --------
+    >>> from okcoin.Pagination import ColumnAccumulator
+    >>> acc = ColumnAccumulator()
+    >>> for page in spot.iter_bills_archive('BTC'):
+    ...     acc.add(page)
+    >>> bills = acc.to_frame()
+    """
+
+    def __init__(self):
+        self.chunks = {}
+        self.rows = 0
+
+    def add(self, page):
+        if schema_for(page.request_path) is not None:
+            columns = page.columns
+        else:
+            columns = {k: np.asarray(v, dtype=object) for k, v in pd.DataFrame(page.json['data']).items()}
+        n = len(next(iter(columns.values()))) if columns else 0
+        for name, values in columns.items():
+            if name not in self.chunks:
+                # Earlier pages did not have this column.
+                self.chunks[name] = [np.full(self.rows, None, dtype=object)] if self.rows else []
+            self.chunks[name].append(values)
+        for name, chunks in self.chunks.items():
+            if name not in columns:
+                chunks.append(np.full(n, None, dtype=object))
+        self.rows += n
+
+    def to_frame(self):
+        return pd.DataFrame({name: np.concatenate(chunks) if chunks else np.array([])
+                             for name, chunks in self.chunks.items()})
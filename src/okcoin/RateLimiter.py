@@ -0,0 +1,273 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+
+# Request priorities. Lower values are served first when requests are queued.
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# Endpoint family: (requests, per seconds, priority). Paths are matched without their query string.
+ENDPOINT_LIMITS = {
+    '/api/v5/trade/order': (60, 2, HIGH),
+    '/api/v5/trade/cancel-order': (60, 2, HIGH),
+    '/api/v5/trade/amend-order': (60, 2, HIGH),
+    '/api/v5/trade/batch-orders': (300, 2, HIGH),
+    '/api/v5/trade/cancel-batch-orders': (300, 2, HIGH),
+    '/api/v5/trade/amend-batch-orders': (300, 2, HIGH),
+    '/api/v5/trade/orders-pending': (60, 2, NORMAL),
+    '/api/v5/trade/orders-history': (40, 2, LOW),
+    '/api/v5/trade/orders-history-archive': (20, 2, LOW),
+    '/api/v5/trade/fills': (60, 2, LOW),
+    '/api/v5/trade/fills-history': (10, 2, LOW),
+    '/api/v5/account/balance': (10, 2, NORMAL),
+    '/api/v5/account/bills': (5, 1, LOW),
+    '/api/v5/account/bills-archive': (5, 2, LOW),
+    '/api/v5/account/trade-fee': (5, 2, NORMAL),
+    '/api/v5/asset/balances': (6, 1, NORMAL),
+    '/api/v5/asset/asset-valuation': (1, 1, LOW),
+    '/api/v5/asset/transfer': (1, 1, HIGH),
+    '/api/v5/asset/transfer-state': (10, 1, NORMAL),
+    '/api/v5/asset/withdrawal': (6, 1, HIGH),
+    '/api/v5/asset/withdrawal-history': (6, 1, LOW),
+    '/api/v5/asset/deposit-history': (6, 1, LOW),
+    '/api/v5/asset/deposit-address': (6, 1, NORMAL),
+    '/api/v5/asset/currencies': (6, 1, NORMAL),
+    '/api/v5/public/time': (10, 2, NORMAL),
+    '/api/v5/market/ticker': (20, 2, NORMAL),
+    '/api/v5/market/tickers': (20, 2, NORMAL),
+    '/api/v5/market/books': (40, 2, NORMAL),
+    '/api/v5/market/trades': (100, 2, NORMAL),
+    '/api/v5/market/candles': (40, 2, NORMAL),
+    '/api/v5/market/history-candles': (20, 2, LOW),
+    # Ledger and history endpoints outside of V5 are analytics calls.
+    '/api/account/v5/ledger': (5, 2, LOW),
+}
+DEFAULT_LIMIT = (10, 2, NORMAL)
+# The name of the optional bucket shared by every family. okcoin limits each endpoint family on
+# its own, so there is no account-wide limit unless one is passed to RateLimiter.
+ACCOUNT = 'account'
+
+
+class _Bucket:
+    r"""A token bucket for one endpoint family, with a priority queue of waiting requests."""
+
+    def __init__(self, requests, per):
+        self.capacity = float(requests)
+        self.rate = requests / per
+        self.tokens = float(requests)
+        self.updated = time.monotonic()
+        self.cond = threading.Condition()
+        self.waiting = []
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _try_take(self, entry, tokens=1):
+        r"""Takes tokens for entry if it is at the head of the queue. Must be called with
+        cond held. Returns 0 when the tokens were taken, otherwise the number of seconds to wait,
+        or None if entry is not at the head of the queue."""
+        if self.waiting[0] is not entry:
+            return None
+        # A request never needs more tokens than the bucket holds.
+        tokens = min(tokens, self.capacity)
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            heapq.heappop(self.waiting)
+            self.cond.notify_all()
+            return 0
+        return (tokens - self.tokens) / self.rate
+
+    def _discard(self, entry):
+        r"""Removes an entry that gave up waiting, so that it does not block the queue."""
+        with self.cond:
+            if entry in self.waiting:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.cond.notify_all()
+
+    def _record(self, waited):
+        self.requests += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+
+class RateLimiter:
+    r"""
+    The RateLimiter class keeps a token bucket for each okcoin endpoint family and queues
+    requests until a token is available, instead of letting okcoin reject them. Requests
+    waiting in the same family are served by priority, so that order placement and cancels
+    go before lower priority calls. Families do not share tokens, because okcoin limits each
+    of them on its own, unless an account limit is set.
+
+
+    Parameters
+    ----------
+    limits : A dictionary of request path to (requests, per seconds, priority). Set to
+    ENDPOINT_LIMITS by default.
+
+    default : The (requests, per seconds, priority) of paths that are not in limits.
+
+    account : An optional (requests, per seconds) shared by every family, to cap the total
+    rate of an application. Requests then also queue in it by priority, so that busy families
+    compete for the same tokens. Not set by default.
+
+    Attributes
+    ----------
+
+    Examples
+    --------
+    >>> from okcoin import Account, Spot, Session
+    >>> from okcoin.RateLimiter import RateLimiter
+    >>> session = Session(rate_limiter=RateLimiter())
+    >>> spot = Spot('auth.config', session=session)
+    >>> session.rate_limiter.stats()
+    """
+
+    def __init__(self, limits=None, default=DEFAULT_LIMIT, account=None):
+        self.limits = dict(ENDPOINT_LIMITS if limits is None else limits)
+        self.default = default
+        self._buckets = {}
+        self._account = None
+        if account is not None:
+            self._account = self._buckets[ACCOUNT] = _Bucket(*account)
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def family(self, request_path):
+        r"""Returns the endpoint family that a request path is limited under."""
+        path = request_path.split('?', 1)[0]
+        return path if path in self.limits else 'default'
+
+    def _bucket(self, family):
+        bucket = self._buckets.get(family)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(family)
+                if bucket is None:
+                    requests, per, _ = self.limits.get(family, self.default)
+                    bucket = self._buckets[family] = _Bucket(requests, per)
+        return bucket
+
+    def _enqueue(self, request_path, priority):
+        family = self.family(request_path)
+        if priority is None:
+            priority = self.limits.get(family, self.default)[2]
+        return self._push(self._bucket(family), priority)
+
+    def _push(self, bucket, priority):
+        entry = (priority, next(self._seq))
+        with bucket.cond:
+            heapq.heappush(bucket.waiting, entry)
+        return bucket, entry
+
+    @staticmethod
+    def _wait(bucket, entry, tokens=1):
+        taken = False
+        try:
+            with bucket.cond:
+                while True:
+                    wait = bucket._try_take(entry, tokens)
+                    if wait == 0:
+                        taken = True
+                        return
+                    bucket.cond.wait(wait)
+        finally:
+            if not taken:
+                bucket._discard(entry)
+
+    @staticmethod
+    async def _wait_async(bucket, entry, tokens=1):
+        taken = False
+        try:
+            while True:
+                with bucket.cond:
+                    wait = bucket._try_take(entry, tokens)
+                if wait == 0:
+                    taken = True
+                    return
+                await asyncio.sleep(wait if wait is not None else 1 / bucket.rate)
+        finally:
+            if not taken:
+                bucket._discard(entry)
+
+    def acquire(self, request_path, priority=None, tokens=1):
+        r"""Blocks until the request may be sent. A request that is interrupted while it waits
+        leaves the queue.
+
+        Parameters
+        ----------
+        request_path : str
+            The request path, with or without its query string.
+
+        priority : int
+            HIGH, NORMAL or LOW. Defaults to the priority of the endpoint family.
+
+        tokens : int
+            The number of tokens the request takes, for example, the number of orders in a
+            batch request, since okcoin limits batch endpoints by order.
+
+        Returns
+        -------
+        waited : float
+            The number of seconds the request was queued.
+        """
+        start = time.monotonic()
+        bucket, entry = self._enqueue(request_path, priority)
+        self._wait(bucket, entry, tokens)
+        if self._account is not None:
+            account_start = time.monotonic()
+            self._wait(*self._push(self._account, entry[0]), tokens)
+            with self._account.cond:
+                self._account._record(time.monotonic() - account_start)
+        waited = time.monotonic() - start
+        with bucket.cond:
+            bucket._record(waited)
+        return waited
+
+    async def acquire_async(self, request_path, priority=None, tokens=1):
+        r"""The asyncio version of acquire. Waits without blocking the event loop. A request
+        that is cancelled while it waits leaves the queue."""
+        start = time.monotonic()
+        bucket, entry = self._enqueue(request_path, priority)
+        await self._wait_async(bucket, entry, tokens)
+        if self._account is not None:
+            account_start = time.monotonic()
+            await self._wait_async(*self._push(self._account, entry[0]), tokens)
+            with self._account.cond:
+                self._account._record(time.monotonic() - account_start)
+        waited = time.monotonic() - start
+        with bucket.cond:
+            bucket._record(waited)
+        return waited
+
+    def queue_depth(self, family=None):
+        r"""Returns the number of queued requests for a family, 'account', or every family."""
+        if family is not None:
+            return len(self._bucket(family).waiting)
+        return sum(len(bucket.waiting) for bucket in list(self._buckets.values()))
+
+    def stats(self):
+        r"""Returns the queue depth and wait times of each endpoint family.
+
+        Returns
+        -------
+        stats : dict
+            A dictionary of family, and of 'account' for the shared bucket if it is set, to a dictionary with 'queue_depth', 'requests',
+            'total_wait', 'mean_wait' and 'max_wait', in seconds.
+        """
+        stats = {}
+        for family, bucket in list(self._buckets.items()):
+            with bucket.cond:
+                stats[family] = {
+                    'queue_depth': len(bucket.waiting),
+                    'requests': bucket.requests,
+                    'total_wait': bucket.total_wait,
+                    'mean_wait': bucket.total_wait / bucket.requests if bucket.requests else 0.0,
+                    'max_wait': bucket.max_wait}
+        return stats
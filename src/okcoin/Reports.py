@@ -1,28 +1,182 @@
 import datetime
+import functools
+import threading
 import pandas as pd
 import plotly.graph_objects as go
 import okcoin.DataMangement as dm
 from okcoin import Fiat
 from okcoin import Account
 from okcoin import ticker
+from okcoin.Storage import open_backend, MANIFEST_BLOB
+from okcoin.Ledger import Ledger
+from okcoin import FixedPoint
 
-acc = Account(r"C:\Users\gbrunner\Documents\GitHub\python-api-for-okcoin\src\auth.config")
-fiat = Fiat(r"C:\Users\gbrunner\Documents\GitHub\python-api-for-okcoin\src\auth.config")
+auth_config = r"C:\Users\gbrunner\Documents\GitHub\python-api-for-okcoin\src\auth.config"
 azure_config = r"C:\Users\gbrunner\Documents\GitHub\python-api-for-okcoin\src\azure.config"
 
 
+@functools.lru_cache(maxsize=None)
+def _client(cls):
+    return cls(auth_config)
+
+
+def __getattr__(name):
+    # acc and fiat are created on first use rather than when the module is imported.
+    if name == 'acc':
+        return _client(Account)
+    if name == 'fiat':
+        return _client(Fiat)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+class LedgerDataset:
+    r"""
+    The ledger history loaded once per session. refresh() reads only the blobs uploaded since
+    the last load, and views derived from the ledger, such as per-currency rewards, are
+    computed once and kept until the ledger changes or invalidate() is called.
+
+
+    Parameters
+    ----------
+    config_file : The azure config file describing the storage backend and cache.
+
+    filter : Only blobs whose name contains this string are loaded.
+
+    Attributes
+    ----------
+    loads : The number of times blobs were read from storage.
+
+    Examples
+    --------
+    >>> from okcoin.Reports import LedgerDataset
+    >>> ledger = LedgerDataset(r"C:\azure.config")
+    >>> stx = ledger.currency('STX')
+    >>> rewards = ledger.rewards('STX', high=26)
+    >>> ledger.ledger.balance_at('2021-05-16', 'BTC')
+    >>> ledger.refresh()
+    """
+
+    def __init__(self, config_file=None, filter='ledger'):
+        self.config_file = config_file or azure_config
+        self.filter = filter
+        self.loads = 0
+        self._df = None
+        self._etags = {}
+        self._views = {}
+        self._lock = threading.RLock()
+
+    @property
+    def df(self):
+        r"""The full ledger, loaded on first use."""
+        with self._lock:
+            if self._df is None:
+                self.refresh()
+            return self._df
+
+    def refresh(self):
+        r""" Reads the blobs uploaded since the last load and appends them to the ledger. If a
+        blob that was already read changed or was removed, the whole ledger is read again.
+        Derived views are invalidated when the ledger changes.
+
+        Returns
+        -------
+        rows : int
+            The number of rows added.
+        """
+        with self._lock:
+            blobs = {blob.name: blob.etag for blob in open_backend(self.config_file).list()
+                     if self.filter in blob.name and blob.name != MANIFEST_BLOB}
+            changed = any(blobs.get(name) != etag for name, etag in self._etags.items())
+            if changed or self._df is None:
+                self._df, self._etags = None, {}
+            new = [name for name in blobs if name not in self._etags]
+            if not new and self._df is not None:
+                return 0
+
+            delta = dm.dataframe_from_azure_storage(self.config_file, self.filter, blob_names=new)
+            self.loads += 1
+            before = 0 if self._df is None else len(self._df)
+            if self._df is None or len(self._df) == 0:
+                self._df = delta
+            elif len(delta):
+                df = pd.concat([self._df, delta], ignore_index=True)
+                self._df = dm.drop_duplicate_records(df).reset_index(drop=True)
+            self._etags.update((name, blobs[name]) for name in new)
+            self.invalidate()
+            return len(self._df) - before
+
+    def view(self, key, build):
+        r""" Returns the derived view stored under key, building it with build(df) the first
+        time. Views are shared, so copy a view before modifying it.
+        """
+        with self._lock:
+            if key not in self._views:
+                self._views[key] = build(self.df)
+            return self._views[key]
+
+    def invalidate(self, key=None):
+        r"""Discards one derived view, or all of them."""
+        with self._lock:
+            if key is None:
+                self._views.clear()
+            else:
+                self._views.pop(key, None)
+
+    @property
+    def ledger(self):
+        r"""The ledger as a Ledger indexed by time and currency."""
+        return self.view('ledger', Ledger)
+
+    def currency(self, currency):
+        r"""The ledger entries of one currency."""
+        return self.view(('currency', currency), lambda df: df[df['currency'] == currency])
+
+    def rewards(self, currency, low=0, high=None):
+        r"""The credits of one currency larger than low and, if given, smaller than high."""
+        def build(df):
+            cur = self.currency(currency)
+            mask = cur['amount'] > low
+            if high is not None:
+                mask &= cur['amount'] < high
+            return cur[mask]
+        return self.view(('rewards', currency, low, high), build)
+
+    def deposits(self, currency='USD'):
+        r"""The deposit history of a currency, retrieved once with Account.get_deposit_history.
+        'amount' is parsed exactly from the returned strings and 'updated_at' is the deposit time."""
+        def build(df):
+            dep = _client(Account).get_deposit_history(currency)
+            df = dep.df.copy()
+            decimals = FixedPoint.decimals_for(currency)
+            df['amount'] = FixedPoint.to_float(
+                FixedPoint.parse([record['amt'] for record in dep.json['data']], decimals), decimals)
+            df['updated_at'] = df['ts']
+            return df
+        return self.view(('deposits', currency), build)
+
+
+_dataset = None
+
+
+def ledger_dataset():
+    r"""Returns the LedgerDataset shared by the report functions of this session."""
+    global _dataset
+    if _dataset is None:
+        _dataset = LedgerDataset(azure_config)
+    return _dataset
+
+
 def get_ledger_history():
-    return dm.dataframe_from_azure_storage(azure_config)
+    return ledger_dataset().df
 
 
 def plot_stx_staking():
-    df = get_ledger_history()
-    chart = dm.plot_staking_history(df, 'BTC')
+    chart = dm.plot_staking_history(ledger_dataset().ledger, 'BTC')
     chart.write_html('test.html', auto_open=True)
 
 
 def plot_mia_staking():
-    mia_df = get_mia_returns()
+    mia_df = get_mia_returns().copy()
     mia_df['timestamp'] = mia_df['timestamp'].astype('datetime64[D]')
     fig = go.Figure(data=[go.Bar(x=mia_df['timestamp'], y=mia_df['amount'])])
     fig.update_layout(
@@ -35,7 +189,7 @@ def plot_mia_staking():
 
 
 def plot_cumulative_mia_staking():
-    mia_df = get_mia_returns()
+    mia_df = get_mia_returns().copy()
     mia_df['timestamp'] = mia_df['timestamp'].astype('datetime64[D]')
     mia_df['cumsum'] = mia_df['amount'].cumsum()
     mia_df.drop_duplicates(keep='first', subset=['timestamp'], inplace=True)
@@ -50,13 +204,11 @@ def plot_cumulative_mia_staking():
 
 
 def get_mia_returns():
-    df = get_ledger_history()
-    return df[(df['amount']>0) & (df['amount']<26) & (df['currency']=='STX')]
+    return ledger_dataset().rewards('STX', low=0, high=26)
 
 
 def get_stx_returns():
-    df = get_ledger_history()
-    return df[df['currency'] == 'BTC']
+    return ledger_dataset().currency('BTC')
 
 
 def get_deposits(start_date=None, end_date=None, currency='USD'):
@@ -65,10 +217,7 @@ def get_deposits(start_date=None, end_date=None, currency='USD'):
     if end_date == None:
         end_date = datetime.datetime.today().strftime('%Y-%m-%d')
 
-    dep = acc.get_deposit_history(currency)
-    df = dep.df
-    df['amount'] = pd.to_numeric(df['amount'])
-    df['updated_at'] = pd.to_datetime(df['updated_at'])
+    df = ledger_dataset().deposits(currency)
 
     mask = (df['updated_at'] > start_date) & (df['updated_at'] <= end_date)
     df = df.loc[mask]
@@ -76,7 +225,7 @@ def get_deposits(start_date=None, end_date=None, currency='USD'):
 
 
 def get_deposit_summary(start_date=None, end_date=None):
-    return acc.get_total_deposit_value(start_date, end_date)
+    return _client(Account).get_total_deposit_value(start_date, end_date)
 
 def purchase_history_chart():
 
@@ -0,0 +1,94 @@
+import uuid
+import random
+import requests
+
+# HTTP statuses and okcoin error codes that mean the request can be sent again.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_CODES = ('50001', '50004', '50011', '50013', '50026')
+
+# Transport errors after which the request may or may not have reached okcoin.
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+class RetryPolicy:
+    r"""
+    The RetryPolicy class decides when a request is sent again and how long to wait first.
+    GET requests are retried with jittered exponential backoff. Writes are resubmitted only
+    after okcoin has confirmed that the first attempt did not land.
+
+
+    Parameters
+    ----------
+    retries : The maximum number of times a request is sent again.
+
+    backoff : The base delay in seconds. The delay before retry n is drawn uniformly from
+    [0, backoff * 2 ** n], capped at max_backoff.
+
+    max_backoff : The largest delay in seconds.
+
+    statuses : HTTP statuses that are retried.
+
+    codes : okcoin error codes that are retried.
+
+    Attributes
+    ----------
+
+    Examples
+    --------
+    >>> from okcoin import Spot, Session
+    >>> from okcoin.Retry import RetryPolicy
+    >>> session = Session(timeout=(3.05, 5), retry=RetryPolicy(retries=5, backoff=0.5))
+    >>> spot = Spot('auth.config', session=session)
+    """
+
+    def __init__(self,
+                 retries=3,
+                 backoff=0.25,
+                 max_backoff=8.0,
+                 statuses=RETRY_STATUSES,
+                 codes=RETRY_CODES):
+
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        self.codes = codes
+
+    def delay(self, attempt):
+        r"""Returns the number of seconds to wait before retry number attempt (from 0)."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def is_retryable(self, status_code, content=None):
+        r"""Returns True if a response with this status and body can be sent again. The body
+        is only inspected for failed requests."""
+        if status_code in self.statuses:
+            return True
+        if status_code >= 400 and content:
+            return any(('"code":"%s"' % code).encode() in content.replace(b' ', b'')
+                       for code in self.codes)
+        return False
+
+
+def new_client_id():
+    r"""Returns a new client-assigned ID for an order, transfer or withdrawal. okcoin accepts
+    up to 32 alphanumeric characters."""
+    return uuid.uuid4().hex
+
+
+def assigns_client_ids(parameter):
+    r"""Marks a write method that generates client-assigned IDs when its parameter does not
+    carry them, either a client_id or a list of orders with a clOrdId. The asyncio clients fill
+    them in before the method is replayed, so that every attempt and lookup uses the same IDs."""
+    def mark(method):
+        method._client_ids = parameter
+        return method
+    return mark
+
+
+def found(response):
+    r"""Returns True if a lookup response reports the record it was queried for."""
+    try:
+        result = response.json()
+    except ValueError:
+        return False
+    return str(result.get('code')) == '0' and len(result.get('data') or []) > 0
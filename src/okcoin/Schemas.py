@@ -0,0 +1,171 @@
+import numpy as np
+
+from okcoin.Errors import error_for
+
+# Column kinds. Numeric strings and millisecond timestamps are converted in one pass per column.
+FLOAT = 'float64'
+INT = 'int64'
+MS = 'ms'        # unix time in milliseconds, as a string
+ISO = 'iso'      # ISO 8601 timestamp, e.g. '2021-05-16T05:41:27.000Z'
+STR = 'str'
+
+# Values substituted for empty strings before conversion, so that they become NaN, 0 and NaT.
+_EMPTY = {FLOAT: 'nan', INT: '0', MS: str(np.iinfo(np.int64).min), ISO: 'NaT'}
+
+
+class Schema:
+    r"""
+    The column types of the records returned by one endpoint.
+
+
+    Parameters
+    ----------
+    fields : A dictionary of field name to kind (FLOAT, INT, MS, ISO or STR), or for positional
+    records, a list of (field name, kind) in the order the values appear.
+
+    records : The name of a list inside each item of 'data' that holds the records, for
+    example, 'details' for account balances. By default the items of 'data' are the records.
+
+    Attributes
+    ----------
+    positional : True if the records are lists of values, like candles, instead of dictionaries.
+    """
+
+    def __init__(self, fields, records=None):
+        self.positional = isinstance(fields, list)
+        self.fields = dict(fields)
+        self.order = [name for name, _ in fields] if self.positional else list(fields)
+        self.records = records
+
+
+_BILL = Schema({'bal': FLOAT, 'balChg': FLOAT, 'billId': INT, 'ccy': STR, 'fee': FLOAT,
+                'instId': STR, 'ordId': STR, 'pnl': FLOAT, 'subType': INT, 'sz': FLOAT,
+                'ts': MS, 'type': INT})
+_FILL = Schema({'billId': INT, 'fee': FLOAT, 'fillPx': FLOAT, 'fillSz': FLOAT, 'instId': STR,
+                'ordId': STR, 'side': STR, 'tradeId': STR, 'ts': MS})
+_ORDER = Schema({'accFillSz': FLOAT, 'avgPx': FLOAT, 'cTime': MS, 'clOrdId': STR, 'fee': FLOAT,
+                 'fillPx': FLOAT, 'fillSz': FLOAT, 'instId': STR, 'ordId': STR, 'ordType': STR,
+                 'px': FLOAT, 'side': STR, 'state': STR, 'sz': FLOAT, 'uTime': MS})
+_CANDLE = Schema([('ts', MS), ('o', FLOAT), ('h', FLOAT), ('l', FLOAT), ('c', FLOAT),
+                  ('vol', FLOAT), ('volCcy', FLOAT), ('volCcyQuote', FLOAT), ('confirm', INT)])
+# The spot endpoints that predate V5 answer with a bare list of records in the v3 format.
+_SPOT_ORDER = Schema({'client_oid': STR, 'created_at': ISO, 'fee': FLOAT, 'filled_notional': FLOAT,
+                      'filled_size': FLOAT, 'instrument_id': STR, 'notional': FLOAT, 'order_id': STR,
+                      'order_type': INT, 'price': FLOAT, 'price_avg': FLOAT, 'side': STR, 'size': FLOAT,
+                      'state': INT, 'timestamp': ISO, 'type': STR})
+# The candles of /api/spot/v3/instruments/<instrument_id>/candles. The path holds the trading
+# pair, so ticker.get_candlestick_chart decodes with this schema directly.
+V3_CANDLE = Schema([('time', ISO), ('open', FLOAT), ('high', FLOAT), ('low', FLOAT), ('close', FLOAT),
+                    ('volume', FLOAT)])
+
+# Request path (without its query string) to Schema.
+SCHEMAS = {
+    '/api/v5/account/balance': Schema({'availBal': FLOAT, 'cashBal': FLOAT, 'ccy': STR, 'eq': FLOAT,
+                                       'frozenBal': FLOAT, 'ordFrozen': FLOAT, 'uTime': MS},
+                                      records='details'),
+    '/api/v5/asset/balances': Schema({'availBal': FLOAT, 'bal': FLOAT, 'ccy': STR, 'frozenBal': FLOAT}),
+    '/api/v5/account/bills': _BILL,
+    '/api/v5/account/bills-archive': _BILL,
+    '/api/v5/trade/fills': _FILL,
+    '/api/v5/trade/fills-history': _FILL,
+    '/api/v5/trade/order': _ORDER,
+    '/api/v5/trade/orders-pending': _ORDER,
+    '/api/v5/trade/orders-history': _ORDER,
+    '/api/v5/trade/orders-history-archive': _ORDER,
+    '/api/v5/market/candles': _CANDLE,
+    '/api/v5/market/history-candles': _CANDLE,
+    '/api/v5/asset/deposit-history': Schema({'amt': FLOAT, 'ccy': STR, 'depId': STR, 'state': INT,
+                                             'ts': MS, 'txId': STR}),
+    '/api/v5/asset/withdrawal-history': Schema({'amt': FLOAT, 'ccy': STR, 'fee': FLOAT, 'state': INT,
+                                                'ts': MS, 'txId': STR, 'wdId': STR}),
+    '/api/spot/v5/orders': _SPOT_ORDER,
+    '/api/spot/v5/orders_pending': _SPOT_ORDER,
+    '/api/spot/v5/fills': Schema({'created_at': ISO, 'currency': STR, 'exec_type': STR, 'fee': FLOAT,
+                                  'instrument_id': STR, 'ledger_id': INT, 'order_id': STR, 'price': FLOAT,
+                                  'side': STR, 'size': FLOAT, 'timestamp': ISO, 'trade_id': STR}),
+    '/api/account/v5/ledger': Schema({'amount': FLOAT, 'balance': FLOAT, 'currency': STR, 'fee': FLOAT,
+                                      'ledger_id': INT, 'timestamp': ISO}),
+}
+
+
+def register(request_path, schema):
+    r"""Registers the Schema of an endpoint so that its responses are decoded into typed columns.
+
+    Examples
+    --------
+    >>> from okcoin.Schemas import register, Schema, FLOAT, STR
+    >>> register('/api/v5/asset/withdrawal-history', Schema({'amt': FLOAT, 'ccy': STR}))
+    """
+    SCHEMAS[request_path] = schema
+
+
+def schema_for(request_path):
+    r"""Returns the registered Schema of a request path, or None."""
+    return SCHEMAS.get(request_path.split('?', 1)[0])
+
+
+def unwrap(payload, request_path=''):
+    r"""Returns the 'data' list of a V5 envelope, or raises the typed OkcoinAPIError
+    for a non-zero code. Payloads that are not enveloped are returned as they are."""
+    if isinstance(payload, dict) and 'code' in payload:
+        if str(payload['code']) != '0':
+            raise error_for(payload['code'], payload.get('msg', ''), request_path)
+        return payload.get('data') or []
+    return payload
+
+
+def _convert(values, kind):
+    if kind == STR:
+        return np.array(values, dtype=object)
+    empty = _EMPTY[kind]
+    values = np.array([v if v not in ('', None) else empty for v in values], dtype=str)
+    if kind == MS:
+        return values.astype(np.int64).view('datetime64[ms]')
+    if kind == ISO:
+        return np.char.rstrip(values, 'Z').astype('datetime64[ms]')
+    return values.astype(kind)
+
+
+def decode(payload, schema, request_path=''):
+    r"""Decodes a response into a dictionary of column name to NumPy array. Fields in the
+    schema are converted to their kind; any other fields are kept as object arrays.
+
+    Parameters
+    ----------
+    payload : dict or list
+        The decoded JSON response.
+
+    schema : Schema
+        The Schema of the endpoint.
+
+    request_path : str
+        The request path, used in error messages.
+
+    Returns
+    -------
+    columns : dict
+        A dictionary of column name to NumPy array.
+
+    Examples
+    --------
+    >>> from okcoin.Schemas import decode, SCHEMAS
+    >>> columns = decode(spot.get_bills().json, SCHEMAS['/api/v5/account/bills'])
+    >>> columns['balChg'].sum()
+    """
+    data = unwrap(payload, request_path)
+    if schema.records is not None:
+        data = [record for item in data for record in item.get(schema.records) or []]
+
+    if not data:
+        raw = {name: [] for name in schema.order}
+    elif schema.positional:
+        rows = np.array(data, dtype=object).reshape(len(data), -1)
+        names = schema.order[:rows.shape[1]] + \
+            ['%d' % i for i in range(len(schema.order), rows.shape[1])]
+        raw = {name: rows[:, i].tolist() for i, name in enumerate(names)}
+    else:
+        names = [name for name in schema.order if name in data[0]] + \
+            [name for name in data[0] if name not in schema.fields]
+        raw = {name: [record.get(name, '') for record in data] for name in names}
+
+    return {name: _convert(values, schema.fields.get(name, STR)) for name, values in raw.items()}
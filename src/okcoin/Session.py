@@ -0,0 +1,204 @@
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from okcoin.Clock import Clock
+from okcoin.RateLimiter import RateLimiter
+from okcoin.Retry import RetryPolicy, TRANSIENT_ERRORS
+
+REST_API_URL = "https://www.okcoin.com"
+WARM_UP_PATH = '/api/v5/public/time'
+
+
+class Session:
+    r"""
+    The Session class owns a keep-alive HTTP connection pool to okcoin. A single Session
+    can be shared by Account, Spot, Earn and Fiat so that every request reuses an open
+    TCP + TLS connection instead of paying for a new handshake.
+
+
+    Parameters
+    ----------
+    base_url : The okcoin REST endpoint. Set to https://www.okcoin.com by default.
+
+    pool_size : The maximum number of connections kept open in the pool.
+
+    timeout : Default (connect, read) timeout in seconds applied to every request.
+
+    warm_up : The number of connections to open when the Session is created. The first one
+    also syncs the clock with okcoin. Set to 0 to skip the warm up.
+
+    rate_limiter : The RateLimiter shared by every client using this Session. A new RateLimiter
+    is created if it is not specified. Set to False to send requests without rate limiting.
+
+    retry : The RetryPolicy for requests sent through this Session. A default RetryPolicy is
+    created if it is not specified. Set to False to send every request once.
+
+    clock : The Clock that timestamps signed requests. A Clock that re-syncs every 5 minutes
+    is created if it is not specified.
+
+    Attributes
+    ----------
+    http : The underlying requests.Session.
+
+    rate_limiter : The RateLimiter applied to signed requests, or False.
+
+    retry : The RetryPolicy applied to signed requests, or False.
+
+    clock : The Clock that timestamps signed requests.
+
+    Examples
+    --------
+    >>> from okcoin import Account, Spot, Session
+    >>> with Session(pool_size=20) as session:
+    ...     acc = Account('auth.config', session=session)
+    ...     spot = Spot('auth.config', session=session)
+    ...     balance = acc.get_balance()
+    """
+
+    def __init__(self,
+                 base_url=REST_API_URL,
+                 pool_size=10,
+                 timeout=(3.05, 10),
+                 warm_up=1,
+                 rate_limiter=None,
+                 retry=None,
+                 clock=None):
+
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.closed = False
+        self.rate_limiter = RateLimiter() if rate_limiter is None else rate_limiter
+        self.retry = RetryPolicy() if retry is None else retry
+        self.clock = Clock(self) if clock is None else clock
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+
+        if warm_up:
+            self.warm_up(warm_up)
+
+    def request(self, method, url, **kwargs):
+        r"""Sends a request through the connection pool, applying the default timeout
+        when none is given.
+
+        Parameters
+        ----------
+        method : str
+            'GET' or 'POST'.
+
+        url : str
+            The full request URL.
+
+        Returns
+        -------
+        response : requests.Response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        return self.http.request(method, url, **kwargs)
+
+    def send(self, method, request_path, prepare, retry=True, tokens=1):
+        r"""Sends a request through the rate limiter and the retry policy. Transport errors and
+        retryable responses are retried with backoff, and a request rejected for its timestamp
+        is sent once more after the clock is synced.
+
+        Parameters
+        ----------
+        method : str
+            'GET' or 'POST'.
+
+        request_path : str
+            The request path, used to pick the rate limit.
+
+        prepare : callable
+            Called before each attempt, so that signed requests get a fresh timestamp. Returns
+            the full request URL and a dictionary of keyword arguments for request().
+
+        retry : bool
+            Set to False to send the request once, except after a rejected timestamp.
+
+        tokens : int
+            The number of rate limit tokens each attempt takes.
+
+        Returns
+        -------
+        response : requests.Response
+        """
+        policy = self.retry
+        attempt = 0
+        resynced = False
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(request_path, tokens=tokens)
+            can_retry = retry and policy and attempt < policy.retries
+            url, kwargs = prepare()
+            try:
+                response = self.request(method, url, **kwargs)
+            except TRANSIENT_ERRORS:
+                if not can_retry:
+                    raise
+            else:
+                # A rejected timestamp means the request was not accepted, so it is safe to resend.
+                if not resynced and self.clock.rejected(response):
+                    resynced = True
+                    if self.clock.sync():
+                        continue
+                if not can_retry or not policy.is_retryable(response.status_code, response.content):
+                    return response
+            time.sleep(policy.delay(attempt))
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def warm_up(self, connections=1):
+        r"""Opens connections to okcoin ahead of the first real request. Requests are
+        issued concurrently so that each one leaves its own connection in the pool, and
+        the first one syncs the clock. Failures are ignored; the pool simply fills on
+        first use instead.
+
+        Parameters
+        ----------
+        connections : int
+            The number of connections to open, capped at the pool size.
+
+        Returns
+        -------
+        warmed : int
+            The number of connections that were opened successfully.
+        """
+        connections = max(1, min(connections, self.pool_size))
+
+        def _ping(i):
+            if i == 0:
+                return int(self.clock.sync())
+            try:
+                self.get(self.base_url + WARM_UP_PATH).close()
+                return 1
+            except requests.RequestException:
+                return 0
+
+        if connections == 1:
+            return _ping(0)
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            return sum(pool.map(_ping, range(connections)))
+
+    def close(self):
+        r"""Closes every pooled connection. The Session cannot be used afterwards."""
+        if not self.closed:
+            self.clock.stop()
+            self.http.close()
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,236 @@
+import os
+import json
+import shutil
+import configparser
+import pandas as pd
+from collections import namedtuple
+
+from okcoin.Formats import TIME_COLUMNS, CURRENCY_COLUMNS, _first_column
+
+MANIFEST_BLOB = "manifest.json"
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# name, etag and size in bytes of a stored blob.
+BlobInfo = namedtuple('BlobInfo', ['name', 'etag', 'size'])
+
+
+class AzureBlobBackend:
+    r"""
+    Stores blobs in an Azure Blob Storage container. Blobs larger than one block are
+    uploaded as blocks, several at once, and committed together.
+
+
+    Parameters
+    ----------
+    connection_string : The Azure storage connection string.
+
+    container_name : The name of the container.
+
+    block_size : The size of each uploaded block in bytes.
+
+    max_concurrency : The number of blocks uploaded or downloaded at once per blob.
+    """
+
+    def __init__(self, connection_string, container_name, block_size=BLOCK_SIZE, max_concurrency=4):
+        from azure.storage.blob import BlobServiceClient
+        service = BlobServiceClient.from_connection_string(connection_string, max_block_size=block_size,
+                                                           max_single_put_size=block_size)
+        self.max_concurrency = max_concurrency
+        self.container_client = service.get_container_client(container_name)
+        self.account_name = service.account_name
+        self.container_name = container_name
+
+    def list(self, prefix=None):
+        return [BlobInfo(b.name, b.etag, b.size)
+                for b in self.container_client.list_blobs(name_starts_with=prefix)]
+
+    def read(self, name):
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            blob_client = self.container_client.get_blob_client(name)
+            return blob_client.download_blob(max_concurrency=self.max_concurrency).readall()
+        except ResourceNotFoundError:
+            raise FileNotFoundError(name)
+
+    def write(self, name, data, overwrite=False):
+        r"""Uploads bytes or a binary file object and returns the etag of the new blob."""
+        result = self.container_client.get_blob_client(name).upload_blob(
+            data, overwrite=overwrite, max_concurrency=self.max_concurrency)
+        return result['etag']
+
+
+class LocalBackend:
+    r"""
+    Stores blobs as files under a local directory, with the same interface as
+    AzureBlobBackend. Blob names containing '/' are stored in subdirectories.
+
+
+    Parameters
+    ----------
+    root : The directory holding the blobs. It is created if it does not exist.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.account_name = 'local'
+        self.container_name = self.root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    @staticmethod
+    def _etag(stat):
+        return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+    def list(self, prefix=None):
+        blobs = []
+        for directory, _, files in os.walk(self.root):
+            for file in files:
+                path = os.path.join(directory, file)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                if prefix is None or name.startswith(prefix):
+                    stat = os.stat(path)
+                    blobs.append(BlobInfo(name, self._etag(stat), stat.st_size))
+        return sorted(blobs)
+
+    def read(self, name):
+        with open(self._path(name), 'rb') as f:
+            return f.read()
+
+    def write(self, name, data, overwrite=False):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb' if overwrite else 'xb') as f:
+            if hasattr(data, 'read'):
+                shutil.copyfileobj(data, f, BLOCK_SIZE)
+            else:
+                f.write(data)
+        return self._etag(os.stat(path))
+
+
+def open_backend(config_file="azure.config"):
+    r""" Returns the storage backend described by the [DEFAULT] section of an azure config
+    file: a LocalBackend if it sets 'local_path', otherwise an AzureBlobBackend using
+    'connection_string' and 'container_name'.
+
+    Examples
+    --------
+    >>> from okcoin.Storage import open_backend
+    >>> backend = open_backend(r"C:\azure.config")
+    >>> [blob.name for blob in backend.list('ledger/')]
+    """
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    if 'local_path' in config['DEFAULT']:
+        return LocalBackend(config['DEFAULT']['local_path'])
+    return AzureBlobBackend(config['DEFAULT']['connection_string'], config['DEFAULT']['container_name'])
+
+
+def _ms(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.value // 1_000_000)
+
+
+def record_type_of(name):
+    r"""Returns the record type of a blob name, either its first directory or, for the
+    flat '<record type>_<YYYYmmdd>_<HHMMSS>.csv' names, the part before the date."""
+    if '/' in name:
+        return name.split('/', 1)[0]
+    return name.rsplit('.', 1)[0].rsplit('_', 2)[0]
+
+
+class Manifest:
+    r"""
+    An index of the record type, time range, currencies, row count and etag of every
+    stored blob, kept in a JSON blob next to the data. Loaders use it to fetch only the
+    blobs that overlap a time range or hold a currency.
+
+
+    Parameters
+    ----------
+    entries : A dictionary of blob name to entry.
+
+    Examples
+    --------
+    >>> from okcoin.Storage import Manifest, open_backend
+    >>> backend = open_backend(r"C:\azure.config")
+    >>> manifest = Manifest.load(backend)
+    >>> manifest.select(backend.list(), 'ledger', start='2021-05-01', currency='STX')
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, backend, manifest_blob=MANIFEST_BLOB):
+        try:
+            return cls(json.loads(backend.read(manifest_blob)))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, backend, manifest_blob=MANIFEST_BLOB):
+        backend.write(manifest_blob, json.dumps(self.entries, indent=1).encode('utf-8'), overwrite=True)
+
+    def add(self, name, df, etag, record_type=None):
+        r"""Records the time range, currencies and row count of a dataframe stored as a blob."""
+        time_column = _first_column(df, TIME_COLUMNS)
+        currency_column = _first_column(df, CURRENCY_COLUMNS)
+        start = end = None
+        if time_column is not None and len(df):
+            times = pd.to_datetime(df[time_column], utc=True, format='ISO8601', errors='coerce').dropna()
+            if len(times):
+                start, end = _ms(times.min()), _ms(times.max())
+        self.entries[name] = {
+            'record_type': record_type or record_type_of(name),
+            'start': start,
+            'end': end,
+            'currencies': sorted(df[currency_column].dropna().astype(str).unique().tolist())
+            if currency_column is not None else None,
+            'rows': int(len(df)),
+            'etag': etag,
+        }
+
+    def select(self, blobs, filter='', start=None, end=None, currency=None):
+        r""" Returns the names of the blobs that match a filter and may hold records between
+        start and end (inclusive) of a currency. Blobs that are not in the manifest, or that
+        changed since they were indexed, are always returned.
+
+        Parameters
+        ----------
+        blobs : list
+            The BlobInfo of the stored blobs, from backend.list().
+
+        filter : str
+            Only blobs whose name contains this string are returned.
+
+        start, end : str or datetime
+            The time range. Naive times are in UTC.
+
+        currency : str
+            The currency, for example, 'STX'.
+
+        Returns
+        -------
+        names : list
+        """
+        start = _ms(start) if start is not None else None
+        end = _ms(end) if end is not None else None
+        names = []
+        for blob in blobs:
+            if filter not in blob.name or blob.name == MANIFEST_BLOB:
+                continue
+            entry = self.entries.get(blob.name)
+            if entry is None or entry['etag'] != blob.etag:
+                names.append(blob.name)
+                continue
+            if start is not None and entry['end'] is not None and entry['end'] < start:
+                continue
+            if end is not None and entry['start'] is not None and entry['start'] > end:
+                continue
+            if currency is not None and entry['currencies'] is not None and currency not in entry['currencies']:
+                continue
+            names.append(blob.name)
+        return names
@@ -0,0 +1,311 @@
+import json
+import asyncio
+import aiohttp
+import requests
+
+from okcoin import ticker
+
+PUBLIC_WS_URL = "wss://real.okcoin.com:8443/ws/v5/public"
+
+# Channel to the REST endpoint used to catch up after a reconnect. Books resynchronize
+# from the snapshot the exchange sends when the channel is subscribed again.
+RESYNC_PATHS = {
+    'tickers': '/api/v5/market/ticker',
+    'trades': '/api/v5/market/trades',
+    'candle': '/api/v5/market/candles',
+}
+
+
+def candle_channel(granularity=60):
+    r"""Returns the candle channel of a granularity in seconds, for example, 'candle1m' for 60."""
+    return 'candle' + ticker.BARS[granularity]
+
+
+class MarketStream:
+    r"""
+    Streams the V5 public channels, such as tickers, trades, books and candles, over one
+    WebSocket connection. Subscriptions are kept across reconnects, idle connections are
+    kept alive with pings, and dropped connections are reopened with exponential backoff.
+    After a reconnect, tickers, trades and candles are caught up through REST, and a book
+    whose sequence numbers skip is subscribed again so that a new snapshot is sent. Messages
+    are delivered to callbacks and to async iterators. Updates of a book that is waiting for its
+    new snapshot are dropped.
+
+
+    Parameters
+    ----------
+    url : The WebSocket URL of the public channels.
+
+    rest_url : The REST URL used to resynchronize.
+
+    heartbeat : Seconds without a message after which a ping is sent. okcoin closes
+    connections that are idle for 30 seconds.
+
+    reconnect_delay : The first delay before reconnecting, in seconds. It doubles after each
+    failed attempt up to max_reconnect_delay.
+
+    max_reconnect_delay : The longest delay before reconnecting.
+
+    queue_size : The number of messages buffered for each async iterator. The oldest
+    message is dropped when a consumer falls behind.
+
+    on_event : Called with the subscribe, unsubscribe and error events sent by okcoin, and
+    with an error event whose 'exception' is set when a callback raises or a message cannot
+    be decoded. Without on_event, those errors go to the exception handler of the event loop.
+    Either way the stream keeps running.
+
+    Attributes
+    ----------
+    reconnects : The number of times the connection was reopened.
+
+    gaps : The number of book sequence gaps detected.
+
+    dropped : The number of messages dropped because an iterator fell behind.
+
+    errors : The number of messages whose callbacks raised or that could not be decoded.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> from okcoin.WebSocket import MarketStream, candle_channel
+    >>> async def main():
+    ...     async with MarketStream() as stream:
+    ...         await stream.subscribe('tickers', 'BTC-USD', callback=print)
+    ...         await stream.subscribe(candle_channel(60), 'BTC-USD')
+    ...         async for message in stream.messages('trades', 'BTC-USD'):
+    ...             print(message['data'])
+    >>> asyncio.run(main())
+    """
+
+    def __init__(self, url=PUBLIC_WS_URL, rest_url=ticker.OKCOIN_URL, heartbeat=25,
+                 reconnect_delay=1.0, max_reconnect_delay=30.0, queue_size=10000, on_event=None):
+        self.url = url
+        self.rest_url = rest_url
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.queue_size = queue_size
+        self.on_event = on_event
+        self.reconnects = 0
+        self.gaps = 0
+        self.dropped = 0
+        self.errors = 0
+        self._callbacks = {}   # (channel, instId) -> list of callbacks
+        self._queues = {}      # (channel, instId) -> list of asyncio.Queue
+        self._seq = {}         # (channel, instId) -> last book seqId
+        self._resyncing = set()  # books waiting for a snapshot after being subscribed again
+        self._ws = None
+        self._session = None
+        self._task = None
+        self._closed = False
+
+    @staticmethod
+    def _arg(key):
+        return {'channel': key[0], 'instId': key[1]}
+
+    async def _send(self, op, keys):
+        if self._ws is not None and not self._ws.closed and keys:
+            await self._ws.send_str(json.dumps({'op': op, 'args': [self._arg(key) for key in keys]}))
+
+    async def subscribe(self, channel, trading_pair, callback=None):
+        r""" Subscribes to a channel of a trading pair, for example, ('books', 'BTC-USD').
+        callback, if given, is called with every message of the channel, as a dictionary
+        with 'arg', 'data' and, for books, 'action'. Coroutine functions are awaited.
+        """
+        key = (channel, trading_pair)
+        new = key not in self._callbacks
+        callbacks = self._callbacks.setdefault(key, [])
+        if callback is not None:
+            callbacks.append(callback)
+        if new:
+            await self._send('subscribe', [key])
+
+    async def unsubscribe(self, channel, trading_pair):
+        key = (channel, trading_pair)
+        if self._callbacks.pop(key, None) is not None:
+            self._seq.pop(key, None)
+            self._resyncing.discard(key)
+            await self._send('unsubscribe', [key])
+
+    async def resubscribe(self, channel, trading_pair):
+        r"""Subscribes to a channel again so that okcoin sends a new snapshot, for example,
+        after an OrderBook fails its checksum. Callbacks and iterators are kept, and updates
+        of a book are dropped until its new snapshot arrives."""
+        key = (channel, trading_pair)
+        self._seq.pop(key, None)
+        if channel.startswith('books'):
+            self._resyncing.add(key)
+        await self._send('unsubscribe', [key])
+        await self._send('subscribe', [key])
+
+    async def messages(self, channel, trading_pair):
+        r"""Subscribes to a channel if needed and yields its messages as they arrive."""
+        key = (channel, trading_pair)
+        queue = asyncio.Queue(self.queue_size)
+        self._queues.setdefault(key, []).append(queue)
+        try:
+            await self.subscribe(channel, trading_pair)
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues[key].remove(queue)
+
+    async def _deliver(self, key, message):
+        for queue in self._queues.get(key, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+        for callback in list(self._callbacks.get(key, ())):
+            try:
+                result = callback(message)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as error:
+                self._report(error, message)
+
+    def _report(self, error, message):
+        r"""Reports an error raised while handling a message, so that one bad callback or
+        message does not stop the stream."""
+        self.errors += 1
+        if self.on_event is not None:
+            try:
+                self.on_event({'event': 'error', 'msg': repr(error), 'exception': error, 'message': message})
+                return
+            except Exception as e:
+                error = e
+        asyncio.get_running_loop().call_exception_handler({
+            'message': 'MarketStream failed to handle a message', 'exception': error})
+
+    async def _dispatch(self, message):
+        if 'event' in message:
+            if self.on_event is not None:
+                try:
+                    self.on_event(message)
+                except Exception as error:
+                    self._report(error, message)
+            return
+        arg = message.get('arg', {})
+        key = (arg.get('channel'), arg.get('instId'))
+        if key[0] is not None and key[0].startswith('books') and message.get('data'):
+            book = message['data'][0]
+            if message.get('action', 'snapshot') == 'snapshot':
+                self._resyncing.discard(key)
+            elif key in self._resyncing:
+                return  # sent before the book was subscribed again
+            if 'seqId' in book:
+                if message.get('action') == 'update' and book.get('prevSeqId') != self._seq.get(key):
+                    # An update was missed: drop the book and wait for a new snapshot.
+                    self.gaps += 1
+                    await self.resubscribe(*key)
+                    return
+                self._seq[key] = book['seqId']
+        await self._deliver(key, message)
+
+    def _fetch(self, key):
+        channel, inst_id = key
+        params = {'instId': inst_id}
+        if channel.startswith('candle'):
+            path = RESYNC_PATHS['candle']
+            params['bar'] = channel[len('candle'):]
+        else:
+            path = RESYNC_PATHS[channel]
+        return requests.get(self.rest_url + path, params=params, timeout=10).json()
+
+    async def _resync(self, keys):
+        for key in keys:
+            if key[0] not in RESYNC_PATHS and not key[0].startswith('candle'):
+                continue
+            try:
+                payload = await asyncio.get_running_loop().run_in_executor(None, self._fetch, key)
+            except (requests.RequestException, ValueError):
+                continue
+            if str(payload.get('code')) == '0':
+                await self._deliver(key, {'arg': self._arg(key), 'data': payload['data'], 'resync': True})
+
+    async def _listen(self, ws):
+        waiting_for_pong = False
+        while True:
+            try:
+                msg = await ws.receive(timeout=self.heartbeat)
+            except asyncio.TimeoutError:
+                if waiting_for_pong:
+                    return  # the connection is dead
+                waiting_for_pong = True
+                await ws.send_str('ping')
+                continue
+            waiting_for_pong = False
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                if msg.data == 'pong':
+                    continue
+                try:
+                    message = json.loads(msg.data)
+                except ValueError as error:
+                    self._report(error, msg.data)
+                    continue
+                try:
+                    await self._dispatch(message)
+                except (aiohttp.ClientError, ConnectionError):
+                    raise
+                except Exception as error:
+                    self._report(error, message)
+            elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                              aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                return
+
+    async def run(self):
+        r"""Keeps the connection open until close() is called. Started by `async with`."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        delay = self.reconnect_delay
+        connected_before = False
+        while not self._closed:
+            try:
+                async with self._session.ws_connect(self.url, autoping=True) as ws:
+                    self._ws = ws
+                    delay = self.reconnect_delay
+                    self._seq.clear()
+                    self._resyncing.clear()
+                    keys = list(self._callbacks)
+                    await self._send('subscribe', keys)
+                    if connected_before:
+                        self.reconnects += 1
+                        await self._resync(keys)
+                    connected_before = True
+                    await self._listen(ws)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError):
+                pass
+            finally:
+                self._ws = None
+            if not self._closed:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    def start(self):
+        r"""Runs the stream in a background task of the running event loop."""
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def close(self):
+        self._closed = True
+        if self._ws is not None:
+            await self._ws.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
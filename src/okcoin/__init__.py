@@ -1,17 +1,26 @@
-import requests
 import json
 import getpass
 import datetime
+import time
 import hmac
+import hashlib
 import base64
 import pandas as pd
 import numpy as np
 import configparser
 import plotly.graph_objects as go
+from types import MappingProxyType
 
 from okcoin.DataObjects import  _Candlestick
 from okcoin.DataObjects import _Resp
 from okcoin.DataObjects import _AccountInfo
+from okcoin.DataObjects import _BatchResp
+from okcoin.Session import Session
+from okcoin.Retry import TRANSIENT_ERRORS, assigns_client_ids, found, new_client_id
+from okcoin.Pagination import Paginator, paginated
+from okcoin.History import download_history, windowed
+from okcoin.Ledger import Ledger
+from okcoin import FixedPoint
 
 # documentation following numpy: https://numpydoc.readthedocs.io/en/latest/example.html#example
 
@@ -24,6 +33,8 @@ APPLICATION_JSON = 'application/json'
 GET = 'GET'
 POST = 'POST'
 REST_API_URL = "https://www.okcoin.com"
+BATCH_SIZE = 20  # maximum number of orders in one V5 batch request
+UNKNOWN_CODE = '-1'  # sCode of batched orders whose request failed before okcoin answered
 
 
 class _Signature:
@@ -41,13 +52,35 @@ class _Signature:
     pass_phrase : If a pass_phrase is not specified in the config_file, it can be entered as a separate parameter
     or you will be prompted to enter it through your Python IDE.
 
+    session : A Session whose connection pool is shared with other clients. If it is not specified,
+    the client creates and owns its own Session.
+
+    pool_size : The size of the connection pool when the client creates its own Session.
+
+    timeout : The default (connect, read) timeout in seconds when the client creates its own Session.
+
+    warm_up : The number of connections opened at startup when the client creates its own Session.
+
+    rate_limiter : The RateLimiter used when the client creates its own Session. Set to False to send
+    requests without rate limiting.
+
+    retry : The RetryPolicy used when the client creates its own Session. Set to False to send every
+    request once.
+
     Attributes
     ----------
+    session : The Session used for every request.
     """
 
     def __init__(self,
                  config_file=r'auth.config',
-                 pass_phrase=None):
+                 pass_phrase=None,
+                 session=None,
+                 pool_size=10,
+                 timeout=(3.05, 10),
+                 warm_up=1,
+                 rate_limiter=None,
+                 retry=None):
 
         config = configparser.ConfigParser()
         config.read(config_file)
@@ -65,30 +98,51 @@ class _Signature:
             # print("HERE2")
             self.pass_phrase = config['DEFAULT']['pass_phrase']  # pass_phrase
         # self.query_result = query_result()
+        self._init_signing()
+
+        self._owns_session = session is None
+        if session is None:
+            session = Session(self.REST_API_URL, pool_size=pool_size, timeout=timeout, warm_up=warm_up,
+                              rate_limiter=rate_limiter, retry=retry)
+        self.session = session
+
+    def close(self):
+        r"""Closes the connection pool if it is owned by this client. A shared Session
+        must be closed by its owner."""
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _init_signing(self):
+        # The keyed HMAC is copied for each request instead of re-keying it, and the
+        # constant header fields are built once.
+        self._hmac = hmac.new(self.secret_key.encode('utf-8'), digestmod=hashlib.sha256)
+        self._header_template = MappingProxyType({
+            CONTENT_TYPE: APPLICATION_JSON,
+            OK_ACCESS_KEY: self.api_key,
+            OK_ACCESS_PASSPHRASE: self.pass_phrase})
 
     def __get_timestamp(self):
-        timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + "Z"
-        print(timestamp)
-        return timestamp
+        return self.session.clock.timestamp()
 
     # signature
     def __get_signature(self, t, method, request_path, body=None):
-        if str(body) == '{}' or str(body) == 'None' or body == None:
+        if not body or body == '{}' or body == 'None':
             body = ''
-        message = str(t) + str.upper(method) + request_path + str(body)
-        mac = hmac.new(bytes(self.secret_key, encoding='utf8'), bytes(message, encoding='utf-8'),
-                       digestmod='sha256')
-        d = mac.digest()
-        return base64.b64encode(d)
+        mac = self._hmac.copy()
+        mac.update((t + method.upper() + request_path + body).encode('utf-8'))
+        return base64.b64encode(mac.digest()).decode()
 
     # set request header
     def __get_header(self, sig, t):
-        header = dict()
-        header[CONTENT_TYPE] = APPLICATION_JSON
-        header[OK_ACCESS_KEY] = self.api_key
+        header = dict(self._header_template)
         header[OK_ACCESS_SIGN] = sig
         header[OK_ACCESS_TIMESTAMP] = t
-        header[OK_ACCESS_PASSPHRASE] = self.pass_phrase
         return header
 
     def __parse_params_to_str(self, params):
@@ -98,37 +152,82 @@ class _Signature:
 
         return url[0:-1]
 
-    def query(self, type, request_path, body=''):
-        #print(request_path)
-        #print(type)
-        #print(body)
+    def _prepare(self, type, request_path, body=''):
+        r"""Signs a request without sending it, so that any transport can send it.
+
+        Returns
+        -------
+        url, data, header : tuple
+            The full request URL, the POST body (None for a GET) and the signed header.
+        """
         if type == "POST":
             body = json.dumps(body)
-            print(body)
         else:
             if body != '':
                 body = self.__parse_params_to_str(body)
 
-        timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + "Z"
-        # self.get_timestamp()
-        print(body)
+        timestamp = self.__get_timestamp()
         signature = self.__get_signature(timestamp, type, request_path, body)
         #signature = self.__get_signature(timestamp, type, request_path, body)
         #signature = self.__get_signature(timestamp, type, request_path, '')
 
         header = self.__get_header(signature, timestamp)
-        # do request
         if type == 'GET':
-            response = requests.get(self.REST_API_URL + request_path + body,
-                                headers=header)
-        else:
-            print(self.REST_API_URL + request_path)
-            response = requests.post(self.REST_API_URL + request_path, data=body,
-                                    headers=header)
+            return self.REST_API_URL + request_path + body, None, header
+        return self.REST_API_URL + request_path, body, header
+
+    def query(self, type, request_path, body='', tokens=1):
+        #print(request_path)
+        #print(type)
+        #print(body)
+        def prepare():
+            # Signed again for each attempt, so that the timestamp is current.
+            url, data, header = self._prepare(type, request_path, body)
+            if type == 'GET':
+                return url, {'headers': header}
+            return url, {'data': data, 'headers': header}
+
+        # Only GETs are retried here; writes are resubmitted by _write once their outcome is known.
+        return self.session.send(type, request_path, prepare, retry=type == 'GET', tokens=tokens)
+
+    def _write(self, request_path, body, lookup_path):
+        r"""POSTs a write that carries a client-assigned ID. When the outcome is unknown, because
+        the connection failed or okcoin answered with a transient error, the write is looked up by
+        that ID and only resubmitted if okcoin has no record of it.
+
+        Parameters
+        ----------
+        request_path : str
+            The write endpoint.
+
+        body : dict
+            The request body, including its client-assigned ID.
 
-#data=body
+        lookup_path : str
+            A GET request path that returns the record created by the write.
 
-        return response
+        Returns
+        -------
+        response : requests.Response
+            The response to the write, or the lookup response if an earlier attempt landed.
+        """
+        retry = self.session.retry
+        attempts = retry.retries + 1 if retry else 1
+        for attempt in range(attempts):
+            try:
+                response = self.query(POST, request_path, body=body)
+            except TRANSIENT_ERRORS:
+                if attempt == attempts - 1:
+                    raise
+            else:
+                if not retry or attempt == attempts - 1 or \
+                        not retry.is_retryable(response.status_code, response.content):
+                    return response
+            # Back off before looking the write up and, if it did not land, sending it again.
+            time.sleep(retry.delay(attempt))
+            lookup = self.query(GET, lookup_path)
+            if found(lookup):
+                return lookup
 
 class Account(_Signature):
     """
@@ -371,13 +470,19 @@ class Account(_Signature):
         return _Resp(self.query(GET, request_path))
 
     ## Withdraw or Trade Permission
-    def get_funds_transfer(self, ccy='BTC', amt='', origin='', destination=''):
+    @assigns_client_ids('client_id')
+    def get_funds_transfer(self, ccy='BTC', amt='', origin='', destination='', client_id=''):
+        # The client ID lets a transfer whose outcome is unknown be looked up before it is resubmitted.
+        if not client_id:
+            client_id = new_client_id()
         body = {'ccy': ccy,
                   'amt': amt,
                   'from': origin,
-                  'to': destination}
+                  'to': destination,
+                  'clientId': client_id}
         request_path = '/api/v5/asset/transfer'
-        return _Resp(self.query(POST, request_path, body=body))
+        lookup_path = '/api/v5/asset/transfer-state?clientId=' + client_id
+        return _Resp(self._write(request_path, body, lookup_path))
 
     def get_funds_transfer_state(self, transId='3693307', clientId=''):
         str(transId)
@@ -392,14 +497,20 @@ class Account(_Signature):
         return _Resp(self.query(GET, request_path))
 
     ## Withdraw or Trade Permission
-    def withdraw(self, currency='', amount='', to_address='', fee=''):
+    @assigns_client_ids('client_id')
+    def withdraw(self, currency='', amount='', to_address='', fee='', client_id=''):
+        # The client ID lets a withdrawal whose outcome is unknown be looked up before it is resubmitted.
+        if not client_id:
+            client_id = new_client_id()
         body = {'ccy': currency,
                   'amt': amount,
                   'destination': '4',
                   'toAddr': to_address,
-                  'fee': fee}
+                  'fee': fee,
+                  'clientId': client_id}
         request_path = '/api/v5/asset/withdrawal'
-        return _Resp(self.query(POST, request_path, body=body))
+        lookup_path = '/api/v5/asset/withdrawal-history?clientId=' + client_id
+        return _Resp(self._write(request_path, body, lookup_path))
 
     def get_withdrawal_history(self, currency=''):
         r""" Retrieves the 100 most recent withdrawal records.
@@ -429,6 +540,36 @@ class Account(_Signature):
             request_path = '/api/v5/asset/withdrawal-history'
         return _Resp(self.query(GET, request_path))
 
+    @windowed('withdrawals')
+    def download_withdrawal_history(self, start_date, end_date=None, currency='', max_workers=8):
+        r""" Retrieves every withdrawal between two dates, beyond the 100 record limit of
+        get_withdrawal_history, by downloading time windows concurrently.
+
+        Parameters
+        ----------
+        start_date : 	str
+            Start date of query in YYYY-MM-DD.
+
+        end_date : str
+            End date of query in YYYY-MM-DD. Set to now by default.
+
+        currency : str
+            The currency that was withdrawn. All currencies by default.
+
+        max_workers : int
+            The number of time windows downloaded at once.
+
+        Returns
+        -------
+        withdrawals : DataFrame
+            One row per withdrawal, sorted by time.
+
+        Examples
+        --------
+        >>> withdrawals = acc.download_withdrawal_history('2021-01-01', '2021-07-01', 'STX')
+        """
+        return download_history(self, 'withdrawals', start_date, end_date, currency, max_workers=max_workers)
+
     def get_ledger(self):
         r""" Retrieves the value of your account for the past month.
 
@@ -451,13 +592,8 @@ class Account(_Signature):
         [4 rows x 7 columns]
         """
         request_path = '/api/account/v5/ledger'
-        ledger_resp = _Resp(self.query(GET, request_path))
-        ledger_resp.df.amount = ledger_resp.df.amount.astype('float64')
-        ledger_resp.df.balance = ledger_resp.df.balance.astype('float64')
-        ledger_resp.df.fee = ledger_resp.df.fee.astype('float64')
-        ledger_resp.df.ledger_id = ledger_resp.df.ledger_id.astype('int64')
-        ledger_resp.df.timestamp = ledger_resp.df.timestamp.astype('datetime64')
-        return ledger_resp
+        # amount, balance, fee, ledger_id and timestamp are typed by the ledger Schema as the frame is built
+        return _Resp(self.query(GET, request_path))
 
     def get_deposit_address(self, currency='BTC'):
         r""" Retrieves the deposit addresses of currencies, including previously used addresses.
@@ -507,7 +643,8 @@ class Account(_Signature):
         Returns
         -------
         value : float
-            Value representing the amount deposited during that date range.
+            Value representing the amount deposited during that date range. The amounts are
+            added exactly as fixed-point integers and rounded to float once.
 
         Examples
         --------
@@ -521,13 +658,13 @@ class Account(_Signature):
             end_date = datetime.datetime.today().strftime('%Y-%m-%d')
 
         dep = self.get_deposit_history(currency)
-        df = dep.df
-        df['amount'] = pd.to_numeric(df['amount'])
-        df['updated_at'] = pd.to_datetime(df['updated_at'])
+        records = dep.json['data']
+        decimals = FixedPoint.decimals_for(currency)
+        amounts = FixedPoint.parse([record['amt'] for record in records], decimals)
+        updated_at = pd.to_datetime(np.array([record['ts'] for record in records], dtype=np.int64), unit='ms')
 
-        mask = (df['updated_at'] > start_date) & (df['updated_at'] <= end_date)
-        df = df.loc[mask]
-        val = np.sum(df['amount'].to_list())
+        mask = (updated_at > start_date) & (updated_at <= end_date)
+        val = FixedPoint.to_float(amounts[mask].sum(), decimals)
 
         return val
 
@@ -562,6 +699,36 @@ class Account(_Signature):
 
         return _Resp(self.query(GET, request_path))
 
+    @windowed('deposits')
+    def download_deposit_history(self, start_date, end_date=None, currency='', max_workers=8):
+        r""" Retrieves every deposit between two dates, beyond the 100 record limit of
+        get_deposit_history, by downloading time windows concurrently.
+
+        Parameters
+        ----------
+        start_date : 	str
+            Start date of query in YYYY-MM-DD.
+
+        end_date : str
+            End date of query in YYYY-MM-DD. Set to now by default.
+
+        currency : str
+            The currency deposited. All currencies by default.
+
+        max_workers : int
+            The number of time windows downloaded at once.
+
+        Returns
+        -------
+        deposits : DataFrame
+            One row per deposit, sorted by time.
+
+        Examples
+        --------
+        >>> deposits = acc.download_deposit_history('2021-01-01', currency='USD')
+        """
+        return download_history(self, 'deposits', start_date, end_date, currency, max_workers=max_workers)
+
     def get_currencies(self):
         r""" This retrieves a list of all currencies.
 
@@ -619,16 +786,17 @@ class Account(_Signature):
 
         Parameters
         ----------
-        df : 	dataframe
-            The dataframe generated by the
+        df : 	dataframe or Ledger
+            The dataframe generated by the get_ledger, or a Ledger built from it. Pass a Ledger
+            when querying several currencies so that the ledger is only sorted once.
 
         currency : str
             The currency that you are querying.
 
         Returns
         -------
-        balance : _Resp
-            A n object that...
+        balance : DataFrame
+            The largest balance at each ledger timestamp, sorted by time.
 
         fig : Plotly chart
             A plotly chart of the balance of the funding account.
@@ -640,10 +808,8 @@ class Account(_Signature):
         >>> print(btc_balance[0])
         >>> btc_balance[1].write_html('test.html', auto_open=True)
         """
-        cur = df[df['currency']==currency]
-        cur_balance = cur.groupby('timestamp')['balance'].max()
-        balance = cur_balance.to_frame()
-        balance.reset_index(inplace=True)
+        ledger = df if isinstance(df, Ledger) else Ledger(df)
+        balance = ledger.balance_history(currency)
 
         fig = go.Figure(data=go.Scatter(
             x=balance.timestamp.tolist(),
@@ -779,7 +945,7 @@ class Spot(_Signature):
         """
         request_path = '/api/v5/account/bills'
         if currency:
-            request_path + '?ccy=' + currency
+            request_path = request_path + '?ccy=' + currency
         return _Resp(self.query(GET, request_path))
 		
     def get_bills_archive(self, currency=''):
@@ -804,9 +970,110 @@ class Spot(_Signature):
         """
         request_path = '/api/v5/account/bills-archive'
         if currency:
-            request_path + '?ccy=' + currency
+            request_path = request_path + '?ccy=' + currency
         return _Resp(self.query(GET, request_path))
 
+    @paginated
+    def iter_bills(self, currency='', limit=100, after=None, before=None, max_pages=None):
+        r""" Streams the spot account bills of the past 7 days one page at a time,
+        following the V5 cursors from the most recent bill back.
+
+        Parameters
+        ----------
+        currency : 	str
+            Currency being queried
+
+        limit : int
+            The number of bills per page, at most 100.
+
+        after : str
+            Start with the bills older than this bill ID.
+
+        before : str
+            Page forward through the bills newer than this bill ID instead.
+
+        max_pages : int
+            Stop after this many pages.
+
+        Returns
+        -------
+        pages : Paginator
+            An iterable of query response objects, one per page.
+
+        Examples
+        --------
+        >>> for page in spot.iter_bills('BTC'):
+        ...     print(page.df)
+        >>> bills = spot.iter_bills('BTC').collect()
+        """
+        return Paginator(self, '/api/v5/account/bills', {'ccy': currency}, 'billId', limit,
+                         after, before, max_pages)
+
+    @paginated
+    def iter_bills_archive(self, currency='', limit=100, after=None, before=None, max_pages=None):
+        r""" Streams the spot account bills of the past 3 months one page at a time,
+        following the V5 cursors from the most recent bill back.
+
+        Parameters
+        ----------
+        currency : 	str
+            Currency being queried
+
+        limit : int
+            The number of bills per page, at most 100.
+
+        after : str
+            Start with the bills older than this bill ID.
+
+        before : str
+            Page forward through the bills newer than this bill ID instead.
+
+        max_pages : int
+            Stop after this many pages.
+
+        Returns
+        -------
+        pages : Paginator
+            An iterable of query response objects, one per page.
+
+        Examples
+        --------
+        >>> bills = spot.iter_bills_archive('STX').collect()
+        """
+        return Paginator(self, '/api/v5/account/bills-archive', {'ccy': currency}, 'billId', limit,
+                         after, before, max_pages)
+
+    @windowed('bills')
+    def download_bills(self, start_date, end_date=None, currency='', max_workers=8):
+        r""" Retrieves every spot account bill between two dates, within the last 3 months,
+        by downloading time windows of the bills archive concurrently.
+
+        Parameters
+        ----------
+        start_date : 	str
+            Start date of query in YYYY-MM-DD.
+
+        end_date : str
+            End date of query in YYYY-MM-DD. Set to now by default.
+
+        currency : str
+            Currency being queried. All currencies by default.
+
+        max_workers : int
+            The number of time windows downloaded at once.
+
+        Returns
+        -------
+        bills : DataFrame
+            One row per bill, sorted by time.
+
+        Examples
+        --------
+        >>> bills = spot.download_bills('2021-04-01', '2021-07-01', 'BTC')
+        """
+        return download_history(self, 'bills', start_date, end_date, currency, max_workers=max_workers)
+
+    @assigns_client_ids('client_id')
     def place_order(self, side='', trading_pair='', limit_or_market='', size='', price='', client_id=''):
         r""" Returns This the list of your orders from
         the most recent 3 months. This request supports paging
@@ -834,7 +1101,9 @@ class Spot(_Signature):
             Amount to spend. Required for market buys.
 
         client_id : str
-            A user defined ID that you can give your order
+            A user defined ID that you can give your order. One is generated if it is not
+            specified, so that an order whose outcome is unknown can be looked up before it
+            is resubmitted.
 
 
         Returns
@@ -849,6 +1118,8 @@ class Spot(_Signature):
         """
         request_path = '/api/v5/trade/order'#?instrument_id='+trading_pair+'&state='+str(state)
         # Using the "body" doesn't work
+        if not client_id:
+            client_id = new_client_id()
 
         if limit_or_market == 'market':
             body = {'instId': trading_pair,
@@ -868,7 +1139,8 @@ class Spot(_Signature):
                  'sz':str(size),
                  'px':str(price)}
 
-        return _Resp(self.query(POST, request_path, body=body))
+        lookup_path = '/api/v5/trade/order?instId=' + trading_pair + '&clOrdId=' + client_id
+        return _Resp(self._write(request_path, body, lookup_path))
 
     def cancel_order(self, order_id, trading_pair):
         r""" Cancels an existing trade.
@@ -897,6 +1169,145 @@ class Spot(_Signature):
 
         return _Resp(self.query(POST, request_path + '/' + str(order_id), body=body))
 
+    def _batch(self, request_path, orders, lookup=False):
+        r"""Sends orders BATCH_SIZE to a request. A chunk whose request fails does not discard
+        the results of the others: with lookup, each of its orders is looked up by clOrdId,
+        otherwise its orders are reported with an sCode of UNKNOWN_CODE."""
+        chunks = [orders[i:i + BATCH_SIZE] for i in range(0, len(orders), BATCH_SIZE)]
+        responses = []
+        for chunk in chunks:
+            try:
+                # okcoin limits batch endpoints by order rather than by request.
+                responses.append(self.query(POST, request_path, body=chunk, tokens=len(chunk)))
+            except TRANSIENT_ERRORS as e:
+                responses.append(self._resolve_chunk(chunk, e) if lookup else
+                                 self._failed_chunk(chunk, e))
+        return _BatchResp(responses, chunks, request_path)
+
+    @staticmethod
+    def _failed_row(order, error):
+        return {'instId': order.get('instId', ''), 'ordId': order.get('ordId', ''),
+                'clOrdId': order.get('clOrdId', ''), 'sCode': UNKNOWN_CODE, 'sMsg': str(error)}
+
+    def _failed_chunk(self, chunk, error):
+        return {'code': '1', 'msg': str(error), 'data': [self._failed_row(order, error) for order in chunk]}
+
+    def _resolve_chunk(self, chunk, error):
+        r"""Looks up the orders of a chunk whose request failed by their clOrdId. Orders that
+        okcoin has no record of are reported as failed, so that they can be placed again."""
+        retry = self.session.retry
+        if retry:
+            time.sleep(retry.delay(0))
+        lookups = []
+        for order in chunk:
+            try:
+                lookups.append(self.query(GET, self._order_path(order)))
+            except TRANSIENT_ERRORS:
+                lookups.append(None)
+        return self._resolved_chunk(chunk, lookups, error)
+
+    @staticmethod
+    def _order_path(order):
+        return '/api/v5/trade/order?instId=' + order['instId'] + '&clOrdId=' + order['clOrdId']
+
+    @classmethod
+    def _resolved_chunk(cls, chunk, lookups, error):
+        r"""Builds the result of a chunk from the lookup of each of its orders, None where the
+        lookup failed."""
+        rows = []
+        for order, lookup in zip(chunk, lookups):
+            if lookup is not None and found(lookup):
+                record = lookup.json()['data'][0]
+                rows.append({'instId': order['instId'], 'ordId': record.get('ordId', ''),
+                             'clOrdId': order['clOrdId'], 'sCode': '0', 'sMsg': ''})
+            else:
+                rows.append(cls._failed_row(order, error))
+        placed = sum(row['sCode'] == '0' for row in rows)
+        # Like okcoin, 1 means every order failed and 2 that some did.
+        code = '0' if placed == len(rows) else '1' if placed == 0 else '2'
+        return {'code': code, 'msg': '' if code == '0' else str(error), 'data': rows}
+
+    @assigns_client_ids('orders')
+    def place_orders(self, orders):
+        r""" Places several orders at once through the batch order endpoint. Orders
+        are sent 20 to a request, the most okcoin accepts.
+
+        Parameters
+        ----------
+        orders : list
+            A list of dictionaries using the V5 order fields, for example,
+            {'instId': 'BTC-USD', 'side': 'buy', 'ordType': 'limit', 'sz': '0.01', 'px': '30000'}.
+            tdMode defaults to 'cash' and a clOrdId is generated for orders that do not have one.
+
+        Returns
+        -------
+        orders : _BatchResp
+            A query response object with one result per order, in the order they were submitted.
+            If a request fails before okcoin answers, its orders are looked up by clOrdId and
+            those that were not placed have an sCode of UNKNOWN_CODE.
+
+        Examples
+        --------
+        >>> grid = [{'instId': 'BTC-USD', 'side': 'buy', 'ordType': 'limit', 'sz': '0.001', 'px': str(px)}
+        ...         for px in range(30000, 31000, 25)]
+        >>> placed = spot.place_orders(grid)
+        >>> placed.df[['clOrdId', 'ordId', 'sCode', 'sMsg']]
+        """
+        request_path = '/api/v5/trade/batch-orders'
+        orders = [dict({'tdMode': 'cash'}, **order) for order in orders]
+        for order in orders:
+            if not order.get('clOrdId'):
+                order['clOrdId'] = new_client_id()
+        return self._batch(request_path, orders, lookup=True)
+
+    def cancel_orders(self, orders):
+        r""" Cancels several orders at once through the batch cancel endpoint. Orders
+        are sent 20 to a request, the most okcoin accepts.
+
+        Parameters
+        ----------
+        orders : list
+            A list of dictionaries with the instId and either the ordId or the clOrdId
+            of each order, for example, {'instId': 'BTC-USD', 'ordId': '5468800'}.
+
+        Returns
+        -------
+        orders : _BatchResp
+            A query response object with one result per order, in the order they were submitted.
+
+        Examples
+        --------
+        >>> cancelled = spot.cancel_orders([{'instId': 'BTC-USD', 'ordId': oid} for oid in placed.df.ordId])
+        >>> cancelled.df
+        """
+        request_path = '/api/v5/trade/cancel-batch-orders'
+        return self._batch(request_path, list(orders))
+
+    def amend_orders(self, orders):
+        r""" Amends the size or price of several open orders in place through the batch
+        amend endpoint, without cancelling and replacing them. Orders are sent 20 to a
+        request, the most okcoin accepts.
+
+        Parameters
+        ----------
+        orders : list
+            A list of dictionaries with the instId, either the ordId or the clOrdId, and
+            the newSz and/or newPx of each order, for example,
+            {'instId': 'BTC-USD', 'ordId': '5468800', 'newPx': '30100'}.
+
+        Returns
+        -------
+        orders : _BatchResp
+            A query response object with one result per order, in the order they were submitted.
+
+        Examples
+        --------
+        >>> amended = spot.amend_orders([{'instId': 'BTC-USD', 'ordId': '5468800', 'newPx': '30100'}])
+        >>> amended.df
+        """
+        request_path = '/api/v5/trade/amend-batch-orders'
+        return self._batch(request_path, list(orders))
+
     def get_order_list(self, trading_pair='STX-USD', state=0):
         r""" Returns This the list of your orders from
         the most recent 3 months. This request supports paging
@@ -1034,6 +1445,88 @@ class Spot(_Signature):
         body = {'instrument_id': trading_pair.lower()}
         return _Resp(self.query(GET, request_path, body=body))
 
+    @paginated
+    def iter_order_history(self, trading_pair='', state='', archive=False, limit=100,
+                           after=None, before=None, max_pages=None):
+        r""" Streams your completed orders one page at a time, from the most recent back.
+        Orders of the last 7 days are returned, or of the last 3 months from the archive.
+
+        Parameters
+        ----------
+        trading_pair : str
+            The trading pair that was ordered. All pairs by default.
+
+        state : str
+            'filled' or 'canceled'. Both by default.
+
+        archive : bool
+            Page through the 3 month archive instead of the last 7 days.
+
+        limit : int
+            The number of orders per page, at most 100.
+
+        after : str
+            Start with the orders older than this order ID.
+
+        before : str
+            Page forward through the orders newer than this order ID instead.
+
+        max_pages : int
+            Stop after this many pages.
+
+        Returns
+        -------
+        pages : Paginator
+            An iterable of query response objects, one per page.
+
+        Examples
+        --------
+        >>> orders = spot.iter_order_history('STX-USD', 'filled', archive=True).collect()
+        """
+        request_path = '/api/v5/trade/orders-history-archive' if archive else '/api/v5/trade/orders-history'
+        params = {'instType': 'SPOT', 'instId': trading_pair, 'state': state}
+        return Paginator(self, request_path, params, 'ordId', limit, after, before, max_pages)
+
+    @paginated
+    def iter_filled_orders(self, trading_pair='', archive=False, limit=100,
+                           after=None, before=None, max_pages=None):
+        r""" Streams your transaction details one page at a time, from the most recent back.
+        Fills of the last 3 days are returned, or of the last 3 months from the archive.
+
+        Parameters
+        ----------
+        trading_pair : str
+            The trading pair that was ordered. All pairs by default.
+
+        archive : bool
+            Page through the 3 month archive instead of the last 3 days.
+
+        limit : int
+            The number of fills per page, at most 100.
+
+        after : str
+            Start with the fills older than this bill ID.
+
+        before : str
+            Page forward through the fills newer than this bill ID instead.
+
+        max_pages : int
+            Stop after this many pages.
+
+        Returns
+        -------
+        pages : Paginator
+            An iterable of query response objects, one per page.
+
+        Examples
+        --------
+        >>> for page in spot.iter_filled_orders('BTC-USD'):
+        ...     print(page.columns['fillSz'].sum())
+        """
+        request_path = '/api/v5/trade/fills-history' if archive else '/api/v5/trade/fills'
+        params = {'instType': 'SPOT', 'instId': trading_pair}
+        return Paginator(self, request_path, params, 'billId', limit, after, before, max_pages)
+
 class Earn(_Signature):
     """
     The Earn class is used to learn about yeild bearing offers on Okcoin and place orders.
@@ -1,11 +1,22 @@
+import datetime
+import numpy as np
 import pandas as pd
 import requests
+from concurrent.futures import ThreadPoolExecutor
 
 #from DataObjects import _Resp
 #import DataObjects._Resp as _Resp
 from okcoin.DataObjects import  _Candlestick
+from okcoin.Schemas import V3_CANDLE, decode
 
 OKCOIN_URL = "https://www.okcoin.com"
+HISTORY_CANDLES_PATH = '/api/v5/market/history-candles'
+CANDLES_PER_REQUEST = 100
+
+# Granularity in seconds to the V5 bar name used by the candle endpoints and channels.
+# Bars of 6 hours and longer use the UTC aligned variants, like the v3 candles.
+BARS = {60: '1m', 180: '3m', 300: '5m', 900: '15m', 1800: '30m', 3600: '1H', 7200: '2H',
+        14400: '4H', 21600: '6Hutc', 43200: '12Hutc', 86400: '1Dutc', 604800: '1Wutc'}
 
 
 def get_trading_pairs():
@@ -205,7 +216,8 @@ def get_candlestick_chart(trading_pair='STX-USD', start=None, end=None, granular
     This API can retrieve the latest 1440 entries of data.
     Candlesticks are returned in groups based on
     requested granularity.
-    Maximum of 1440 entries can be retrieved.
+    Maximum of 1440 entries can be retrieved. Use backfill_candles
+    for longer ranges.
 
     Parameters
     ----------
@@ -237,8 +249,8 @@ def get_candlestick_chart(trading_pair='STX-USD', start=None, end=None, granular
 
     res = _Candlestick(requests.get(request_path,params=body),trading_pair)
 
-    if res.r.status_code ==200:
-        res.df = pd.DataFrame(res.json, columns=['time', 'open', 'high', 'low', 'close', 'volume'])
+    if res.status_code == 200:
+        res.df = pd.DataFrame(decode(res.json, V3_CANDLE, res.request_path))
 
     return res
 
@@ -260,3 +272,117 @@ def get_granularity():
     """
     values = [60,180,300,900,1800,3600,7200,14400,21600,43200,86400,604800]
     return values
+
+
+def _fetch_candles(session, trading_pair, bar, begin, end):
+    r"""Requests the candles with begin <= ts < end."""
+    params = {'instId': trading_pair, 'bar': bar, 'after': str(end), 'before': str(begin - 1),
+              'limit': str(CANDLES_PER_REQUEST)}
+    response = session.send('GET', HISTORY_CANDLES_PATH,
+                            lambda: (session.base_url + HISTORY_CANDLES_PATH, {'params': params}))
+    page = _Candlestick(response, trading_pair)
+    page.raise_for_code()
+    return page
+
+
+def _find_gaps(times, start, end, granularity):
+    r"""Returns the runs of bars missing from sorted candle times between start and end in ms."""
+    step = np.timedelta64(granularity, 's')
+    # Bounded by the bar before start and by the first bar at or after end.
+    last = start - (start - end) // (granularity * 1000) * granularity * 1000
+    bounds = np.concatenate(([np.datetime64(start, 'ms') - step], times, [np.datetime64(last, 'ms')]))
+    missing = (np.diff(bounds) - step) // step
+    at = np.flatnonzero(missing > 0)
+    return pd.DataFrame({'start': bounds[at] + step,
+                         'end': bounds[at + 1] - step,
+                         'missing': missing[at].astype(np.int64)})
+
+
+def backfill_candles(trading_pair='STX-USD', start=None, end=None, granularity=60,
+                     session=None, max_workers=8, progress=None):
+    r""" Returns every candle of a trading pair between two dates. The range is split into
+    windows of 100 candles that are requested concurrently from the V5 history-candles
+    endpoint, within its rate limit, so any length of history can be retrieved. The
+    candles are merged, de-duplicated and sorted by time, and any missing candles are
+    reported in the `gaps` attribute.
+
+    Parameters
+    ----------
+    trading_pair : str
+        The trading pair you are interested in
+
+    start : str or datetime
+        Start of the range, for example, '2021-01-01'. Naive dates are in UTC. Required.
+
+    end : str or datetime
+        End of the range (exclusive). Set to now by default.
+
+    granularity : int
+        The candle interval in seconds, one of get_granularity().
+
+    session : Session
+        The session whose connection pool, rate limiter and retry policy are used. A new one
+        is created by default.
+
+    max_workers : int
+        The number of windows requested at once.
+
+    progress : callable
+        Called as progress(done, total) each time a window completes.
+
+    Returns
+    -------
+    candlestick_chart : _Candlestick
+        A candlestick chart whose df has one row per candle, sorted by time, and whose gaps
+        attribute is a dataframe of the 'start', 'end' and number of 'missing' candles of each
+        run of missing candles.
+
+    Examples
+    --------
+    >>> from okcoin import ticker
+    >>> candles = ticker.backfill_candles('BTC-USD', '2021-01-01', '2021-04-01', granularity=60)
+    >>> candles.df
+    >>> candles.gaps
+    >>> candles.as_chart().write_html("test.html", auto_open = True)
+    """
+    from okcoin.Session import Session
+    from okcoin.History import _to_ms, time_windows
+
+    if start is None:
+        raise ValueError("start is required")
+    if end is None:
+        end = datetime.datetime.now(datetime.timezone.utc)
+    bar = BARS[granularity]
+    windows = time_windows(start, end, datetime.timedelta(seconds=granularity * CANDLES_PER_REQUEST))
+    if not windows:
+        raise ValueError("start must be before end")
+
+    own_session = session is None
+    if own_session:
+        session = Session(pool_size=max_workers, warm_up=0)
+    pages = []
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_fetch_candles, session, trading_pair, bar, b, e) for b, e in windows]
+            for done, future in enumerate(futures, 1):
+                pages.append(future.result())
+                if progress is not None:
+                    progress(done, len(futures))
+    finally:
+        if own_session:
+            session.close()
+
+    columns = {name: np.concatenate([page.columns[name] for page in pages])
+               for name in ('ts', 'o', 'h', 'l', 'c', 'vol')}
+    times, first = np.unique(columns['ts'], return_index=True)
+    res = pages[-1]
+    res.df = pd.DataFrame({'time': times,
+                           'open': columns['o'][first],
+                           'high': columns['h'][first],
+                           'low': columns['l'][first],
+                           'close': columns['c'][first],
+                           'volume': columns['vol'][first]})
+    rows = {row[0]: row for page in pages for row in page.json['data']}
+    res.json = {'code': '0', 'msg': '', 'data': [rows[k] for k in sorted(rows, key=int, reverse=True)]}
+    res.gaps = _find_gaps(times, _to_ms(start), _to_ms(end), granularity)
+    return res
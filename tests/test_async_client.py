@@ -0,0 +1,244 @@
+import json
+import time
+import asyncio
+from urllib.parse import parse_qs, urlsplit
+
+import aiohttp
+import pytest
+import requests
+
+from okcoin import UNKNOWN_CODE
+from okcoin.AsyncClient import AsyncAccount, AsyncEarn, AsyncFiat, AsyncSpot, _AsyncResponse
+from okcoin.Retry import RetryPolicy
+
+
+def _response(payload, status_code=200):
+    return _AsyncResponse(status_code, json.dumps(payload).encode(), {}, 'https://www.okcoin.com')
+
+
+def _config(tmp_path):
+    config = tmp_path / 'auth.config'
+    config.write_text('[DEFAULT]\napi_key = key\nsecret_key = secret\npass_phrase = phrase\n')
+    return str(config)
+
+
+def _client(cls, tmp_path, request, retries=3):
+    client = cls(_config(tmp_path), retry=RetryPolicy(retries=retries, backoff=0))
+    client._request = request
+    return client
+
+
+class _Http:
+    r"""Stands in for an aiohttp.ClientSession. respond(type, url, data) returns the status
+    and payload of a request or raises a transport error."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get(self, url):
+        raise aiohttp.ClientConnectionError('no server time')
+
+    def request(self, type, url, data=None, headers=None):
+        return _Exchange(self, type, url, data)
+
+
+class _Exchange:
+    def __init__(self, http, type, url, data):
+        self.http, self.type, self.url, self.data = http, type, url, data
+
+    async def __aenter__(self):
+        http = self.http
+        http.sent.append((self.type, urlsplit(self.url).path))
+        http.in_flight += 1
+        http.max_in_flight = max(http.max_in_flight, http.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            status, payload = http.respond(self.type, self.url, self.data)
+        finally:
+            http.in_flight -= 1
+        return _HttpResponse(status, payload, self.url)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _HttpResponse:
+    def __init__(self, status, payload, url):
+        self.status = status
+        self.content = json.dumps(payload).encode()
+        self.headers = {}
+        self.url = url
+
+    async def read(self):
+        return self.content
+
+
+def _http_client(cls, tmp_path, respond, retries=3, max_concurrency=100):
+    http = _Http(respond)
+    client = cls(_config(tmp_path), max_concurrency=max_concurrency, session=http, rate_limiter=False,
+                 retry=RetryPolicy(retries=retries, backoff=0) if retries else False)
+    return client, http
+
+
+@pytest.fixture(autouse=True)
+def no_blocking_sleep(monkeypatch):
+    def sleep(seconds):
+        raise AssertionError('time.sleep called on the event loop')
+    monkeypatch.setattr(time, 'sleep', sleep)
+
+
+def _client_id(type, request_path, body):
+    if type == 'POST':
+        return body['clOrdId']
+    return parse_qs(urlsplit(request_path).query)['clOrdId'][0]
+
+
+def test_place_order_resubmits_with_the_same_client_id(tmp_path):
+    sent = []
+
+    async def request(type, request_path, body='', tokens=1):
+        sent.append((type, _client_id(type, request_path, body)))
+        if type == 'GET':
+            return _response({'code': '0', 'msg': '', 'data': []})
+        if len(sent) < 5:
+            return _response({'code': '50001', 'msg': 'Service temporarily unavailable'}, 503)
+        return _response({'code': '0', 'msg': '', 'data': [{'ordId': '1', 'sCode': '0', 'sMsg': ''}]})
+
+    spot = _client(AsyncSpot, tmp_path, request)
+    order = asyncio.run(spot.place_order('buy', 'BTC-USD', 'limit', 1, 30000))
+    assert order.json['data'][0]['ordId'] == '1'
+    assert [type for type, _ in sent] == ['POST', 'GET', 'POST', 'GET', 'POST']
+    assert len({client_id for _, client_id in sent}) == 1
+
+
+def test_place_order_returns_the_order_that_landed(tmp_path):
+    sent = []
+
+    async def request(type, request_path, body='', tokens=1):
+        sent.append((type, _client_id(type, request_path, body)))
+        if type == 'POST':
+            raise aiohttp.ServerDisconnectedError()
+        return _response({'code': '0', 'msg': '', 'data': [{'ordId': '7', 'clOrdId': sent[0][1]}]})
+
+    spot = _client(AsyncSpot, tmp_path, request)
+    order = asyncio.run(spot.place_order('buy', 'BTC-USD', 'limit', 1, 30000, client_id='mine'))
+    assert order.json['data'][0]['ordId'] == '7'
+    assert sent == [('POST', 'mine'), ('GET', 'mine')]
+
+
+def test_place_orders_looks_up_a_failed_chunk_by_the_ids_sent(tmp_path):
+    posted = []
+    looked_up = []
+
+    async def request(type, request_path, body='', tokens=1):
+        if type == 'POST':
+            assert tokens == len(body)
+            posted.extend(order['clOrdId'] for order in body)
+            if len(posted) > 20:
+                raise aiohttp.ServerDisconnectedError()
+            return _response({'code': '0', 'msg': '', 'data': [
+                {'ordId': 'o' + o['clOrdId'], 'clOrdId': o['clOrdId'], 'sCode': '0', 'sMsg': ''} for o in body]})
+        client_id = _client_id(type, request_path, body)
+        looked_up.append(client_id)
+        return _response({'code': '0', 'msg': '', 'data': [{'ordId': 'o' + client_id}]})
+
+    spot = _client(AsyncSpot, tmp_path, request)
+    orders = [{'instId': 'BTC-USD', 'side': 'buy', 'ordType': 'limit', 'sz': '1', 'px': str(100 + i)}
+              for i in range(25)]
+    placed = asyncio.run(spot.place_orders(orders))
+    assert len(posted) == len(set(posted)) == 25
+    assert looked_up == posted[20:]
+    assert placed.df['clOrdId'].tolist() == posted
+    assert (placed.df['sCode'] == '0').all()
+    assert all('clOrdId' not in order for order in orders)
+
+
+def test_withdraw_generates_the_client_id_once(tmp_path):
+    sent = []
+
+    async def request(type, request_path, body='', tokens=1):
+        sent.append(body['clientId'] if type == 'POST' else parse_qs(urlsplit(request_path).query)['clientId'][0])
+        if type == 'GET':
+            return _response({'code': '0', 'msg': '', 'data': []})
+        if len(sent) < 3:
+            return _response({'code': '50013', 'msg': 'System busy'}, 503)
+        return _response({'code': '0', 'msg': '', 'data': [{'wdId': '1'}]})
+
+    account = _client(AsyncAccount, tmp_path, request)
+    asyncio.run(account.withdraw('BTC', '0.1', 'address', '0.0005'))
+    assert len(sent) == 3 and len(set(sent)) == 1
+
+
+def _ok(data):
+    return 200, {'code': '0', 'msg': '', 'data': data}
+
+
+def test_method_with_several_requests_is_replayed(tmp_path):
+    def respond(type, url, data):
+        return _ok([{'clOrdId': o['clOrdId'], 'ordId': 'o' + o['clOrdId'], 'sCode': '0', 'sMsg': ''}
+                    for o in json.loads(data)])
+
+    spot, http = _http_client(AsyncSpot, tmp_path, respond)
+    orders = [{'instId': 'BTC-USD', 'side': 'buy', 'ordType': 'limit', 'sz': '1', 'px': str(100 + i),
+               'clOrdId': 'c%d' % i} for i in range(45)]
+    placed = asyncio.run(spot.place_orders(orders))
+    assert http.sent == [('POST', '/api/v5/trade/batch-orders')] * 3
+    assert placed.df['ordId'].tolist() == ['oc%d' % i for i in range(45)]
+
+
+def test_each_client_replays_its_methods(tmp_path):
+    def respond(type, url, data):
+        return _ok([{'path': urlsplit(url).path}])
+
+    async def main():
+        account, _ = _http_client(AsyncAccount, tmp_path, respond)
+        earn, _ = _http_client(AsyncEarn, tmp_path, respond)
+        fiat, _ = _http_client(AsyncFiat, tmp_path, respond)
+        return await asyncio.gather(account.get_currencies(), earn.get_offers('STX', 'stacks'),
+                                    fiat.get_deposit_history())
+
+    currencies, offers, deposits = asyncio.run(main())
+    assert currencies.json['data'][0]['path'] == '/api/v5/asset/currencies'
+    assert offers.json['data'][0]['path'] == '/api/earning/v5/offers'
+    assert deposits.json['data'][0]['path'] == '/api/v5/asset/deposit-history'
+
+
+def test_concurrent_requests_are_bounded(tmp_path):
+    fiat, http = _http_client(AsyncFiat, tmp_path, lambda type, url, data: _ok([]), max_concurrency=3)
+
+    async def main():
+        await asyncio.gather(*[fiat.get_deposit_history() for _ in range(20)])
+
+    asyncio.run(main())
+    assert len(http.sent) == 20
+    assert http.max_in_flight == 3
+
+
+def test_transport_failure_is_raised_as_a_connection_error(tmp_path):
+    def respond(type, url, data):
+        raise aiohttp.ClientConnectionError('reset')
+
+    fiat, http = _http_client(AsyncFiat, tmp_path, respond, retries=2)
+    with pytest.raises(requests.ConnectionError):
+        asyncio.run(fiat.get_deposit_history())
+    assert len(http.sent) == 3  # GETs are retried
+    # The synchronous error handling runs unchanged: a failed batch is reported per order.
+    spot, http = _http_client(AsyncSpot, tmp_path, respond, retries=0)
+    cancelled = asyncio.run(spot.cancel_orders([{'instId': 'BTC-USD', 'ordId': '1'}]))
+    assert cancelled.df['sCode'].tolist() == [UNKNOWN_CODE]
+    assert http.sent == [('POST', '/api/v5/trade/cancel-batch-orders')]
+
+
+def test_write_is_looked_up_before_it_is_resubmitted(tmp_path):
+    def respond(type, url, data):
+        if type == 'POST':
+            return 503, {'code': '50001', 'msg': 'Service temporarily unavailable', 'data': []}
+        return _ok([{'clientId': parse_qs(urlsplit(url).query)['clientId'][0], 'state': 'success'}])
+
+    account, http = _http_client(AsyncAccount, tmp_path, respond)
+    transfer = asyncio.run(account.get_funds_transfer('BTC', '1', '6', '18'))
+    assert http.sent == [('POST', '/api/v5/asset/transfer'), ('GET', '/api/v5/asset/transfer-state')]
+    assert transfer.json['data'][0]['state'] == 'success'
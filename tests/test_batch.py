@@ -0,0 +1,84 @@
+import json
+import types
+
+import pytest
+import requests
+
+import okcoin
+from okcoin import Spot, UNKNOWN_CODE
+from okcoin.Errors import OkcoinAPIError
+
+
+class _Response:
+    def __init__(self, payload, status_code=200):
+        self.content = json.dumps(payload).encode()
+        self.status_code = status_code
+        self.text = self.content.decode()
+        self.url = 'https://www.okcoin.com/api/v5/trade/batch-orders'
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def _spot(query):
+    spot = object.__new__(Spot)
+    spot.session = types.SimpleNamespace(retry=False)
+    spot.query = query
+    return spot
+
+
+def _accepted(chunk):
+    return _Response({'code': '0', 'msg': '', 'data': [
+        {'instId': o['instId'], 'ordId': 'o' + o['clOrdId'], 'clOrdId': o['clOrdId'], 'sCode': '0', 'sMsg': ''}
+        for o in chunk]})
+
+
+def _orders(n):
+    return [{'instId': 'BTC-USD', 'side': 'buy', 'ordType': 'limit', 'sz': '1', 'px': str(100 + i),
+             'clOrdId': 'c%d' % i} for i in range(n)]
+
+
+def test_failed_chunk_keeps_the_other_results_and_is_resolved_by_client_id():
+    landed = {'c20', 'c21'}  # the second chunk failed in transit after these were placed
+    posts = []
+
+    def query(method, path, body='', tokens=1):
+        if method == 'POST':
+            assert tokens == len(body)
+            posts.append(body)
+            if len(posts) == 2:
+                raise requests.ConnectionError('reset')
+            return _accepted(body)
+        client_id = path.rsplit('clOrdId=', 1)[1]
+        data = [{'ordId': 'o' + client_id, 'clOrdId': client_id}] if client_id in landed else []
+        return _Response({'code': '0', 'msg': '', 'data': data})
+
+    placed = _spot(query).place_orders(_orders(45))
+    df = placed.df
+    assert len(posts) == 3
+    assert len(df) == 45
+    assert list(df['clOrdId']) == ['c%d' % i for i in range(45)]
+    assert (df['sCode'] == '0').sum() == 20 + 2 + 5
+    assert set(df.loc[df['sCode'] == UNKNOWN_CODE, 'clOrdId']) == {'c%d' % i for i in range(22, 40)}
+    assert placed.json['code'] == '2'
+    assert isinstance(placed.error, OkcoinAPIError)
+    with pytest.raises(OkcoinAPIError):
+        placed.raise_for_code()
+
+
+def test_failed_cancel_chunk_is_reported_per_order():
+    def query(method, path, body='', tokens=1):
+        raise requests.Timeout('timed out')
+
+    cancelled = _spot(query).cancel_orders([{'instId': 'BTC-USD', 'ordId': '1'}])
+    assert cancelled.df['sCode'].tolist() == [UNKNOWN_CODE]
+    assert cancelled.status_code is None
+
+
+def test_batch_response_attributes():
+    placed = _spot(lambda method, path, body='', tokens=1: _accepted(body)).place_orders(_orders(3))
+    assert placed.request_path == '/api/v5/trade/batch-orders'
+    assert placed.error is None
+    placed.raise_for_code()
+    with pytest.raises(KeyError):
+        placed.columns
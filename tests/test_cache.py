@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import okcoin.DataMangement as dm
+from okcoin.Cache import BlobCache, open_cache
+
+pytest.importorskip('pyarrow')
+
+
+def _frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'ledger_id': np.arange(n), 'amount': rng.random(n),
+                         'currency': rng.choice(['BTC', 'STX'], n)})
+
+
+def _age(cache, name, etag, seconds):
+    r"""Sets the last use of an entry to seconds ago, so that the eviction order is deterministic."""
+    path = cache.path(name, etag)
+    t = os.stat(path).st_mtime - seconds
+    os.utime(path, (t, t))
+
+
+def test_hit_and_miss(tmp_path):
+    cache = BlobCache(tmp_path)
+    assert cache.get('ledger_1.csv', 'a') is None
+    df = _frame(100)
+    cache.put('ledger_1.csv', 'a', df)
+    pd.testing.assert_frame_equal(cache.get('ledger_1.csv', 'a'), df)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_etag_is_a_miss(tmp_path):
+    cache = BlobCache(tmp_path)
+    cache.put('ledger_1.csv', 'a', _frame(10))
+    assert cache.get('ledger_1.csv', 'b') is None
+    cache.put('ledger_1.csv', 'b', _frame(20, seed=1))
+    assert len(cache.get('ledger_1.csv', 'b')) == 20
+    assert len(cache.get('ledger_1.csv', 'a')) == 10
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    probe = BlobCache(tmp_path / 'probe')
+    probe.put('x', 'e', _frame(1000))
+    size = os.path.getsize(probe.path('x', 'e'))
+    cache = BlobCache(tmp_path / 'cache', max_bytes=int(size * 2.5))
+    cache.put('a', 'e', _frame(1000, 1))
+    _age(cache, 'a', 'e', 30)
+    cache.put('b', 'e', _frame(1000, 2))
+    _age(cache, 'b', 'e', 20)
+    assert cache.get('a', 'e') is not None  # a is now the most recently used
+    cache.put('c', 'e', _frame(1000, 3))
+    assert cache.get('b', 'e') is None
+    assert cache.get('a', 'e') is not None
+    assert cache.get('c', 'e') is not None
+    cache.clear()
+    assert cache.get('c', 'e') is None
+
+
+def test_unstorable_frames_are_not_cached(tmp_path):
+    cache = BlobCache(tmp_path)
+    cache.put('mixed.csv', 'a', pd.DataFrame({'value': [1, 'one', 2.5]}))
+    assert cache.get('mixed.csv', 'a') is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_download_uses_the_cache(tmp_path):
+    config = tmp_path / 'azure.config'
+    config.write_text('[DEFAULT]\nlocal_path = %s\ncache_path = %s\ncache_size_mb = 1\n'
+                      % (tmp_path / 'store', tmp_path / 'cache'))
+    cache = open_cache(str(config))
+    assert cache.max_bytes == 1024 * 1024
+    df = _frame(50).assign(timestamp='2021-05-01T00:00:00.000Z')
+    dm.upload_to_azure_storage(df, str(config))
+    first = dm.dataframe_from_azure_storage(str(config), cache=cache)
+    second = dm.dataframe_from_azure_storage(str(config), cache=cache)
+    pd.testing.assert_frame_equal(first, second)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert open_cache(str(tmp_path / 'missing.config')) is None
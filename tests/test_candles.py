@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from okcoin.Candles import CANDLE_DTYPE, BarBuilder, CandleStore, resample, resample_all
+
+T0 = pd.Timestamp('2021-01-01').value // 10**6  # a Friday
+AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def minutes(n, start=T0, seed=0):
+    rng = np.random.default_rng(seed)
+    rec = np.zeros(n, dtype=CANDLE_DTYPE)
+    rec['time'] = (start + np.arange(n) * 60000).astype('M8[ms]')
+    close = 100 + np.cumsum(rng.normal(size=n))
+    open = np.r_[100, close[:-1]]
+    rec['open'], rec['close'] = open, close
+    rec['high'] = np.maximum(open, close) + rng.random(n)
+    rec['low'] = np.minimum(open, close) - rng.random(n)
+    rec['volume'] = rng.random(n)
+    return rec
+
+
+@pytest.fixture(scope='module')
+def month():
+    # Drop a few hours so that the reference has to skip empty bars too.
+    rec = minutes(31 * 1440)
+    return rec[(rec['time'] < np.datetime64('2021-01-05T03:00')) | (rec['time'] >= np.datetime64('2021-01-05T07:00'))]
+
+
+@pytest.mark.parametrize('granularity, rule', [(3600, '1h'), (21600, '6h'), (86400, '1D'), (604800, 'W-MON')])
+def test_resample_matches_pandas(month, granularity, rule):
+    df = pd.DataFrame(month).set_index('time')
+    reference = df.resample(rule, label='left', closed='left').agg(AGG).dropna()
+    bars = pd.DataFrame(resample(month, granularity)).set_index('time')
+    assert (bars.index == reference.index).all()
+    np.testing.assert_allclose(bars.values, reference.values)
+
+
+def test_resample_all(month):
+    bars = resample_all(month)
+    for granularity in (300, 3600, 86400):
+        # Coarser bars are built from finer ones, so sums may differ in the last bit.
+        reference = resample(month, granularity)
+        np.testing.assert_array_equal(bars[granularity]['time'], reference['time'])
+        for field in AGG:
+            np.testing.assert_allclose(bars[granularity][field], reference[field])
+
+
+def test_weeks_start_on_monday(month):
+    weeks = resample(month, 604800)['time']
+    assert pd.Timestamp(weeks[0]) == pd.Timestamp('2020-12-28')
+    assert all(pd.Timestamp(week).day_name() == 'Monday' for week in weeks)
+
+
+def test_drop_partial():
+    rec = minutes(120)
+    assert len(resample(rec[:90], 3600, drop_partial=True)) == 1
+    assert len(resample(rec[:90], 3600)) == 2
+    assert len(resample(rec, 3600, drop_partial=True)) == 2
+
+
+def test_resample_rejects_coarser_source():
+    with pytest.raises(ValueError):
+        resample(minutes(10), 3600, 7200)
+
+
+def test_bar_builder_matches_batch():
+    rec = minutes(1000)
+    closed = []
+    builder = BarBuilder(3600, on_bar=closed.append)
+    for r in rec:
+        builder.add_candle(int(r['time'].astype(np.int64)), r['open'], r['high'], r['low'], r['close'], r['volume'])
+    streamed = np.array(closed + [builder.current], dtype=CANDLE_DTYPE)
+    batch = resample(rec, 3600)
+    np.testing.assert_array_equal(streamed['time'], batch['time'])
+    for field in AGG:
+        np.testing.assert_allclose(streamed[field], batch[field])
+
+
+def test_bar_builder_skips_resent_trades():
+    builder = BarBuilder(60)
+    arg = {'channel': 'trades', 'instId': 'BTC-USD'}
+    builder.on_message({'arg': arg, 'data': [{'ts': str(T0 + 1000), 'px': '10', 'sz': '1'}]})
+    builder.on_message({'arg': arg, 'data': [{'ts': str(T0 + 2000), 'px': '12', 'sz': '2'}]})
+    # Caught up after a reconnect, newest first; the trade at T0 + 2000 was already added.
+    builder.on_message({'arg': arg, 'resync': True, 'data': [{'ts': str(T0 + 3000), 'px': '9', 'sz': '1'},
+                                                             {'ts': str(T0 + 2000), 'px': '12', 'sz': '2'}]})
+    assert builder.current.item()[1:] == (10.0, 12.0, 9.0, 9.0, 4.0)
+    assert builder.add_trade(T0 - 60000, 1.0, 1.0) is None
+    closed = builder.add_trade(T0 + 61000, 11.0, 1.0)
+    assert closed['volume'] == 4.0
+    assert builder.current['time'] == np.datetime64(T0 + 60000, 'ms')
+
+
+def test_bar_builder_adds_only_closed_candles():
+    builder = BarBuilder(300)
+    arg = {'channel': 'candle1m', 'instId': 'BTC-USD'}
+    builder.on_message({'arg': arg, 'data': [[str(T0), '1', '2', '0.5', '1.5', '10', '0', '0', '0']]})
+    assert builder.current is None
+    builder.on_message({'arg': arg, 'data': [[str(T0), '1', '2', '0.5', '1.5', '10', '0', '0', '1']]})
+    assert builder.current['volume'] == 10.0
+
+
+def test_store_resampled(tmp_path):
+    store = CandleStore(str(tmp_path))
+    rec = minutes(100)
+    store.append('BTC-USD', 60, rec)
+    np.testing.assert_array_equal(store.resampled('BTC-USD', 900, start='2021-01-01 00:20'),
+                                  resample(rec[15:], 900))
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from okcoin.Candles import CANDLE_DTYPE, CandleStore
+
+T0 = pd.Timestamp('2021-01-01').value // 10**6
+
+
+def minutes(n, start=T0, seed=0):
+    rng = np.random.default_rng(seed)
+    rec = np.zeros(n, dtype=CANDLE_DTYPE)
+    rec['time'] = (start + np.arange(n) * 60000).astype('M8[ms]')
+    close = 100 + np.cumsum(rng.normal(size=n))
+    open = np.r_[100, close[:-1]]
+    rec['open'], rec['close'] = open, close
+    rec['high'] = np.maximum(open, close) + rng.random(n)
+    rec['low'] = np.minimum(open, close) - rng.random(n)
+    rec['volume'] = rng.random(n)
+    return rec
+
+
+def test_store_append_load_and_range(tmp_path):
+    store = CandleStore(str(tmp_path))
+    rec = minutes(100)
+    assert store.append('BTC-USD', 60, rec[:60]) == 60
+    # Overlapping and duplicated bars are appended once.
+    assert store.append('BTC-USD', 60, np.concatenate([rec[50:], rec[90:]])) == 40
+    loaded = store.load('BTC-USD', 60)
+    np.testing.assert_array_equal(loaded, rec)
+    assert store.contents() == [('BTC-USD', 60)]
+    assert store.last_time('BTC-USD', 60) == rec['time'][-1]
+    view = store.range('BTC-USD', 60, '2021-01-01 00:10', '2021-01-01 00:20')
+    np.testing.assert_array_equal(view, rec[10:20])
+    assert len(store.frame('BTC-USD', 60, start='2021-01-01 01:00')) == 40
+
+
+def test_store_ignores_a_torn_record(tmp_path):
+    store = CandleStore(str(tmp_path))
+    rec = minutes(10)
+    store.append('BTC-USD', 60, rec[:5])
+    with open(store.path('BTC-USD', 60), 'ab') as f:
+        f.write(rec[5:6].tobytes()[:20])
+    np.testing.assert_array_equal(store.load('BTC-USD', 60), rec[:5])
+    assert store.append('BTC-USD', 60, rec) == 5
+    np.testing.assert_array_equal(store.load('BTC-USD', 60), rec)
+    assert store.last_time('ETH-USD', 60) is None
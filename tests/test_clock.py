@@ -0,0 +1,158 @@
+import json
+import time
+
+import pytest
+import requests
+
+from okcoin import Clock as clock_module
+from okcoin.Clock import Clock, SERVER_TIME_PATH, _timestamp
+from okcoin.Retry import RetryPolicy
+from okcoin.Session import Session
+
+SERVER_MS = 1620872490061  # 2021-05-13T02:21:30.061Z
+
+
+class _Response:
+    def __init__(self, payload, status_code=200):
+        self.content = json.dumps(payload).encode()
+        self.status_code = status_code
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _TimeSession:
+    base_url = 'https://www.okcoin.com'
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def _server_time(ms=SERVER_MS):
+    return _Response({'code': '0', 'msg': '', 'data': [{'ts': str(ms)}]})
+
+
+def test_timestamp_format():
+    assert _timestamp(1620872490.061) == '2021-05-13T02:21:30.061Z'
+    assert _timestamp(1620872490.9999) == '2021-05-13T02:21:30.999Z'
+    assert _timestamp(0) == '1970-01-01T00:00:00.000Z'
+
+
+def test_timestamp_prefix_is_formatted_once_a_second(monkeypatch):
+    calls = []
+    strftime = time.strftime
+
+    def counting(*args):
+        calls.append(args)
+        return strftime(*args)
+
+    monkeypatch.setattr(clock_module, '_timestamp_prefix', (None, ''))
+    monkeypatch.setattr(clock_module.time, 'strftime', counting)
+    assert [_timestamp(1620872490 + i / 10) for i in range(10)][-1] == '2021-05-13T02:21:30.900Z'
+    assert len(calls) == 1
+    assert _timestamp(1620872491.5) == '2021-05-13T02:21:31.500Z'
+    assert len(calls) == 2
+
+
+def test_update_anchors_to_the_midpoint_of_the_request():
+    clock = Clock(resync_interval=None)
+    assert not clock.synced
+    now = time.monotonic()
+    clock.update(str(SERVER_MS), now - 0.2, now)
+    assert clock.synced
+    # The reading was taken 0.1 s ago.
+    assert clock.time() == pytest.approx(SERVER_MS / 1000 + 0.1, abs=0.05)
+    assert clock.timestamp()[:20] == '2021-05-13T02:21:30.'
+    assert clock.offset == pytest.approx(SERVER_MS / 1000 + 0.1 - time.time(), abs=0.05)
+
+
+def test_sync_queries_the_server_time():
+    session = _TimeSession(_server_time(), requests.ConnectionError('reset'),
+                           _Response({'code': '0', 'data': []}))
+    clock = Clock(session, resync_interval=None)
+    assert clock.sync()
+    assert session.urls == ['https://www.okcoin.com' + SERVER_TIME_PATH]
+    assert clock.time() == pytest.approx(SERVER_MS / 1000, abs=0.05)
+    anchor = clock._anchor
+    # Failures leave the Clock where it was.
+    assert not clock.sync()
+    assert not clock.sync()
+    assert clock._anchor == anchor
+
+
+def test_rejected():
+    clock = Clock(resync_interval=None)
+    assert clock.rejected(_Response({'code': '50102', 'msg': 'Timestamp request expired'}, 401))
+    assert not clock.rejected(_Response({'code': '50102'}, 200))
+    assert not clock.rejected(_Response({'code': '50011'}, 429))
+
+
+def _session(respond):
+    session = Session(warm_up=0, rate_limiter=False, retry=RetryPolicy(retries=0, backoff=0))
+    session.clock.resync_interval = None
+    sent = []
+
+    def request(method, url, **kwargs):
+        sent.append(url)
+        return respond(len(sent), url)
+
+    session.request = request
+    return session, sent
+
+
+EXPIRED = {'code': '50102', 'msg': 'Timestamp request expired', 'data': []}
+
+
+def test_send_resends_once_after_a_rejected_timestamp():
+    def respond(n, url):
+        if url.endswith(SERVER_TIME_PATH):
+            return _server_time()
+        return _Response(EXPIRED, 401) if n == 1 else _Response({'code': '0', 'data': []})
+
+    session, sent = _session(respond)
+    stamps = []
+
+    def prepare():
+        stamps.append(session.clock.timestamp())
+        return 'https://www.okcoin.com/api/v5/trade/order', {}
+
+    response = session.send('POST', '/api/v5/trade/order', prepare, retry=False)
+    assert response.status_code == 200
+    assert sent == ['https://www.okcoin.com/api/v5/trade/order', 'https://www.okcoin.com' + SERVER_TIME_PATH,
+                    'https://www.okcoin.com/api/v5/trade/order']
+    # The request was signed again with the synced clock.
+    assert len(stamps) == 2
+    assert stamps[1].startswith('2021-05-13T02:21:3')
+    assert session.clock.synced
+
+
+def test_send_returns_the_rejection_when_the_clock_cannot_sync():
+    def respond(n, url):
+        if url.endswith(SERVER_TIME_PATH):
+            raise requests.ConnectionError('reset')
+        return _Response(EXPIRED, 401)
+
+    session, sent = _session(respond)
+    response = session.send('GET', '/api/v5/account/balance', lambda: ('https://www.okcoin.com/x', {}))
+    assert response.status_code == 401
+    assert len(sent) == 2
+
+
+def test_send_resyncs_only_once():
+    def respond(n, url):
+        if url.endswith(SERVER_TIME_PATH):
+            return _server_time()
+        return _Response(EXPIRED, 401)
+
+    session, sent = _session(respond)
+    response = session.send('GET', '/api/v5/account/balance', lambda: ('https://www.okcoin.com/x', {}))
+    assert response.status_code == 401
+    assert len(sent) == 3
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from okcoin import FixedPoint
+
+
+def test_parse():
+    units = FixedPoint.parse(['0.00071305', '-1.5', '', '12', '.5', '3.', '0.10000000'], 8)
+    assert units.tolist() == [71305, -150000000, 0, 1200000000, 50000000, 300000000, 10000000]
+    assert units.dtype == np.int64
+
+
+def test_parse_empty():
+    assert FixedPoint.parse([], 8).tolist() == []
+    assert FixedPoint.parse([''], 8).tolist() == [0]
+
+
+@pytest.mark.parametrize('value', ['1e-5', 'abc', '1.2.3', '+1', '1-', ' 1', '-', '.', 'nan', '1,5'])
+def test_parse_rejects_malformed_amounts(value):
+    with pytest.raises(ValueError):
+        FixedPoint.parse(['1', value], 8)
+
+
+def test_parse_rejects_extra_decimals():
+    assert FixedPoint.parse(['1.123456000'], 6).tolist() == [1123456]
+    with pytest.raises(ValueError):
+        FixedPoint.parse(['1.1234567'], 6)
+
+
+def test_parse_rejects_overflow():
+    assert FixedPoint.parse(['9999999999.99999999'], 8).tolist() == [999999999999999999]
+    assert FixedPoint.parse(['000000000001'], 8).tolist() == [100000000]
+    with pytest.raises(ValueError):
+        FixedPoint.parse(['100000000000'], 8)
+    with pytest.raises(ValueError):
+        FixedPoint.parse(['10000000000'], 8)
+
+
+def test_format_round_trips():
+    values = ['0.00071305', '-1.50000000', '400.00000000', '0.00000000']
+    assert FixedPoint.format(FixedPoint.parse(values, 8), 8).tolist() == values
+    assert FixedPoint.format(-5, 2) == '-0.05'
+    assert FixedPoint.format(7, 0) == '7'
+
+
+def test_exact_sums():
+    values = ['0.1'] * 10 + ['0.2'] * 10
+    assert FixedPoint.total(values, 'BTC') == '3.00000000'
+    assert FixedPoint.total(['0.000001', '1'], 'STX') == '1.00000100'
+    assert FixedPoint.total([], 'BTC') == '0.00000000'
+    assert FixedPoint.cumulative(['0.1', '0.2', '-0.3'], decimals=1).tolist() == [1, 3, 0]
+    assert FixedPoint.to_float(FixedPoint.parse(['0.1', '0.2'], 8)).sum() == pytest.approx(0.3)
+
+
+def test_amounts_keep_eight_decimals():
+    # As returned by get_balance('STX').
+    assert FixedPoint.parse(['793.99043577'], FixedPoint.decimals_for('STX')).tolist() == [79399043577]
+    assert FixedPoint.total(['793.99043577', '0.00000001'], 'MIA') == '793.99043578'
+
+
+def test_totals_reject_overflow():
+    big = '9999999999.99999999'
+    assert FixedPoint.total([big, '-' + big, big], 'BTC') == big
+    with pytest.raises(ValueError):
+        FixedPoint.total([big, '0.00000001'], 'BTC')
+    # The int64 sum of these wraps around to a small number.
+    with pytest.raises(ValueError):
+        FixedPoint.cumulative([big] * 20, 'BTC')
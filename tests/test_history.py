@@ -0,0 +1,66 @@
+import json
+import asyncio
+
+import pandas as pd
+
+from okcoin.AsyncClient import AsyncSpot
+from okcoin.History import download_history, time_windows
+
+DAY = 86400000
+START = 1609459200000  # 2021-01-01
+BILLS = [{'billId': str(i), 'balChg': '1', 'ccy': 'BTC', 'ts': str(START + i * DAY // 10)}
+         for i in range(300)]  # ten bills a day for 30 days
+
+
+class _Response:
+    def __init__(self, payload, url):
+        self.content = json.dumps(payload).encode()
+        self.status_code = 200
+        self.url = url
+
+
+def _serve(request_path, params):
+    begin, end = int(params['begin']), int(params['end'])
+    bills = [b for b in reversed(BILLS) if begin <= int(b['ts']) < end]
+    if 'after' in params:
+        bills = [b for b in bills if int(b['billId']) < int(params['after'])]
+    return _Response({'code': '0', 'msg': '', 'data': bills[:int(params['limit'])]},
+                     'https://www.okcoin.com' + request_path)
+
+
+class _Client:
+    def __init__(self):
+        self.requests = 0
+
+    def query(self, method, request_path, body=''):
+        self.requests += 1
+        return _serve(request_path, body)
+
+
+def test_time_windows():
+    assert time_windows('2021-01-01', '2021-01-20') == [
+        (START, START + 7 * DAY), (START + 7 * DAY, START + 14 * DAY), (START + 14 * DAY, START + 19 * DAY)]
+
+
+def test_download_history_merges_windows():
+    df = download_history(_Client(), 'bills', '2021-01-03', '2021-01-25', max_workers=4)
+    assert df['billId'].tolist() == list(range(20, 240))
+    assert df['ts'].is_monotonic_increasing
+
+
+def test_async_client_downloads_on_the_event_loop(tmp_path):
+    config = tmp_path / 'auth.config'
+    config.write_text('[DEFAULT]\napi_key = key\nsecret_key = secret\npass_phrase = phrase\n')
+    spot = AsyncSpot(str(config))
+    requests = []
+
+    async def request(type, request_path, body='', tokens=1):
+        requests.append(request_path)
+        assert len(requests) < 50
+        return _serve(request_path, body)
+
+    spot._request = request
+    df = asyncio.run(spot.download_bills('2021-01-03', '2021-01-25', max_workers=2))
+    assert isinstance(df, pd.DataFrame)
+    assert df['billId'].tolist() == list(range(20, 240))
+    assert len(requests) == 4  # one page for each window
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from okcoin.Ledger import Ledger
+
+CURRENCIES = ['BTC', 'STX', 'USD']
+
+
+@pytest.fixture(scope='module')
+def ledger_df():
+    rng = np.random.default_rng(7)
+    n = 2000
+    # Whole minutes over two months, so that many entries share a time.
+    minutes = rng.integers(0, 60 * 24 * 60, n)
+    times = pd.Timestamp('2021-05-01', tz='UTC') + pd.to_timedelta(minutes, unit='min')
+    return pd.DataFrame({
+        'ledger_id': np.arange(n),
+        'timestamp': times.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'currency': rng.choice(CURRENCIES, n),
+        'typename': rng.choice(['Deposit', 'Staking', 'Trade'], n),
+        'amount': rng.random(n),
+        'balance': rng.random(n) * 100})
+
+
+@pytest.fixture(scope='module')
+def reference(ledger_df):
+    df = ledger_df.copy()
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True).dt.tz_convert(None)
+    return df
+
+
+@pytest.fixture(scope='module')
+def ledger(ledger_df):
+    return Ledger(ledger_df)
+
+
+@pytest.mark.parametrize('currency', CURRENCIES)
+def test_balance_history_matches_groupby(ledger, reference, currency):
+    # The groupby that get_balance_from_ledger used before the Ledger.
+    expected = reference[reference['currency'] == currency].groupby('timestamp').max()['balance']
+    history = ledger.balance_history(currency)
+    assert history['timestamp'].tolist() == expected.index.tolist()
+    np.testing.assert_array_equal(history['balance'].to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize('currency', CURRENCIES)
+def test_daily_balance_history(ledger, reference, currency):
+    rows = reference[reference['currency'] == currency]
+    expected = rows.groupby(rows['timestamp'].dt.floor('D'))['balance'].max()
+    history = ledger.balance_history(currency, freq='D')
+    assert pd.DatetimeIndex(history['timestamp']).equals(pd.DatetimeIndex(expected.index))
+    np.testing.assert_array_equal(history['balance'].to_numpy(), expected.to_numpy())
+
+
+def test_balance_at_matches_a_scan(ledger, reference):
+    rng = np.random.default_rng(1)
+    times = list(reference['timestamp'].sample(20, random_state=2)) + \
+        [pd.Timestamp('2021-05-01') + pd.Timedelta(seconds=int(s)) for s in rng.integers(0, 60 * 86400, 20)]
+    for currency in CURRENCIES:
+        rows = reference[reference['currency'] == currency]
+        for t in times:
+            before = rows[rows['timestamp'] <= t]
+            expected = before.loc[before['timestamp'] == before['timestamp'].max(), 'balance'].max() \
+                if len(before) else np.nan
+            assert ledger.balance_at(t, currency) == pytest.approx(expected, nan_ok=True)
+    assert np.isnan(ledger.balance_at('2021-04-30', 'BTC'))
+    # Aware times are converted to UTC.
+    t = pd.Timestamp('2021-06-01T12:00', tz='US/Eastern')
+    assert ledger.balance_at(t, 'BTC') == ledger.balance_at('2021-06-01T16:00', 'BTC')
+
+
+def test_range_matches_a_mask(ledger, reference):
+    start, end = '2021-05-10', pd.Timestamp('2021-06-02T06:30')
+    mask = (reference['timestamp'] >= pd.Timestamp(start)) & (reference['timestamp'] < end)
+    assert sorted(ledger.range(start, end)['ledger_id']) == sorted(reference.loc[mask, 'ledger_id'])
+    stx = ledger.range(start, end, 'STX')
+    assert sorted(stx['ledger_id']) == sorted(reference.loc[mask & (reference['currency'] == 'STX'), 'ledger_id'])
+    assert stx.index.is_monotonic_increasing
+    assert len(ledger.range(currency='USD')) == (reference['currency'] == 'USD').sum()
+    assert len(ledger.range()) == len(reference)
+
+
+def test_unknown_currency(ledger):
+    assert len(ledger.range('2021-05-01', '2021-07-01', 'ETH')) == 0
+    assert np.isnan(ledger.balance_at('2021-07-01', 'ETH'))
+    assert len(ledger.balance_history('ETH')) == 0
+    assert len(ledger.balance_history('ETH', freq='D')) == 0
+    assert ledger.currencies == CURRENCIES
+
+
+def test_input_is_not_modified(ledger_df):
+    before = ledger_df.copy()
+    Ledger(ledger_df)
+    pd.testing.assert_frame_equal(ledger_df, before)
@@ -0,0 +1,118 @@
+import zlib
+import random
+import asyncio
+
+import pytest
+
+from okcoin.Errors import ChecksumError
+from okcoin.OrderBook import OrderBook, OrderBooks
+
+
+def _levels(*pairs):
+    return [[price, size, '0', '1'] for price, size in pairs]
+
+
+def test_checksum_matches_the_okx_documentation_example():
+    book = OrderBook('BTC-USD')
+    # From the okcoin/OKX V5 documentation: '3366.1:7:3366.8:9:3366:6:3368:8'.
+    book.snapshot(bids=[['3366.1', '7', '0', '3'], ['3366', '6', '3', '4']],
+                  asks=[['3366.8', '9', '10', '3'], ['3368', '8', '3', '4']], checksum=-1881014294)
+    assert book.checksum() == -1881014294
+
+
+def test_checksum_with_sides_of_different_depth():
+    book = OrderBook()
+    book.snapshot(bids=_levels(('100', '1'), ('99.5', '2'), ('99', '3')), asks=_levels(('101', '4')))
+    crc = zlib.crc32(b'100:1:101:4:99.5:2:99:3')
+    assert book.checksum() == (crc - (1 << 32) if crc >= 1 << 31 else crc)
+
+
+def test_bad_checksum_raises():
+    book = OrderBook('BTC-USD')
+    book.snapshot(bids=_levels(('100', '1')), asks=_levels(('101', '1')))
+    with pytest.raises(ChecksumError):
+        book.update(bids=_levels(('100', '2')), checksum=123)
+
+
+def test_update_insert_and_delete():
+    book = OrderBook()
+    book.snapshot(bids=_levels(('100', '3'), ('99', '1')), asks=_levels(('101', '1'), ('102', '2.5')))
+    book.update(bids=_levels(('99.5', '1'), ('99', '0')), asks=_levels(('101', '0'), ('101.5', '2')))
+    assert book.best_bid() == (100.0, 3.0)
+    assert book.best_ask() == (101.5, 2.0)
+    assert book.spread() == pytest.approx(1.5)
+    assert book.mid() == pytest.approx(100.75)
+    bids, asks = book.depth()
+    assert bids.tolist() == [[100.0, 3.0], [99.5, 1.0]]
+    assert asks.tolist() == [[101.5, 2.0], [102.0, 2.5]]
+    assert book.size_within(99.5) == 4.0
+    assert book.cumulative_size(side='asks').tolist() == [2.0, 4.5]
+    book.update(bids=_levels(('98', '0')))  # deleting a missing level does nothing
+    assert len(book.bids) == 2
+
+
+def test_updates_at_capacity():
+    book = OrderBook(max_levels=3)
+    book.snapshot(bids=_levels(('100', '1'), ('99', '1'), ('98', '1'), ('97', '1')), asks=[])
+    assert book.bids.prices.tolist() == [100, 99, 98]
+    book.update(bids=_levels(('99.5', '2')))   # the worst level is dropped
+    assert book.bids.prices.tolist() == [100, 99.5, 99]
+    book.update(bids=_levels(('90', '2')))     # worse than every kept level
+    assert book.bids.prices.tolist() == [100, 99.5, 99]
+    book.update(bids=_levels(('100', '0')))    # delete from a full side
+    assert book.bids.prices.tolist() == [99.5, 99]
+    book.update(bids=_levels(('101', '5'), ('98.5', '1')))
+    assert book.bids.prices.tolist() == [101, 99.5, 99]
+    assert book.bids.sizes.tolist() == [5, 2, 1]
+    assert list(book.bids.price_text) == ['101', '99.5', '99']
+
+
+def test_matches_a_dictionary_model():
+    rng = random.Random(0)
+    book = OrderBook()
+    bids, asks = {}, {}
+    for _ in range(2000):
+        changes = {'bids': [], 'asks': []}
+        for side, model, base in (('bids', bids, 100), ('asks', asks, 101)):
+            for _ in range(rng.randint(0, 5)):
+                price = '%.1f' % (base + (rng.randint(0, 50) if side == 'asks' else -rng.randint(0, 50)) / 10)
+                size = rng.choice(['0', str(rng.randint(1, 9))])
+                changes[side].append([price, size, '0', '1'])
+                if size == '0':
+                    model.pop(price, None)
+                else:
+                    model[price] = size
+        book.update(changes['bids'], changes['asks'])
+        assert list(book.bids.price_text) == sorted(bids, key=float, reverse=True)
+        assert list(book.asks.price_text) == sorted(asks, key=float)
+        assert list(book.bids.size_text) == [bids[p] for p in book.bids.price_text]
+
+
+def test_order_books_resubscribe_on_checksum_failure():
+    class Stream:
+        def __init__(self):
+            self.callbacks = {}
+            self.resubscribed = []
+
+        async def subscribe(self, channel, trading_pair, callback=None):
+            self.callbacks[trading_pair] = callback
+
+        async def resubscribe(self, channel, trading_pair):
+            self.resubscribed.append(trading_pair)
+
+    books = OrderBooks(max_levels=10)
+    stream = Stream()
+
+    async def main():
+        await books.attach(stream, ['BTC-USD', 'ETH-USD'])
+        arg = {'channel': 'books', 'instId': 'BTC-USD'}
+        await stream.callbacks['BTC-USD']({'arg': arg, 'action': 'snapshot', 'data': [
+            {'bids': _levels(('100', '1')), 'asks': _levels(('101', '1')), 'seqId': 1}]})
+        await stream.callbacks['BTC-USD']({'arg': arg, 'action': 'update', 'data': [
+            {'bids': _levels(('100', '2')), 'asks': [], 'checksum': 1, 'seqId': 2}]})
+
+    asyncio.run(main())
+    assert books['BTC-USD'].seq == 1
+    assert books.checksum_errors == 1
+    assert stream.resubscribed == ['BTC-USD']
+    assert 'ETH-USD' not in books
@@ -0,0 +1,79 @@
+import json
+import asyncio
+
+from okcoin.Pagination import Paginator
+
+BILLS = '/api/v5/account/bills'
+
+
+class _Response:
+    def __init__(self, payload, url):
+        self.content = json.dumps(payload).encode()
+        self.status_code = 200
+        self.url = url
+
+
+class _Client:
+    r"""Serves bills 1 to n, newest (highest billId) first, following the V5 cursors."""
+
+    def __init__(self, n=250):
+        self.ids = list(range(n, 0, -1))
+        self.requests = []
+
+    def query(self, method, request_path, body=''):
+        self.requests.append(dict(body))
+        limit = int(body['limit'])
+        if 'before' in body:
+            ids = [i for i in self.ids if i > int(body['before'])][-limit:]
+        else:
+            ids = [i for i in self.ids if 'after' not in body or i < int(body['after'])][:limit]
+        data = [{'billId': str(i), 'balChg': '1', 'ccy': 'BTC', 'ts': str(1621143687000 + i)} for i in ids]
+        return _Response({'code': '0', 'msg': '', 'data': data}, 'https://www.okcoin.com' + request_path)
+
+
+class _AsyncClient(_Client):
+    async def query(self, method, request_path, body=''):
+        return _Client.query(self, method, request_path, body)
+
+
+def test_pages_back_through_after_cursors():
+    client = _Client()
+    pages = list(Paginator(client, BILLS, {'ccy': 'BTC', 'type': ''}))
+    assert [len(page.json['data']) for page in pages] == [100, 100, 50]
+    assert [r.get('after') for r in client.requests] == [None, '151', '51']
+    assert all('type' not in r and r['ccy'] == 'BTC' for r in client.requests)
+
+
+def test_stops_on_an_empty_page():
+    client = _Client(200)
+    pages = list(Paginator(client, BILLS))
+    assert len(pages) == 2
+    assert len(client.requests) == 3
+
+
+def test_pages_forward_through_before_cursors():
+    client = _Client()
+    pages = list(Paginator(client, BILLS, before=100, limit=60))
+    assert [page.json['data'][0]['billId'] for page in pages] == ['160', '220', '250']
+    assert [r['before'] for r in client.requests] == ['100', '160', '220']
+
+
+def test_max_pages():
+    client = _Client()
+    assert len(list(Paginator(client, BILLS, limit=10, max_pages=3))) == 3
+    assert len(client.requests) == 3
+
+
+def test_collect_keeps_the_schema_types():
+    df = Paginator(_Client(), BILLS).collect()
+    assert len(df) == 250
+    assert df['billId'].tolist() == list(range(250, 0, -1))
+    assert df['balChg'].dtype == float
+    assert str(df['ts'].dtype).startswith('datetime64')
+
+
+def test_async_iteration():
+    async def main():
+        return [page async for page in Paginator(_AsyncClient(), BILLS, limit=100)]
+
+    assert [len(page.json['data']) for page in asyncio.run(main())] == [100, 100, 50]
@@ -0,0 +1,109 @@
+import time
+import asyncio
+import threading
+
+from okcoin.RateLimiter import RateLimiter, HIGH, LOW, ACCOUNT
+
+
+def _wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_account_limit_orders_requests_across_families():
+    limiter = RateLimiter(account=(1, 0.2))
+    limiter.acquire('/api/v5/public/time')  # empties the account bucket
+    served = []
+
+    def request(path):
+        limiter.acquire(path)
+        served.append(path)
+
+    bills = threading.Thread(target=request, args=('/api/v5/account/bills',))
+    bills.start()
+    _wait_for(lambda: limiter.queue_depth(ACCOUNT) == 1)
+    order = threading.Thread(target=request, args=('/api/v5/trade/order',))
+    order.start()
+    bills.join(2)
+    order.join(2)
+    assert served == ['/api/v5/trade/order', '/api/v5/account/bills']
+
+
+def test_priority_orders_requests_within_a_family():
+    limiter = RateLimiter(limits={'/x': (1, 0.2, LOW)})
+    limiter.acquire('/x')
+    served = []
+
+    def request(priority):
+        limiter.acquire('/x', priority)
+        served.append(priority)
+
+    low = threading.Thread(target=request, args=(LOW,))
+    low.start()
+    _wait_for(lambda: limiter.queue_depth('/x') == 1)
+    high = threading.Thread(target=request, args=(HIGH,))
+    high.start()
+    low.join(2)
+    high.join(2)
+    assert served == [HIGH, LOW]
+
+
+def test_cancelled_async_request_leaves_the_queue():
+    limiter = RateLimiter(limits={'/x': (1, 0.2, LOW)})
+
+    async def main():
+        await limiter.acquire_async('/x')
+        try:
+            await asyncio.wait_for(limiter.acquire_async('/x'), 0.01)
+        except asyncio.TimeoutError:
+            pass
+        assert limiter.queue_depth('/x') == 0
+        await asyncio.wait_for(limiter.acquire_async('/x'), 2)
+
+    asyncio.run(main())
+
+
+def test_interrupted_request_leaves_the_queue():
+    limiter = RateLimiter(limits={'/x': (1, 0.2, LOW)})
+    limiter.acquire('/x')
+    bucket, entry = limiter._enqueue('/x', LOW)
+    bucket.cond.wait = lambda timeout=None: (_ for _ in ()).throw(KeyboardInterrupt)
+    try:
+        limiter._wait(bucket, entry)
+    except KeyboardInterrupt:
+        pass
+    del bucket.cond.wait
+    assert limiter.queue_depth('/x') == 0
+    limiter.acquire('/x')
+
+
+def test_stats_include_the_account_bucket():
+    limiter = RateLimiter(account=(60, 2))
+    limiter.acquire('/api/v5/trade/order')
+    stats = limiter.stats()
+    assert stats['/api/v5/trade/order']['requests'] == 1
+    assert stats[ACCOUNT]['requests'] == 1
+    assert RateLimiter().stats() == {}
+
+
+def test_families_do_not_share_tokens_by_default():
+    limiter = RateLimiter(limits={'/orders': (1, 60, HIGH), '/bills': (1, 60, LOW)})
+    start = time.monotonic()
+    limiter.acquire('/bills')
+    limiter.acquire('/orders')
+    assert time.monotonic() - start < 0.5
+    assert ACCOUNT not in limiter.stats()
+
+
+def test_batch_requests_take_a_token_per_order():
+    limiter = RateLimiter(limits={'/batch': (40, 0.4, HIGH)})
+    start = time.monotonic()
+    limiter.acquire('/batch', tokens=20)
+    limiter.acquire('/batch', tokens=20)
+    assert time.monotonic() - start < 0.1
+    limiter.acquire('/batch', tokens=20)  # waits for 20 tokens, 0.2 s at 100 per second
+    assert time.monotonic() - start >= 0.15
+    # A request heavier than the bucket waits for a full bucket instead of forever.
+    asyncio.run(asyncio.wait_for(limiter.acquire_async('/batch', tokens=100), 2))
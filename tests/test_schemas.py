@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from okcoin.Errors import RateLimitError
+from okcoin.Schemas import SCHEMAS, V3_CANDLE, decode, schema_for, unwrap
+
+
+def test_decode_dict_records():
+    payload = {'code': '0', 'msg': '', 'data': [
+        {'billId': '1', 'bal': '1.5', 'balChg': '', 'ts': '1621143687000', 'ccy': 'BTC', 'note': 'a'},
+        {'billId': '2', 'bal': '2.5', 'balChg': '1', 'ts': '1621143688000', 'ccy': 'BTC', 'note': 'b'}]}
+    columns = decode(payload, schema_for('/api/v5/account/bills?ccy=BTC'))
+    assert columns['billId'].dtype == np.int64
+    assert columns['bal'].tolist() == [1.5, 2.5]
+    assert np.isnan(columns['balChg'][0])
+    assert columns['ts'][0] == np.datetime64('2021-05-16T05:41:27.000')
+    assert columns['note'].dtype == object
+
+
+def test_decode_positional_records():
+    payload = {'code': '0', 'data': [['1621143687000', '1', '2', '0.5', '1.5', '10', '0', '0', '1', 'extra']]}
+    columns = decode(payload, SCHEMAS['/api/v5/market/candles'])
+    assert columns['ts'][0] == np.datetime64('2021-05-16T05:41:27.000')
+    assert columns['confirm'].tolist() == [1]
+    assert columns['9'].tolist() == ['extra']
+
+
+def test_decode_nested_records():
+    payload = {'code': '0', 'data': [{'details': [{'ccy': 'BTC', 'cashBal': '1'}, {'ccy': 'USD', 'cashBal': '2'}]}]}
+    columns = decode(payload, SCHEMAS['/api/v5/account/balance'])
+    assert columns['ccy'].tolist() == ['BTC', 'USD']
+    assert columns['cashBal'].tolist() == [1.0, 2.0]
+
+
+def test_decode_empty_keeps_the_columns():
+    columns = decode({'code': '0', 'data': []}, V3_CANDLE)
+    assert list(columns) == ['time', 'open', 'high', 'low', 'close', 'volume']
+
+
+def test_decode_unenveloped_legacy_records():
+    columns = decode([{'order_id': '7', 'price': '1.5', 'created_at': '2021-04-02T15:20:37.000Z', 'state': '-1'}],
+                     schema_for('/api/spot/v5/orders'))
+    assert columns['order_id'].tolist() == ['7']
+    assert columns['state'].tolist() == [-1]
+    assert columns['created_at'][0] == np.datetime64('2021-04-02T15:20:37.000')
+
+
+def test_non_zero_code_raises_typed_error():
+    with pytest.raises(RateLimitError):
+        unwrap({'code': '50011', 'msg': 'Too Many Requests', 'data': []}, '/api/v5/account/bills')
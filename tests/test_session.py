@@ -0,0 +1,57 @@
+import json
+
+import pytest
+import requests
+
+from okcoin.Retry import RetryPolicy
+from okcoin.Session import Session
+
+
+class _Response:
+    def __init__(self, payload, status_code=200, url=''):
+        self.content = json.dumps(payload).encode()
+        self.status_code = status_code
+        self.url = url
+
+
+def _session(respond):
+    session = Session(warm_up=0, rate_limiter=False, retry=RetryPolicy(retries=2, backoff=0))
+    sent = []
+
+    def request(method, url, **kwargs):
+        sent.append((method, url, kwargs))
+        return respond(len(sent), url, kwargs)
+
+    session.request = request
+    return session, sent
+
+
+def test_send_retries_transient_failures():
+    def respond(n, url, kwargs):
+        if n == 1:
+            raise requests.ConnectionError('reset')
+        if n == 2:
+            return _Response({'code': '50011', 'msg': 'Too Many Requests'}, 429)
+        return _Response({'code': '0', 'data': []})
+
+    session, sent = _session(respond)
+    prepared = []
+    response = session.send('GET', '/x', lambda: (prepared.append(1) or 'https://h/x', {}))
+    assert response.status_code == 200
+    assert len(sent) == len(prepared) == 3
+
+
+def test_send_gives_up_after_the_retries():
+    session, sent = _session(lambda n, url, kwargs: _Response({'code': '50011'}, 429))
+    assert session.send('GET', '/x', lambda: ('https://h/x', {})).status_code == 429
+    assert len(sent) == 3
+
+
+def test_send_without_retry_sends_once():
+    def respond(n, url, kwargs):
+        raise requests.Timeout('timed out')
+
+    session, sent = _session(respond)
+    with pytest.raises(requests.Timeout):
+        session.send('POST', '/x', lambda: ('https://h/x', {}), retry=False)
+    assert len(sent) == 1
@@ -0,0 +1,142 @@
+import json
+import types
+
+import pandas as pd
+import pytest
+
+import okcoin.DataMangement as dm
+from okcoin.DataObjects import _Resp
+from okcoin.Storage import BlobInfo, LocalBackend, Manifest, MANIFEST_BLOB
+
+
+def _ledger():
+    return pd.DataFrame({
+        'ledger_id': [1, 2, 3, 4],
+        'timestamp': ['2021-05-01T00:00:00.000Z', '2021-05-01T12:00:00.000Z',
+                      '2021-05-02T00:00:00.000Z', '2021-05-03T00:00:00.000Z'],
+        'currency': ['BTC', 'STX', 'STX', 'BTC'],
+        'amount': [0.5, 10.0, 20.0, 0.25],
+        'balance': [0.5, 10.0, 30.0, 0.75]})
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / 'azure.config'
+    path.write_text('[DEFAULT]\nlocal_path = %s\n' % (tmp_path / 'store'))
+    return str(path)
+
+
+def test_manifest_select():
+    ledger = _ledger()
+    manifest = Manifest()
+    manifest.add('ledger_1.csv', ledger.iloc[:2], 'a')
+    manifest.add('ledger_2.csv', ledger.iloc[2:], 'b')
+    manifest.add('orders_1.csv', ledger, 'c')
+    blobs = [BlobInfo('ledger_1.csv', 'a', 1), BlobInfo('ledger_2.csv', 'b', 1),
+             BlobInfo('ledger_3.csv', 'x', 1), BlobInfo('orders_1.csv', 'c', 1),
+             BlobInfo(MANIFEST_BLOB, 'm', 1)]
+    assert manifest.entries['ledger_2.csv']['currencies'] == ['BTC', 'STX']
+    assert manifest.select(blobs, 'ledger') == ['ledger_1.csv', 'ledger_2.csv', 'ledger_3.csv']
+    # Blobs that are not indexed are always read.
+    assert manifest.select(blobs, 'ledger', start='2021-05-02') == ['ledger_2.csv', 'ledger_3.csv']
+    assert manifest.select(blobs, 'ledger', end='2021-05-01T06:00') == ['ledger_1.csv', 'ledger_3.csv']
+    assert manifest.select(blobs, 'ledger', currency='BTC') == ['ledger_1.csv', 'ledger_2.csv', 'ledger_3.csv']
+    # A blob that changed since it was indexed is read again.
+    blobs[0] = BlobInfo('ledger_1.csv', 'changed', 1)
+    assert manifest.select(blobs, 'ledger', start='2021-06-01') == ['ledger_1.csv', 'ledger_3.csv']
+
+
+def test_local_backend(tmp_path):
+    backend = LocalBackend(tmp_path)
+    etag = backend.write('ledger/date=2021-05-01/a.csv', b'abc')
+    assert backend.read('ledger/date=2021-05-01/a.csv') == b'abc'
+    assert backend.list('ledger/') == [BlobInfo('ledger/date=2021-05-01/a.csv', etag, 3)]
+    with pytest.raises(FileExistsError):
+        backend.write('ledger/date=2021-05-01/a.csv', b'abc')
+    with pytest.raises(FileNotFoundError):
+        backend.read('missing.csv')
+
+
+def test_csv_round_trip(config):
+    dm.upload_to_azure_storage(_ledger(), config)
+    df = dm.dataframe_from_azure_storage(config)
+    assert df['ledger_id'].tolist() == [1, 2, 3, 4]
+    stx = dm.dataframe_from_azure_storage(config, start='2021-05-01T06:00', currency='STX')
+    assert stx['ledger_id'].tolist() == [2, 3]
+
+
+def test_parquet_round_trip(config):
+    pytest.importorskip('pyarrow')
+    _, _, names = dm.upload_to_azure_storage(_ledger(), config, storage_format='parquet')
+    assert len(names) == 4
+    assert all(name.startswith('ledger/date=') and name.endswith('.parquet') for name in names)
+    loaded = []
+    df = dm.dataframe_from_azure_storage(config, start='2021-05-02', currency='STX',
+                                         progress=lambda done, total, nbytes: loaded.append(total))
+    assert df['ledger_id'].tolist() == [3]
+    assert df['amount'].dtype == float
+    assert loaded == [1]  # only the one partition that can match is downloaded
+
+
+class _BillsResponse:
+    def __init__(self, bills):
+        self.content = json.dumps({'code': '0', 'msg': '', 'data': bills}).encode()
+        self.status_code = 200
+        self.url = 'https://www.okcoin.com/api/v5/account/bills-archive'
+
+
+class _Spot:
+    api_key = 'key'
+
+    def __init__(self, bills):
+        self.bills = bills  # newest first, as okcoin returns them
+        self.cursors = []
+
+    def iter_bills_archive(self, before=None):
+        self.cursors.append(before)
+        bills = [b for b in self.bills if before is None or int(b['billId']) > int(before)]
+        return [_Resp(_BillsResponse(bills))] if bills else []
+
+
+def _bill(bill_id, ts):
+    return {'billId': str(bill_id), 'balChg': '1', 'bal': str(bill_id), 'ccy': 'STX',
+            'ts': str(int(pd.Timestamp(ts).value // 1_000_000))}
+
+
+def test_sync_ledger(config, monkeypatch):
+    # Blobs are named after the second they were uploaded in.
+    seconds = iter(range(1_600_000_000, 1_700_000_000, 60))
+    monkeypatch.setattr(dm, 'time', types.SimpleNamespace(time=lambda: next(seconds)))
+    now = pd.Timestamp.now(tz='UTC').floor('s')
+    # A snapshot of Account.get_ledger whose IDs collide with bill IDs.
+    dm.upload_to_azure_storage(pd.DataFrame({
+        'ledger_id': [5, 4], 'timestamp': [(now - pd.Timedelta(days=9)).isoformat(), (now - pd.Timedelta(days=10)).isoformat()],
+        'currency': ['STX', 'STX'], 'amount': [5.0, 5.0], 'balance': [10.0, 5.0]}), config)
+    spot = _Spot([_bill(i, now - pd.Timedelta(days=12 - i)) for i in reversed(range(1, 6))])
+
+    # The first run continues from the snapshot.
+    delta = dm.sync_ledger(spot, config, account='key')
+    assert delta['ledger_id'].tolist() == [5, 4]
+    assert (delta['source'] == dm.BILLS_SOURCE).all()
+    assert dm.load_checkpoints(config)['key']['ledger_id'] == '5'
+
+    # A delta run uploads the new bills only.
+    spot.bills.insert(0, _bill(6, now))
+    assert dm.sync_ledger(spot, config, account='key')['ledger_id'].tolist() == [6]
+    assert spot.cursors == [None, '5']
+
+    # A run with no new bills uploads nothing and keeps the checkpoint.
+    assert len(dm.sync_ledger(spot, config, account='key')) == 0
+    assert dm.load_checkpoints(config)['key']['ledger_id'] == '6'
+
+    df = dm.dataframe_from_azure_storage(config).sort_values('timestamp')
+    # Ledger IDs 4 and 5 are not dropped as duplicates of bills 4 and 5.
+    assert df['ledger_id'].tolist() == [4, 5, 4, 5, 6]
+
+
+def test_sync_ledger_warns_when_the_archive_was_missed(config):
+    old = pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=120)
+    dm.save_checkpoints({'key': {'ledger_id': '1', 'timestamp': int(old.value // 1_000_000)}}, config)
+    spot = _Spot([_bill(2, pd.Timestamp.now(tz='UTC'))])
+    with pytest.warns(RuntimeWarning, match='bills archive'):
+        assert dm.sync_ledger(spot, config, account='key')['ledger_id'].tolist() == [2]
@@ -0,0 +1,55 @@
+import json
+from urllib.parse import urlsplit
+
+import pytest
+
+from okcoin import ticker
+from okcoin.Retry import RetryPolicy
+from okcoin.Session import Session
+
+START = 1609459200000  # 2021-01-01
+
+
+class _Response:
+    def __init__(self, payload, status_code=200, url=''):
+        self.content = json.dumps(payload).encode()
+        self.status_code = status_code
+        self.url = url
+
+
+def _session(respond):
+    session = Session(warm_up=0, rate_limiter=False, retry=RetryPolicy(retries=2, backoff=0))
+    sent = []
+
+    def request(method, url, **kwargs):
+        sent.append((method, url, kwargs))
+        return respond(len(sent), url, kwargs)
+
+    session.request = request
+    return session, sent
+
+
+def test_backfill_candles_requires_start():
+    with pytest.raises(ValueError):
+        ticker.backfill_candles('BTC-USD', end='2021-01-02')
+
+
+def test_backfill_candles():
+    missing = set(range(START + 600 * 60000, START + 605 * 60000, 60000))
+
+    def respond(n, url, kwargs):
+        params = kwargs['params']
+        after, before = int(params['after']), int(params['before'])
+        data = [[str(t), '1', '2', '0.5', '1.5', '10', '0', '0', '1']
+                for t in range(after - 60000, before, -60000) if t not in missing][:100]
+        return _Response({'code': '0', 'msg': '', 'data': data}, url=url)
+
+    session, sent = _session(respond)
+    candles = ticker.backfill_candles('BTC-USD', '2021-01-01', '2021-01-02', 60, session=session)
+    assert len(sent) == 15
+    assert {urlsplit(url).path for _, url, _ in sent} == {ticker.HISTORY_CANDLES_PATH}
+    assert len(candles.df) == 1440 - 5
+    assert candles.df['time'].is_monotonic_increasing
+    assert candles.gaps.to_dict('records') == [
+        {'start': ticker.pd.Timestamp('2021-01-01 10:00'), 'end': ticker.pd.Timestamp('2021-01-01 10:04'),
+         'missing': 5}]
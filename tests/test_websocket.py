@@ -0,0 +1,109 @@
+import json
+import asyncio
+
+import aiohttp
+
+from okcoin.WebSocket import MarketStream, candle_channel
+
+
+def _book(action, seq, prev):
+    return {'arg': {'channel': 'books', 'instId': 'BTC-USD'}, 'action': action,
+            'data': [{'bids': [], 'asks': [], 'seqId': seq, 'prevSeqId': prev}]}
+
+
+def test_book_gap_resubscribes_once_and_drops_stale_updates():
+    stream = MarketStream()
+    sent = []
+    received = []
+
+    async def send(op, keys):
+        sent.append((op, keys))
+
+    async def main():
+        stream._send = send
+        await stream.subscribe('books', 'BTC-USD', callback=lambda m: received.append(m['data'][0]['seqId']))
+        for message in [_book('snapshot', 1, -1), _book('update', 2, 1),
+                        _book('update', 6, 5),                              # 3 to 5 were missed
+                        _book('update', 7, 6), _book('update', 8, 7),       # still in flight
+                        _book('snapshot', 10, -1), _book('update', 11, 10)]:
+            await stream._dispatch(message)
+
+    asyncio.run(main())
+    assert stream.gaps == 1
+    assert sent == [('subscribe', [('books', 'BTC-USD')]), ('unsubscribe', [('books', 'BTC-USD')]),
+                    ('subscribe', [('books', 'BTC-USD')])]
+    assert received == [1, 2, 10, 11]
+
+
+def test_messages_iterator_and_events():
+    events = []
+    stream = MarketStream(on_event=events.append, queue_size=2)
+
+    async def main():
+        stream._send = lambda op, keys: asyncio.sleep(0)
+        iterator = stream.messages('tickers', 'BTC-USD').__aiter__()
+        first = asyncio.ensure_future(iterator.__anext__())
+        await asyncio.sleep(0)
+        await stream._dispatch({'event': 'subscribe', 'arg': {'channel': 'tickers', 'instId': 'BTC-USD'}})
+        for i in range(3):
+            await stream._dispatch({'arg': {'channel': 'tickers', 'instId': 'BTC-USD'}, 'data': [i]})
+        return await first, await iterator.__anext__()
+
+    first, second = asyncio.run(main())
+    assert first['data'] == [1]  # the oldest message was dropped
+    assert second['data'] == [2]
+    assert stream.dropped == 1
+    assert events[0]['event'] == 'subscribe'
+    assert candle_channel(3600) == 'candle1H'
+
+
+class _WebSocket:
+    def __init__(self, texts):
+        self.messages = [aiohttp.WSMessage(aiohttp.WSMsgType.TEXT, text, None) for text in texts]
+        self.messages.append(aiohttp.WSMessage(aiohttp.WSMsgType.CLOSE, None, None))
+
+    async def receive(self, timeout=None):
+        return self.messages.pop(0)
+
+
+def _ticker(last):
+    return json.dumps({'arg': {'channel': 'tickers', 'instId': 'BTC-USD'}, 'data': [{'last': last}]})
+
+
+def test_callback_and_decoding_errors_do_not_stop_the_stream():
+    events = []
+    stream = MarketStream(on_event=events.append)
+    received = []
+
+    def callback(message):
+        last = message['data'][0]['last']
+        if last == 'bad':
+            raise ValueError('cannot parse ' + last)
+        received.append(last)
+
+    async def main():
+        stream._send = lambda op, keys: asyncio.sleep(0)
+        await stream.subscribe('tickers', 'BTC-USD', callback=callback)
+        await stream._listen(_WebSocket([_ticker('1'), '{not json', _ticker('bad'),
+                                         json.dumps({'arg': {'channel': 'books'}, 'data': [5]}), _ticker('2')]))
+
+    asyncio.run(main())
+    assert received == ['1', '2']
+    assert stream.errors == 3
+    assert [type(event['exception']) for event in events] == [json.JSONDecodeError, ValueError, TypeError]
+    assert all(event['event'] == 'error' for event in events)
+
+
+def test_errors_go_to_the_loop_without_on_event():
+    stream = MarketStream()
+    reported = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: reported.append(context))
+        stream._send = lambda op, keys: asyncio.sleep(0)
+        await stream.subscribe('tickers', 'BTC-USD', callback=lambda message: 1 / 0)
+        await stream._listen(_WebSocket([_ticker('1'), _ticker('2')]))
+
+    asyncio.run(main())
+    assert stream.errors == 2
+    assert [type(context['exception']) for context in reported] == [ZeroDivisionError] * 2